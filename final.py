@@ -1,709 +1,22 @@
 import pygame
 import sys
-import numpy as np
-from datetime import datetime, timedelta
-import random
-import math
-
-class Location:
-    """Represents a location on the railway network"""
-    def __init__(self, name, location_type, position_km, side_tracks=0):
-        self.name = name
-        self.type = location_type  # 'city', 'town', 'village', 'open'
-        self.position_km = position_km
-        self.side_tracks = side_tracks
-        self.has_double_track = location_type in ['city', 'town', 'village']
-        self.occupied_side_tracks = 0  # Track side track usage
-
-class RailwayTrack:
-    """Railway track with single/double sections and side tracks"""
-    def __init__(self, name="main_line", total_length_km=400):
-        self.name = name
-        self.total_length_km = total_length_km
-        self.locations = self._create_locations()
-        self.segments = self._create_segments()
-        
-    def _create_locations(self):
-        """Create realistic railway locations"""
-        return [
-            Location("Mumbai", "city", 0, side_tracks=4),
-            Location("Thane", "city", 25, side_tracks=3),
-            Location("Kalyan", "town", 55, side_tracks=2),
-            Location("Karjat", "village", 85, side_tracks=2),
-            Location("Lonavala", "village", 115, side_tracks=2),
-            Location("Pune", "city", 150, side_tracks=4),
-            Location("Satara", "town", 200, side_tracks=2),
-            Location("Kolhapur", "village", 250, side_tracks=1),
-            Location("Belgaum", "city", 300, side_tracks=3),
-            Location("Bangalore", "city", 400, side_tracks=4)
-        ]
-    
-    def _create_segments(self):
-        """Create track segments between locations"""
-        segments = []
-        for i in range(len(self.locations) - 1):
-            start_loc = self.locations[i]
-            end_loc = self.locations[i + 1]
-            
-            # Determine track type based on locations
-            has_double_track = start_loc.has_double_track or end_loc.has_double_track
-            
-            segments.append({
-                'start': start_loc,
-                'end': end_loc,
-                'start_km': start_loc.position_km,
-                'end_km': end_loc.position_km,
-                'length_km': end_loc.position_km - start_loc.position_km,
-                'has_double_track': has_double_track,
-                'capacity': 2 if has_double_track else 1,
-                'trains': []
-            })
-        return segments
-    
-    def get_segment_at_position(self, position_km):
-        """Get track segment at given position"""
-        for segment in self.segments:
-            if segment['start_km'] <= position_km <= segment['end_km']:
-                return segment
-        return None
-    
-    def is_in_double_track_area(self, position_km):
-        """Check if position is in double-track area (village/city)"""
-        for location in self.locations:
-            # Check if within 10km of a settlement (double-track area)
-            if abs(location.position_km - position_km) <= 10 and location.has_double_track:
-                return True, location
-        return False, None
-    
-    def find_nearest_side_track(self, position_km):
-        """Find nearest location with available side tracks"""
-        candidates = []
-        for location in self.locations:
-            if location.side_tracks > location.occupied_side_tracks:
-                distance = abs(location.position_km - position_km)
-                candidates.append((distance, location))
-        
-        if candidates:
-            candidates.sort(key=lambda x: x[0])
-            return candidates[0][1]
-        return None
-    
-    def find_next_village_ahead(self, position_km):
-        """Find the next village/city AHEAD of current position with available side tracks"""
-        candidates = []
-        for location in self.locations:
-            # Only consider locations AHEAD (greater position) and with available side tracks
-            if (location.position_km > position_km and 
-                location.has_double_track and 
-                location.side_tracks > location.occupied_side_tracks):
-                distance = location.position_km - position_km
-                candidates.append((distance, location))
-        
-        if candidates:
-            candidates.sort(key=lambda x: x[0])  # Sort by distance, closest first
-            return candidates[0][1]
-        return None
-    
-    def is_in_single_track_section(self, position_km):
-        """Check if position is in single-track section (outside villages/cities)"""
-        is_double_track, _ = self.is_in_double_track_area(position_km)
-        return not is_double_track
-    
-    def get_next_double_track_location(self, position_km):
-        """Get the next double-track location ahead"""
-        for location in self.locations:
-            if location.position_km > position_km and location.has_double_track:
-                return location
-        return None
-
-class Train:
-    """Train with realistic speeds and behavior"""
-    def __init__(self, id, name, priority, base_speed, scheduled_start):
-        self.id = id
-        self.name = name
-        self.priority = priority  # 1=highest, 4=lowest
-        self.base_speed = base_speed  # km/h
-        self.current_speed = base_speed
-        self.scheduled_start = scheduled_start
-        self.position_km = 0.0
-        self.delay_minutes = 0
-        self.is_stopped = False
-        self.stop_reason = ""
-        self.has_started = False
-        self.destination_reached = False
-        self.is_slowing_for_delayed_train = False
-        self.emergency_stopped = False  # NEW: Track emergency stops
-        
-        # Side track management
-        self.is_on_side_track = False
-        self.side_track_location = None
-        self.waiting_for_train = None
-        self.side_track_timer = 0
-        
-        # Speed matching for overtaking
-        self.original_speed = base_speed
-        self.is_speed_matched = False
-        self.speed_matched_to_train = None
-        self.waiting_for_double_track = False
-        
-        # NEW: Phase tracking
-        self.current_phase = "NORMAL"  # NORMAL, MONITOR, PROGRESSIVE, SPEED_MATCH, EMERGENCY
-        self.phase_target_train = None
-        
-        # Visual properties
-        self.color = self._get_priority_color(priority)
-        self.animation_offset = 0
-        self.last_update_time = None
-        
-        # State tracking
-        self.total_delay_accumulated = 0
-        self.times_rerouted = 0
-        
-    def _get_priority_color(self, priority):
-        """Get color based on train priority"""
-        colors = {
-            1: (255, 0, 0),    # Red - Highest priority
-            2: (255, 140, 0),  # Dark orange - High priority
-            3: (0, 100, 255),  # Blue - Medium priority
-            4: (100, 100, 100) # Gray - Lowest priority
-        }
-        return colors.get(priority, (0, 0, 0))
-    
-    def can_start(self, current_time):
-        """Check if train can start based on schedule"""
-        return current_time >= self.scheduled_start and not self.has_started
-    
-    def start_journey(self, current_time):
-        """Start the train's journey"""
-        if self.can_start(current_time):
-            self.has_started = True
-            self.last_update_time = current_time
-            self.is_stopped = False
-            return True
-        return False
-    
-    def update_position(self, time_delta_minutes, track):
-        """Update train position with corrected delay handling"""
-        if not self.has_started or self.destination_reached:
-            return
-        
-        # Trains on yellow tracks cannot move at all
-        if self.is_on_side_track:
-            self.is_stopped = True
-            if self.side_track_location:
-                self.stop_reason = f"Stationary on yellow track at {self.side_track_location.name}"
-            return
-        
-        # Handle delays
-        if self.delay_minutes > 0:
-            self.delay_minutes -= time_delta_minutes
-            self.is_stopped = True
-            self.stop_reason = f"Delayed: {self.delay_minutes:.1f}min remaining"
-            if self.delay_minutes <= 0:
-                self.delay_minutes = 0
-                self.is_stopped = False
-                self.stop_reason = ""
-                self.emergency_stopped = False  # Clear emergency stop when delay ends
-            return
-        
-        # Don't move if stopped for other reasons (including emergency stop)
-        if self.is_stopped or self.emergency_stopped:
-            return
-        
-        # Calculate movement
-        speed_km_per_min = self.current_speed / 60  # Convert to km/min
-        distance_increment = speed_km_per_min * time_delta_minutes
-        
-        # Move train
-        new_position = min(track.total_length_km, self.position_km + distance_increment)
-        self.position_km = new_position
-        
-        # Check if destination reached
-        if self.position_km >= track.total_length_km:
-            self.destination_reached = True
-            self.is_stopped = True
-            self.stop_reason = "Journey completed"
-    
-    def add_delay(self, minutes, reason):
-        """Add delay to train"""
-        self.delay_minutes += minutes
-        self.total_delay_accumulated += minutes
-        self.is_stopped = True
-        self.stop_reason = f"Delayed: {reason} ({self.delay_minutes:.1f}min)"
-    
-    def emergency_stop(self, delayed_train, reason):
-        """NEW: Emergency stop the train completely"""
-        print(f"EMERGENCY STOP: {self.name} - {reason}")
-        self.emergency_stopped = True
-        self.current_speed = 0
-        self.is_stopped = True
-        self.current_phase = "EMERGENCY"
-        self.phase_target_train = delayed_train
-        self.stop_reason = f"EMERGENCY: {reason}"
-        # Inherit the SAME delay as the delayed train
-        self.add_delay(delayed_train.delay_minutes, f"Inherited from {delayed_train.name}")
-    
-    def set_phase(self, phase, distance, delayed_train):
-        """NEW: Set the current phase and adjust speed accordingly"""
-        old_phase = self.current_phase
-        self.current_phase = phase
-        self.phase_target_train = delayed_train
-        
-        if phase != old_phase:
-            print(f"PHASE CHANGE: {self.name} {old_phase} → {phase} (Distance: {distance:.1f}km)")
-        
-        if phase == "MONITOR":
-            # Phase 1: Far away, maintain original speed
-            self.current_speed = self.original_speed
-            self.stop_reason = f"Phase 1: Monitoring {delayed_train.name}"
-            
-        elif phase == "PROGRESSIVE":
-            # Phase 2: Progressive slowdown from 35km to 20km
-            # Linear interpolation between original speed and delayed train speed
-            distance_factor = (distance - 20) / (35 - 20)  # 1.0 at 35km, 0.0 at 20km
-            distance_factor = max(0, min(1, distance_factor))
-            
-            target_speed = delayed_train.current_speed + (self.original_speed - delayed_train.current_speed) * distance_factor
-            self.current_speed = max(delayed_train.current_speed, target_speed)
-            self.stop_reason = f"Phase 2: Progressive slowdown ({self.current_speed:.0f}km/h)"
-            
-        elif phase == "SPEED_MATCH":
-            # Phase 3: Speed matching
-            self.current_speed = delayed_train.current_speed
-            self.is_speed_matched = True
-            self.speed_matched_to_train = delayed_train
-            self.stop_reason = f"Phase 3: Speed matching {delayed_train.name}"
-            
-        elif phase == "EMERGENCY":
-            # Phase 4: Emergency stop
-            self.current_speed = 0
-            self.emergency_stopped = True
-            self.is_stopped = True
-            self.stop_reason = f"Phase 4: Emergency stop - collision imminent"
-    
-    def resume_normal_speed(self):
-        """Enhanced resume normal speed with complete state reset"""
-        if self.current_phase != "NORMAL" or self.emergency_stopped or self.is_speed_matched:
-            print(f"FULL RECOVERY: {self.name} → {self.original_speed}km/h (was {self.current_speed}km/h)")
-            
-            # Reset all speed and phase states
-            self.current_speed = self.original_speed
-            self.current_phase = "NORMAL"
-            self.phase_target_train = None
-            self.is_slowing_for_delayed_train = False
-            self.is_speed_matched = False
-            self.speed_matched_to_train = None
-            self.emergency_stopped = False
-            self.is_stopped = False
-            self.stop_reason = ""
-    
-    def move_to_side_track(self, side_track_location, reason):
-        """Move train to side track"""
-        if side_track_location and side_track_location.occupied_side_tracks < side_track_location.side_tracks:
-            self.is_on_side_track = True
-            self.side_track_location = side_track_location
-            self.position_km = side_track_location.position_km
-            self.is_stopped = True
-            self.stop_reason = f"Yellow track at {side_track_location.name}: {reason}"
-            self.times_rerouted += 1
-            side_track_location.occupied_side_tracks += 1
-            print(f"YELLOW TRACK: {self.name} moved to {side_track_location.name} - {reason}")
-            return True
-        return False
-    
-    def return_to_main_track(self):
-        """Return train from side track to main track"""
-        if self.is_on_side_track and self.side_track_location:
-            self.side_track_location.occupied_side_tracks -= 1
-            self.is_on_side_track = False
-            old_location = self.side_track_location.name
-            self.side_track_location = None
-            self.waiting_for_train = None
-            self.is_stopped = False
-            self.stop_reason = ""
-            print(f"MAIN TRACK: {self.name} returned from {old_location}")
-
-class DynamicRailwayScheduler:
-    """Railway scheduler with 4-phase progressive delay handling"""
-    
-    def __init__(self):
-        self.trains = []
-        self.track = RailwayTrack()
-        self.current_time = datetime.now().replace(hour=6, minute=0, second=0, microsecond=0)
-        self.simulation_minutes = 0
-        self.delay_events = []
-        self.overtaking_events = []
-        
-    def create_dynamic_schedule(self, train_configs):
-        """Create schedule with dynamic starting order"""
-        shuffled_configs = train_configs.copy()
-        random.shuffle(shuffled_configs)
-        
-        print("=== DYNAMIC TRAIN SCHEDULING ===")
-        print("Trains will start in mixed priority order with 1-hour intervals:")
-        
-        start_time = self.current_time
-        for i, config in enumerate(shuffled_configs):
-            scheduled_time = start_time + timedelta(hours=i)
-            
-            train = Train(
-                config['id'],
-                config['name'],
-                config['priority'],
-                config['speed'],
-                scheduled_time
-            )
-            
-            self.trains.append(train)
-            print(f"  {train.name} (P{train.priority}, {train.base_speed}km/h) -> {scheduled_time.strftime('%H:%M')}")
-        
-        print(f"Total trains scheduled: {len(self.trains)}")
-        return self.trains
-    
-    def simulate_step(self, time_delta_minutes=0.05):
-        """Simulate one time step with 4-phase delay logic"""
-        self.current_time += timedelta(minutes=time_delta_minutes)
-        self.simulation_minutes += time_delta_minutes
-        
-        # Start ready trains
-        for train in self.trains:
-            if train.can_start(self.current_time):
-                train.start_journey(self.current_time)
-                print(f"\n🚀 TRAIN STARTED: {train.name} (P{train.priority}, {train.original_speed}km/h) at {self.current_time.strftime('%H:%M')}")
-        
-        # Handle 4-phase delay consequences
-        self._handle_four_phase_delay_logic()
-        
-        # Handle delay recovery
-        self._handle_delay_recovery()
-        
-        # Handle overtaking logic
-        self._handle_overtaking_logic()
-        
-        # Update all train positions
-        for train in self.trains:
-            if train.has_started and not train.destination_reached:
-                train.update_position(time_delta_minutes, self.track)
-        
-        # Process side track returns
-        self._process_side_track_returns()
-        
-        # Update track occupancy
-        self._update_track_occupancy()
-    
-    def trigger_user_delay(self):
-        """Trigger delay with 4-phase logic"""
-        active_trains = [t for t in self.trains if t.has_started and not t.destination_reached and not t.is_on_side_track]
-        if not active_trains:
-            return None
-        
-        # Select random train for delay
-        delayed_train = random.choice(active_trains)
-        delay_amount = random.randint(15, 45)  # 15-45 minute delay
-        
-        print(f"\n=== USER DELAY TRIGGERED ===")
-        print(f"Train: {delayed_train.name} (Priority {delayed_train.priority})")
-        print(f"Position: {delayed_train.position_km:.1f}km")
-        print(f"Delay: {delay_amount} minutes")
-        
-        # Add the delay
-        delayed_train.add_delay(delay_amount, "User-triggered delay")
-        
-        return delayed_train
-    
-    def _handle_four_phase_delay_logic(self):
-        """NEW: Implement universal 4-phase progressive delay handling with chain reactions"""
-        # Find ALL trains that are currently delayed (including chain delays)
-        delayed_trains = [t for t in self.trains if t.delay_minutes > 0 and t.has_started]
-        
-        for delayed_train in delayed_trains:
-            # Find ALL trains near the delayed train within 50km (regardless of position)
-            approaching_trains = []
-            for t in self.trains:
-                if (t != delayed_train and 
-                    t.has_started and 
-                    not t.destination_reached and
-                    not t.is_on_side_track):
-                    
-                    distance = abs(delayed_train.position_km - t.position_km)
-                    if distance <= 50 and distance > 0:  # Within 50km monitoring range
-                        approaching_trains.append((distance, t))
-            
-            # Sort by distance (closest first)
-            approaching_trains.sort(key=lambda x: x[0])
-            
-            # Apply universal 4-phase logic to each approaching train
-            for distance, approaching_train in approaching_trains:
-                self._apply_four_phase_logic(delayed_train, approaching_train, distance)
-        
-        # NEW: Handle chain reaction delays
-        self._handle_chain_reaction_delays()
-    
-    def _apply_four_phase_logic(self, delayed_train, approaching_train, distance):
-        """NEW: Apply the 4-phase progressive delay logic UNIVERSALLY (regardless of speed)"""
-        
-        # Apply 4-phase logic to ANY train approaching a delayed train
-        # Remove speed condition - works for faster, slower, or equal speed trains
-        
-        # Determine phase based on distance
-        if distance > 35:
-            # Phase 1: Far Away - Monitor Only (50-35km)
-            new_phase = "MONITOR"
-        elif distance > 20:
-            # Phase 2: Getting Closer - Progressive Slowdown (35-20km)
-            new_phase = "PROGRESSIVE"
-        elif distance > 10:
-            # Phase 3: Very Close - Speed Matching (20-10km)
-            new_phase = "SPEED_MATCH"
-        else:
-            # Phase 4: Emergency Zone - Emergency Stop (≤10km)
-            new_phase = "EMERGENCY"
-        
-        # Apply phase if it's different from current phase
-        if approaching_train.current_phase != new_phase or approaching_train.phase_target_train != delayed_train:
-            approaching_train.set_phase(new_phase, distance, delayed_train)
-        
-        # Special handling for Phase 4 - Emergency Stop (UNIVERSAL)
-        if new_phase == "EMERGENCY" and not approaching_train.emergency_stopped:
-            # Calculate collision prediction
-            speed_diff = approaching_train.current_speed - delayed_train.current_speed
-            if speed_diff > 0:
-                time_to_collision = distance / (speed_diff / 60)  # minutes
-            else:
-                time_to_collision = float('inf')
-            
-            print(f"\nUNIVERSAL EMERGENCY ANALYSIS:")
-            print(f"  Approaching train: {approaching_train.name} ({approaching_train.original_speed}km/h)")
-            print(f"  Delayed train: {delayed_train.name} ({delayed_train.original_speed}km/h)")
-            print(f"  Distance: {distance:.1f}km")
-            print(f"  Speed difference: {speed_diff:.1f}km/h")
-            print(f"  Time to collision: {time_to_collision:.1f} minutes")
-            print(f"  Delay remaining: {delayed_train.delay_minutes:.1f} minutes")
-            
-            # Emergency stop with delay inheritance (REGARDLESS of speed relationship)
-            if time_to_collision <= delayed_train.delay_minutes:
-                print(f"  → COLLISION INEVITABLE - Emergency stop + delay inheritance")
-                approaching_train.emergency_stop(delayed_train, f"Collision inevitable with {delayed_train.name}")
-            else:
-                print(f"  → Delay will end in time - maintaining emergency protocols")
-                # Still emergency stop but with possibility of recovery
-                approaching_train.current_speed = 0
-                approaching_train.emergency_stopped = True
-                approaching_train.is_stopped = True
-                approaching_train.stop_reason = f"Emergency hold - {delayed_train.name} delayed"
-    
-    def _handle_chain_reaction_delays(self):
-        """NEW: Handle chain reaction delays - when delayed trains cause other delays"""
-        # Find trains that are delayed due to other trains
-        secondary_delayed_trains = [t for t in self.trains 
-                                  if (t.has_started and 
-                                      not t.destination_reached and
-                                      t.delay_minutes > 0 and
-                                      t.phase_target_train is not None)]
-        
-        for secondary_train in secondary_delayed_trains:
-            # This train is delayed due to another train - now check trains behind IT
-            trains_behind_secondary = []
-            for t in self.trains:
-                if (t != secondary_train and
-                    t.has_started and 
-                    not t.destination_reached and
-                    not t.is_on_side_track and
-                    t != secondary_train.phase_target_train):  # Don't include the original delayed train
-                    
-                    distance = abs(secondary_train.position_km - t.position_km)
-                    if distance <= 50 and distance > 0:
-                        trains_behind_secondary.append((distance, t))
-            
-            # Sort by distance
-            trains_behind_secondary.sort(key=lambda x: x[0])
-            
-            # Apply 4-phase logic for the secondary delayed train
-            for distance, train_behind in trains_behind_secondary:
-                # Treat the secondary delayed train as a delayed train for these followers
-                print(f"\nCHAIN REACTION: {train_behind.name} approaching secondary delayed {secondary_train.name}")
-                self._apply_four_phase_logic(secondary_train, train_behind, distance)
-    
-    def _handle_delay_recovery(self):
-        """Enhanced delay recovery handling with proper speed restoration"""
-        for train in self.trains:
-            # Check if train is in any delay-related phase but the target train is no longer delayed
-            if (train.current_phase != "NORMAL" and 
-                train.phase_target_train and 
-                train.phase_target_train.delay_minutes <= 0):
-                
-                delayed_train = train.phase_target_train
-                distance = abs(delayed_train.position_km - train.position_km)
-                
-                print(f"\nDELAY RECOVERY: {train.name} can potentially resume - {delayed_train.name} no longer delayed")
-                print(f"  Current distance: {distance:.1f}km")
-                print(f"  Current phase: {train.current_phase}")
-                print(f"  Current speed: {train.current_speed}km/h, Original speed: {train.original_speed}km/h")
-                
-                # Recovery logic based on distance
-                if distance > 35:  # Far enough for complete recovery
-                    print(f"  → FULL RECOVERY - Restoring to {train.original_speed}km/h")
-                    train.resume_normal_speed()
-                elif distance > 20:  # Partial recovery
-                    print(f"  → PARTIAL RECOVERY - Gradual speed increase")
-                    train.set_phase("PROGRESSIVE", distance, delayed_train)
-                elif distance > 10:  # Still close, speed matching
-                    print(f"  → CAUTIOUS RECOVERY - Maintaining close monitoring")
-                    train.set_phase("SPEED_MATCH", distance, delayed_train)
-                else:
-                    print(f"  → TOO CLOSE - Maintaining emergency protocols")
-                    # Keep emergency status until more distance
-            
-            # NEW: Handle trains that had their own delay (not due to other trains) and should recover
-            elif (train.delay_minutes <= 0 and 
-                  train.emergency_stopped and 
-                  train.phase_target_train is None):
-                print(f"\nDIRECT DELAY RECOVERY: {train.name} own delay ended - resuming normal speed")
-                train.resume_normal_speed()
-    
-    def _handle_overtaking_logic(self):
-        """Handle normal overtaking when no delays are involved"""
-        active_trains = [t for t in self.trains 
-                        if (t.has_started and 
-                            not t.destination_reached and
-                            not t.is_stopped and
-                            t.delay_minutes <= 0 and
-                            t.current_phase == "NORMAL")]
-        
-        if len(active_trains) < 2:
-            return
-            
-        # Check every pair of trains for overtaking opportunities
-        for i in range(len(active_trains)):
-            for j in range(len(active_trains)):
-                if i == j:
-                    continue
-                    
-                train_behind = active_trains[i]
-                train_ahead = active_trains[j]
-                
-                # Only process if conditions are met for overtaking
-                if (train_behind.position_km < train_ahead.position_km and
-                    train_behind.original_speed > train_ahead.original_speed and
-                    not train_behind.is_on_side_track and
-                    not train_ahead.is_on_side_track):
-                    
-                    distance_gap = train_ahead.position_km - train_behind.position_km
-                    
-                    # When faster train gets within 25km
-                    if distance_gap <= 25 and distance_gap > 0:
-                        # Step 1: Slow down faster train
-                        if not train_behind.is_speed_matched:
-                            print(f"\n🚂 OVERTAKING STEP 1: {train_behind.name} slowing to match {train_ahead.name}")
-                            train_behind.current_speed = train_ahead.current_speed
-                            train_behind.is_speed_matched = True
-                            train_behind.speed_matched_to_train = train_ahead
-                        
-                        # Step 2: Move slower train to side track
-                        if not train_ahead.is_on_side_track:
-                            side_track = self.track.find_next_village_ahead(train_ahead.position_km)
-                            
-                            if side_track and side_track.occupied_side_tracks < side_track.side_tracks:
-                                print(f"\n🛤  OVERTAKING STEP 2: Moving {train_ahead.name} to yellow track at {side_track.name}")
-                                
-                                train_ahead.move_to_side_track(side_track, f"Allowing {train_behind.name} to overtake")
-                                train_ahead.waiting_for_train = train_behind
-                                
-                                # Step 3: Restore faster train's speed
-                                print(f"\n⚡ OVERTAKING STEP 3: {train_behind.name} resuming full speed")
-                                train_behind.resume_normal_speed()
-                                
-                                self.overtaking_events.append({
-                                    'slower_train': train_ahead.name,
-                                    'faster_train': train_behind.name,
-                                    'location': side_track.name,
-                                    'time': self.simulation_minutes
-                                })
-    
-    def _process_side_track_returns(self):
-        """Process trains returning from side tracks"""
-        for train in self.trains:
-            if train.is_on_side_track and train.waiting_for_train and train.side_track_location:
-                faster_train = train.waiting_for_train
-                side_track_pos = train.side_track_location.position_km
-                faster_train_pos = faster_train.position_km
-                buffer_distance = 30  # 30km safety buffer
-                
-                # Check if faster train has passed with buffer
-                required_position = side_track_pos + buffer_distance
-                has_passed = (faster_train_pos > required_position or faster_train.destination_reached)
-                
-                if has_passed:
-                    # Check if main track is clear
-                    main_track_clear = self._is_main_track_clear_at_position(side_track_pos, 15)
-                    
-                    if main_track_clear:
-                        print(f"\n🔄 STEP 4: {train.name} returning from {train.side_track_location.name}")
-                        train.return_to_main_track()
-    
-    def _is_main_track_clear_at_position(self, position_km, buffer_km=20):
-        """Check if main track is clear at given position with buffer"""
-        for train in self.trains:
-            if (train.has_started and 
-                not train.destination_reached and 
-                not train.is_on_side_track and
-                abs(train.position_km - position_km) < buffer_km):
-                return False
-        return True
-    
-    def _update_track_occupancy(self):
-        """Update which trains are in which segments"""
-        # Clear all segments
-        for segment in self.track.segments:
-            segment['trains'] = []
-        
-        # Add active trains to segments
-        for train in self.trains:
-            if train.has_started and not train.destination_reached and not train.is_on_side_track:
-                segment = self.track.get_segment_at_position(train.position_km)
-                if segment:
-                    segment['trains'].append(train)
-    
-    def get_system_status(self):
-        """Get comprehensive system status with chain reaction tracking"""
-        active_trains = [t for t in self.trains if t.has_started and not t.destination_reached]
-        
-        # Count trains in each phase
-        phase_counts = {}
-        for train in active_trains:
-            phase = train.current_phase
-            phase_counts[phase] = phase_counts.get(phase, 0) + 1
-        
-        # Count primary vs secondary delays
-        primary_delays = len([t for t in active_trains if t.delay_minutes > 0 and t.phase_target_train is None])
-        secondary_delays = len([t for t in active_trains if t.delay_minutes > 0 and t.phase_target_train is not None])
-        
-        return {
-            'current_time': self.current_time.strftime('%H:%M:%S'),
-            'simulation_minutes': self.simulation_minutes,
-            'total_trains': len(self.trains),
-            'waiting_to_start': len([t for t in self.trains if not t.has_started]),
-            'active_trains': len(active_trains),
-            'primary_delays': primary_delays,
-            'secondary_delays': secondary_delays,
-            'total_delayed_trains': len([t for t in active_trains if t.delay_minutes > 0 or t.total_delay_accumulated > 0]),
-            'side_track_trains': len([t for t in active_trains if t.is_on_side_track]),
-            'emergency_stopped': len([t for t in active_trains if t.emergency_stopped]),
-            'completed_trains': len([t for t in self.trains if t.destination_reached]),
-            'overtaking_events': len(self.overtaking_events),
-            'phase_counts': phase_counts
-        }
+from src.dynamic_scheduler import DynamicRailwayScheduler
+from src.event_log import EventLog
+from src.trace_recorder import TraceReplay
+from src.simulation_worker import SimulationWorker
 
 class RailwayVisualizer:
     """Visual interface for the 4-phase railway system"""
     
-    def __init__(self, width=1600, height=1000):
+    def __init__(self, width=1600, height=1000, simulation_speed=180):
         pygame.init()
         self.width = width
         self.height = height
+        self.simulation_speed = simulation_speed  # Simulated seconds per real second, independent of frame rate
         self.screen = pygame.display.set_mode((width, height))
         pygame.display.set_caption("4-Phase Railway Delay Handling with Emergency Stop")
         self.clock = pygame.time.Clock()
+        self.event_log = EventLog(echo=True)  # Scheduler events still show on the console
         
         # Initialize fonts
         self.font_small = pygame.font.Font(None, 18)
@@ -714,11 +27,16 @@ class RailwayVisualizer:
         self.track_y = 200
         self.track_height = 300
         self.side_track_spacing = 25
+        self.track_length_km = 400  # Updated from the scheduler's track when drawing
+        
+        # Static layer - title, track network and constant panels, rendered once and blitted every frame
+        self.background = None
+        self.background_key = None  # (screen size, with controls) it was rendered for
+        self.background_segments = None  # Segments of the track it shows - a reset or new track renders it again
+        self.side_track_labels = {}  # (occupied, side_tracks) -> rendered occupancy count
         
     def run_simulation(self):
         """Run the simulation with 4-phase delay logic"""
-        scheduler = DynamicRailwayScheduler()
-        
         # Define trains with variable speeds
         train_configs = [
             {'id': 1, 'name': 'Rajdhani Express', 'priority': 1, 'speed': 130},
@@ -731,93 +49,174 @@ class RailwayVisualizer:
             {'id': 8, 'name': 'Goods Train Slow', 'priority': 4, 'speed': 50}
         ]
         
-        scheduler.create_dynamic_schedule(train_configs)
+        def build_scheduler():
+            scheduler = DynamicRailwayScheduler(event_log=self.event_log)
+            scheduler.create_dynamic_schedule(train_configs)
+            return scheduler
         
+        # The scheduler steps on its own thread - frames only draw its latest snapshot
+        worker = SimulationWorker(build_scheduler, speed=self.simulation_speed).start()
         running = True
-        paused = False
-        simulation_speed = 0.05
         
         print("\n" + "="*80)
         print("4-PHASE RAILWAY DELAY HANDLING WITH EMERGENCY STOP")
-        print("Press D to trigger delays, SPACE to pause, R to reset")
+        print("Press D to trigger delays, SPACE to pause, R to reset, UP/DOWN for speed")
         print("Phase 4: Emergency Stop at ≤10km with speed = 0")
         print("="*80)
         
+        try:
+            while running:
+                # Handle events
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        running = False
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_d:
+                            worker.send('delay')
+                        elif event.key == pygame.K_SPACE:
+                            worker.send('pause')
+                        elif event.key == pygame.K_r:
+                            worker.send('reset')
+                        elif event.key == pygame.K_UP:
+                            worker.send('speed', worker.speed * 2)
+                        elif event.key == pygame.K_DOWN:
+                            worker.send('speed', worker.speed / 2)
+                        elif event.key == pygame.K_ESCAPE:
+                            running = False
+                
+                snapshot = worker.snapshot
+                
+                # Static layer, then everything that changes
+                self._draw_background(snapshot.track)
+                self._draw_time(snapshot)
+                self._draw_railway_network(snapshot)
+                self._draw_system_status(snapshot)
+                self._draw_train_details(snapshot)
+                
+                # Update display
+                pygame.display.flip()
+                self.clock.tick(60)
+        finally:
+            worker.stop()
+            
+        pygame.quit()
+        sys.exit()
+    
+    def run_replay(self, trace_dir):
+        """Play back a run recorded with TraceRecorder - no simulation, any speed"""
+        replay = TraceReplay(trace_dir)
+        running = True
+        paused = False
+        playback_speed = 0.05  # Recorded minutes per frame
+        
+        print("\n" + "="*80)
+        print(f"REPLAY: {trace_dir} ({replay.duration_minutes:.0f} min recorded)")
+        print("SPACE to pause, LEFT/RIGHT to seek 30 min, UP/DOWN for speed, HOME to restart")
+        print("="*80)
+        
         while running:
-            # Handle events
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_d:
-                        delayed_train = scheduler.trigger_user_delay()
-                        if delayed_train:
-                            print(f"User triggered delay on {delayed_train.name}")
-                    elif event.key == pygame.K_SPACE:
+                    if event.key == pygame.K_SPACE:
                         paused = not paused
-                        print("Simulation paused" if paused else "Simulation resumed")
-                    elif event.key == pygame.K_r:
-                        scheduler = DynamicRailwayScheduler()
-                        scheduler.create_dynamic_schedule(train_configs)
-                        print("Simulation reset")
+                    elif event.key == pygame.K_RIGHT:
+                        replay.seek(replay.simulation_minutes + 30)
+                    elif event.key == pygame.K_LEFT:
+                        replay.seek(replay.simulation_minutes - 30)
+                    elif event.key == pygame.K_UP:
+                        playback_speed *= 2
+                        print(f"Playback: {playback_speed:.2f} min/frame")
+                    elif event.key == pygame.K_DOWN:
+                        playback_speed /= 2
+                        print(f"Playback: {playback_speed:.2f} min/frame")
+                    elif event.key == pygame.K_HOME:
+                        replay.seek(0)
                     elif event.key == pygame.K_ESCAPE:
                         running = False
             
-            # Update simulation
             if not paused:
-                scheduler.simulate_step(simulation_speed)
-            
-            # Clear screen
-            self.screen.fill((245, 245, 220))
+                replay.simulate_step(playback_speed)
             
-            # Draw everything
-            self._draw_title_and_time(scheduler)
-            self._draw_railway_network(scheduler)
-            self._draw_system_status(scheduler)
-            self._draw_train_details(scheduler)
-            self._draw_phase_rules_panel()
-            self._draw_controls()
+            self._draw_background(replay.track, controls=False)
+            self._draw_time(replay)
+            self._draw_railway_network(replay)
+            self._draw_system_status(replay)
+            self._draw_train_details(replay)
             
-            # Update display
             pygame.display.flip()
             self.clock.tick(60)
             
         pygame.quit()
         sys.exit()
     
-    def _draw_title_and_time(self, scheduler):
-        """Draw title and current time"""
-        title = self.font_large.render("4-Phase Railway Delay Handling with Emergency Stop", True, (0, 0, 100))
-        self.screen.blit(title, (50, 20))
-        
+    def _draw_background(self, track, controls=True):
+        """Blit the static layer, rendering it again only when the window size or track changes"""
+        key = (self.screen.get_size(), controls)
+        if self.background is None or key != self.background_key or track.segments is not self.background_segments:
+            self.track_length_km = track.total_length_km
+            self.background = pygame.Surface(key[0]).convert()
+            self.background.fill((245, 245, 220))
+            title = self.font_large.render("4-Phase Railway Delay Handling with Emergency Stop", True, (0, 0, 100))
+            self.background.blit(title, (50, 20))
+            self._draw_track_layout(self.background, track)
+            self._draw_phase_rules_panel(self.background)
+            if controls:
+                self._draw_controls(self.background)
+            self.background_key = key
+            self.background_segments = track.segments  # Held, not just compared by id, so a new track always differs
+        self.screen.blit(self.background, (0, 0))
+    
+    def _draw_time(self, scheduler):
+        """Draw current time"""
         status = scheduler.get_system_status()
         time_text = self.font_medium.render(f"Time: {status['current_time']} | Simulation: {status['simulation_minutes']:.1f} min", True, (100, 0, 0))
         self.screen.blit(time_text, (50, 50))
     
     def _draw_railway_network(self, scheduler):
-        """Draw the railway network with trains"""
+        """Draw side track occupancy and trains over the static track layout"""
         track = scheduler.track
+        self.track_length_km = track.total_length_km
         
+        # Side track status
+        for location in track.locations:
+            if location.side_tracks > 0:
+                key = (location.occupied_side_tracks, location.side_tracks)
+                status = self.side_track_labels.get(key)
+                if status is None:
+                    status_color = (255, 0, 0) if location.occupied_side_tracks == location.side_tracks else (0, 100, 0)
+                    status = self.side_track_labels[key] = self.font_small.render(f"{key[0]}/{key[1]}", True, status_color)
+                x = self._position_to_pixel(location.position_km)
+                self.screen.blit(status, (x - 10, self.track_y + 40 + location.side_tracks * self.side_track_spacing))
+        
+        # Draw trains
+        for train in scheduler.trains:
+            if train.has_started:
+                self._draw_train(train)
+    
+    def _draw_track_layout(self, surface, track):
+        """Draw track segments, locations and side tracks - the parts that never move"""
         # Draw track segments
         for segment in track.segments:
-            start_x = self._position_to_pixel(segment['start_km'])
-            end_x = self._position_to_pixel(segment['end_km'])
+            start_x = self._position_to_pixel(segment.start_km)
+            end_x = self._position_to_pixel(segment.end_km)
             
-            if segment['has_double_track']:
+            if segment.has_double_track:
                 # Double track - two parallel lines
-                pygame.draw.line(self.screen, (0, 0, 0), (start_x, self.track_y - 8), (end_x, self.track_y - 8), 4)
-                pygame.draw.line(self.screen, (0, 0, 0), (start_x, self.track_y + 8), (end_x, self.track_y + 8), 4)
+                pygame.draw.line(surface, (0, 0, 0), (start_x, self.track_y - 8), (end_x, self.track_y - 8), 4)
+                pygame.draw.line(surface, (0, 0, 0), (start_x, self.track_y + 8), (end_x, self.track_y + 8), 4)
                 # Label
                 mid_x = (start_x + end_x) // 2
                 label = self.font_small.render("Double", True, (0, 100, 0))
-                self.screen.blit(label, (mid_x - 15, self.track_y - 35))
+                surface.blit(label, (mid_x - 15, self.track_y - 35))
             else:
                 # Single track
-                pygame.draw.line(self.screen, (150, 0, 0), (start_x, self.track_y), (end_x, self.track_y), 5)
+                pygame.draw.line(surface, (150, 0, 0), (start_x, self.track_y), (end_x, self.track_y), 5)
                 # Label
                 mid_x = (start_x + end_x) // 2
                 label = self.font_small.render("Single", True, (150, 0, 0))
-                self.screen.blit(label, (mid_x - 15, self.track_y + 25))
+                surface.blit(label, (mid_x - 15, self.track_y + 25))
         
         # Draw locations and side tracks
         for location in track.locations:
@@ -826,31 +225,19 @@ class RailwayVisualizer:
             # Location marker
             size = 15 if location.type == 'city' else (12 if location.type == 'town' else 8)
             color = (0, 0, 200) if location.type == 'city' else ((0, 150, 0) if location.type == 'town' else (100, 100, 0))
-            pygame.draw.circle(self.screen, color, (x, self.track_y), size)
+            pygame.draw.circle(surface, color, (x, self.track_y), size)
             
             # Location name
             name = self.font_small.render(location.name, True, (0, 0, 0))
-            self.screen.blit(name, (x - 25, self.track_y - 50))
+            surface.blit(name, (x - 25, self.track_y - 50))
             
             # Side tracks (yellow tracks)
-            if location.side_tracks > 0:
-                for i in range(location.side_tracks):
-                    side_y = self.track_y + 40 + (i * self.side_track_spacing)
-                    pygame.draw.line(self.screen, (255, 255, 0), (x - 25, side_y), (x + 25, side_y), 3)
-                    # Connection lines
-                    pygame.draw.line(self.screen, (150, 150, 0), (x - 15, self.track_y + 15), (x - 15, side_y), 2)
-                    pygame.draw.line(self.screen, (150, 150, 0), (x + 15, self.track_y + 15), (x + 15, side_y), 2)
-                
-                # Side track status
-                status_text = f"{location.occupied_side_tracks}/{location.side_tracks}"
-                status_color = (255, 0, 0) if location.occupied_side_tracks == location.side_tracks else (0, 100, 0)
-                status = self.font_small.render(status_text, True, status_color)
-                self.screen.blit(status, (x - 10, self.track_y + 40 + location.side_tracks * self.side_track_spacing))
-        
-        # Draw trains
-        for train in scheduler.trains:
-            if train.has_started:
-                self._draw_train(train)
+            for i in range(location.side_tracks):
+                side_y = self.track_y + 40 + (i * self.side_track_spacing)
+                pygame.draw.line(surface, (255, 255, 0), (x - 25, side_y), (x + 25, side_y), 3)
+                # Connection lines
+                pygame.draw.line(surface, (150, 150, 0), (x - 15, self.track_y + 15), (x - 15, side_y), 2)
+                pygame.draw.line(surface, (150, 150, 0), (x + 15, self.track_y + 15), (x + 15, side_y), 2)
     
     def _draw_train(self, train):
         """Draw individual train with 4-phase status indicators"""
@@ -1048,16 +435,16 @@ class RailwayVisualizer:
             no_trains = self.font_small.render("No active trains", True, (100, 100, 100))
             self.screen.blit(no_trains, (panel_x + 20, panel_y + 50))
     
-    def _draw_phase_rules_panel(self):
+    def _draw_phase_rules_panel(self, surface):
         """Draw the universal 4-phase rules with chain reaction logic"""
         panel_x, panel_y = 900, 550
         panel_width, panel_height = 350, 200
         
-        pygame.draw.rect(self.screen, (255, 255, 255), (panel_x, panel_y, panel_width, panel_height), border_radius=10)
-        pygame.draw.rect(self.screen, (0, 0, 0), (panel_x, panel_y, panel_width, panel_height), 2, border_radius=10)
+        pygame.draw.rect(surface, (255, 255, 255), (panel_x, panel_y, panel_width, panel_height), border_radius=10)
+        pygame.draw.rect(surface, (0, 0, 0), (panel_x, panel_y, panel_width, panel_height), 2, border_radius=10)
         
         title = self.font_medium.render("UNIVERSAL + CHAIN REACTIONS", True, (0, 100, 200))
-        self.screen.blit(title, (panel_x + 15, panel_y + 15))
+        surface.blit(title, (panel_x + 15, panel_y + 15))
         
         rules = [
             "UNIVERSAL 4-PHASE LOGIC:",
@@ -1092,24 +479,25 @@ class RailwayVisualizer:
                 color = (0, 0, 0)
             
             text = self.font_small.render(rule, True, color)
-            self.screen.blit(text, (panel_x + 15, panel_y + 45 + i * 11))
+            surface.blit(text, (panel_x + 15, panel_y + 45 + i * 11))
     
-    def _draw_controls(self):
+    def _draw_controls(self, surface):
         """Draw control instructions"""
         panel_x, panel_y = 1300, 550
         panel_width, panel_height = 250, 200
         
-        pygame.draw.rect(self.screen, (255, 255, 255), (panel_x, panel_y, panel_width, panel_height), border_radius=10)
-        pygame.draw.rect(self.screen, (0, 0, 0), (panel_x, panel_y, panel_width, panel_height), 2, border_radius=10)
+        pygame.draw.rect(surface, (255, 255, 255), (panel_x, panel_y, panel_width, panel_height), border_radius=10)
+        pygame.draw.rect(surface, (0, 0, 0), (panel_x, panel_y, panel_width, panel_height), 2, border_radius=10)
         
         title = self.font_medium.render("CONTROLS", True, (0, 100, 200))
-        self.screen.blit(title, (panel_x + 15, panel_y + 15))
+        surface.blit(title, (panel_x + 15, panel_y + 15))
         
         controls = [
             "D - Trigger Random Delay",
             "   (Test universal logic)",
             "SPACE - Pause/Resume",
             "R - Reset Simulation",
+            "UP/DOWN - Simulation Speed",
             "ESC - Quit",
             "",
             "UNIVERSAL SYSTEM:",
@@ -1150,12 +538,12 @@ class RailwayVisualizer:
                 color = (0, 0, 0)
             
             text = self.font_small.render(control, True, color)
-            self.screen.blit(text, (panel_x + 15, panel_y + 45 + i * 10))
+            surface.blit(text, (panel_x + 15, panel_y + 45 + i * 10))
     
     def _position_to_pixel(self, position_km):
         """Convert km position to pixel coordinate"""
         track_width = self.width - 100
-        return int(50 + (position_km / 400) * track_width)
+        return int(50 + (position_km / self.track_length_km) * track_width)
 
 # Main execution
 if __name__ == "__main__":
@@ -1204,13 +592,17 @@ if __name__ == "__main__":
     print("- D: Trigger random delay (test all scenarios)")
     print("- SPACE: Pause/Resume simulation")
     print("- R: Reset simulation")
+    print("- UP/DOWN: Double/halve simulation speed")
     print("- ESC: Quit")
     print()
     print("="*80)
     
     try:
         visualizer = RailwayVisualizer()
-        visualizer.run_simulation()
+        if len(sys.argv) > 2 and sys.argv[1] == "--replay":
+            visualizer.run_replay(sys.argv[2])
+        else:
+            visualizer.run_simulation()
     except KeyboardInterrupt:
         print("\nSimulation interrupted")
     except Exception as e:
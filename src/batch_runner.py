@@ -0,0 +1,266 @@
+import sys
+import json
+import math
+import time
+import argparse
+from datetime import timedelta
+from src.config import Config
+from src.dynamic_scheduler import DynamicRailwayScheduler
+from src.event_log import EventLog, FileSink, LEVEL_NAMES, INFO
+from src.checkpoint import save_checkpoint, load_checkpoint
+from src.trace_recorder import TraceRecorder
+from src.lookahead_optimizer import LookaheadOptimizer
+from src.step_profiler import StepProfiler, format_report
+from src.metrics_server import MetricsServer
+from src.timetable_loader import TimetableLoader, TimetableFeeder
+
+class BatchRunner:
+    """Headless DynamicRailwayScheduler run - no display, no frame cap"""
+
+    def __init__(self, train_configs, delay_schedule=None, engine="object", step_minutes=0.05, seed=None,
+                 verbose=False, event_driven=False, log_file=None, log_level=INFO, shuffle=True,
+                 resume_from=None, checkpoint_file=None, trace_dir=None, lookahead_budget_ms=None,
+                 profile=False, metrics_port=None, timetable=None, timetable_lead_minutes=15):
+        self.train_configs = train_configs
+        self.delay_schedule = sorted(delay_schedule or [], key=lambda d: d['minute'])
+        self.engine = engine
+        self.step_minutes = step_minutes
+        self.seed = seed
+        self.verbose = verbose
+        self.event_driven = event_driven
+        self.log_file = log_file
+        self.log_level = log_level
+        self.shuffle = shuffle
+        self.resume_from = resume_from  # Checkpoint to continue from instead of scheduling train_configs
+        self.checkpoint_file = checkpoint_file  # Save the final state here
+        self.trace_dir = trace_dir  # Record every step's train state here (see TraceReplay)
+        self.lookahead_budget_ms = lookahead_budget_ms  # Run the lookahead optimizer on each delay with this budget
+        self.profile = profile  # Time each simulate_step stage and add the report to the summary
+        self.metrics_port = metrics_port  # Serve live Prometheus metrics on this localhost port during the run
+        if timetable and trace_dir:
+            raise ValueError("A trace records a fixed set of trains and cannot follow a timetable")
+        self.timetable = timetable  # CSV streamed in as the day goes, on top of train_configs
+        self.timetable_lead_minutes = timetable_lead_minutes
+
+    def run(self, until_minutes):
+        """Advance the simulation to until_minutes and return summary metrics"""
+        event_log = EventLog(level=self.log_level, echo=self.verbose,
+                             sink=FileSink(self.log_file) if self.log_file else None)
+        trace = None
+        metrics = None
+        try:
+            if self.resume_from:
+                scheduler = load_checkpoint(self.resume_from, event_log=event_log, engine=self.engine)
+            else:
+                scheduler = DynamicRailwayScheduler(engine=self.engine, event_log=event_log, seed=self.seed)
+                if self.train_configs:
+                    scheduler.create_dynamic_schedule(self.train_configs, shuffle=self.shuffle)
+            feeder = None
+            if self.timetable:
+                # Timetable trains only exist from shortly before departure until they are retired
+                day_start = scheduler.current_time - timedelta(minutes=scheduler.simulation_minutes)
+                feeder = TimetableFeeder(scheduler, TimetableLoader(self.timetable, day_start),
+                                         lead_minutes=self.timetable_lead_minutes)
+            if self.lookahead_budget_ms is not None:
+                scheduler.optimizer = LookaheadOptimizer(budget_ms=self.lookahead_budget_ms)
+            if self.profile:
+                scheduler.profiler = StepProfiler()
+            step = int(round(scheduler.simulation_minutes / self.step_minutes))  # 0 unless resuming
+            # Delays scripted before a resumed checkpoint already happened in the run that wrote it.
+            # Timetable trains are looked up when their delay is due, as they may not exist yet.
+            pending = [(entry, None if feeder else self._find_train(scheduler, entry)) for entry in self.delay_schedule
+                       if self._delay_step(entry) >= step]
+            applied, skipped = [], []
+
+            total_steps = int(round(until_minutes / self.step_minutes))
+            if self.trace_dir:
+                trace = TraceRecorder(self.trace_dir, scheduler, capacity=max(total_steps - step, 0) + 1)
+                trace.record(step)
+            if self.metrics_port is not None:
+                metrics = MetricsServer(self.metrics_port).start()
+                metrics.publish(scheduler)
+            calls = 0
+            started = time.perf_counter()
+            while step < total_steps:
+                # Scripted delays replace the D key of the visualizer
+                if feeder is not None:
+                    feeder.update()
+                while pending and self._delay_step(pending[0][0]) <= step:
+                    entry, train = pending.pop(0)
+                    if entry.get('candidates') is not None:
+                        train = self._first_running(scheduler, entry['candidates'])
+                        if train is None:
+                            skipped.append(entry)
+                            continue
+                    elif feeder is not None and entry.get('train') is not None:
+                        train = self._find_train(scheduler, entry, missing_ok=True)
+                        if train is None:
+                            skipped.append(entry)
+                            continue
+                    delayed_train = scheduler.trigger_user_delay(train, entry.get('delay'))
+                    if delayed_train:
+                        applied.append({'minute': entry['minute'], 'train': delayed_train.name,
+                                        'delay': delayed_train.delay_minutes})
+                    else:
+                        skipped.append(entry)
+
+                step_started = time.perf_counter_ns() if metrics is not None else 0
+                if self.event_driven:
+                    # Never jump past the next scripted delay or the end of the run
+                    next_stop = min([total_steps] + [self._delay_step(entry) for entry, _ in pending[:1]])
+                    if feeder is not None and not math.isinf(feeder.next_update_minute()):
+                        next_stop = min(next_stop, self._delay_step({'minute': feeder.next_update_minute()}))
+                    covered = scheduler.simulate_event_step(self.step_minutes, next_stop - step)
+                else:
+                    scheduler.simulate_step(self.step_minutes)
+                    covered = 1
+                step += covered
+                calls += 1
+                if metrics is not None:
+                    metrics.observe_step(time.perf_counter_ns() - step_started, covered)
+                    metrics.publish(scheduler)
+                if trace is not None:
+                    trace.record(step)
+            wall_seconds = time.perf_counter() - started
+            scheduler.sync_trains()
+            if self.checkpoint_file:
+                save_checkpoint(scheduler, self.checkpoint_file)
+        finally:
+            if metrics is not None:
+                metrics.stop()
+            if trace is not None:
+                trace.close()
+            event_log.close()
+
+        summary = self._summarize(scheduler, calls, wall_seconds, applied, skipped + [e for e, _ in pending])
+        summary['timetable'] = feeder.report() if feeder is not None else None
+        return summary
+
+    def _delay_step(self, entry):
+        """Fixed step at which a scripted delay is injected"""
+        return math.ceil(entry['minute'] / self.step_minutes - 0.5)
+
+    def _find_train(self, scheduler, entry, missing_ok=False):
+        """Resolve a delay entry's train by name or id (None means a random running train)"""
+        ref = entry.get('train')
+        if ref is None:
+            return None
+        for train in scheduler.trains:
+            if train.name == ref or train.id == ref:
+                return train
+        if missing_ok:
+            return None
+        raise ValueError(f"Unknown train in delay schedule: {ref}")
+
+    def _first_running(self, scheduler, refs):
+        """First train of refs (names or ids) running on the main line, or None"""
+        scheduler.sync_trains()
+        for ref in refs:
+            for train in scheduler.trains:
+                if ((train.name == ref or train.id == ref) and train.has_started and
+                        not train.destination_reached and not train.is_on_side_track):
+                    return train
+        return None
+
+    def _summarize(self, scheduler, steps, wall_seconds, applied, skipped):
+        """Collect summary metrics for the finished run"""
+        # Retired timetable trains are gone from scheduler.trains but still count towards the day
+        records = scheduler.retired_records + [t.record() for t in scheduler.trains]
+        delays = [record['total_delay_minutes'] for record in records]
+        primary = [e for e in scheduler.delay_events if e['type'] == 'primary']
+        secondary = [e for e in scheduler.delay_events if e['type'] == 'secondary']
+        return {
+            'engine': self.engine,
+            'event_driven': self.event_driven,
+            'seed': self.seed,
+            'step_minutes': self.step_minutes,
+            'simulated_minutes': scheduler.simulation_minutes,
+            'steps': steps,
+            'wall_seconds': wall_seconds,
+            'steps_per_second': steps / wall_seconds if wall_seconds > 0 else None,
+            'status': scheduler.get_system_status(),
+            'total_delay_minutes': sum(delays),
+            'max_delay_minutes': max(delays, default=0),
+            'primary_delay_count': len(primary),
+            'secondary_delay_count': len(secondary),
+            'secondary_delay_minutes': sum(e['minutes'] for e in secondary),
+            'overtaking_events': len(scheduler.overtaking_events),
+            'delays_applied': applied,
+            'delays_skipped': skipped,
+            'lookahead': scheduler.optimizer_reports,
+            'profile': scheduler.profiler.report() if scheduler.profiler is not None else None,
+            'trains': records
+        }
+
+def load_json(path):
+    """Read a JSON config file"""
+    with open(path) as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the 4-phase railway scheduler headless")
+    parser.add_argument('trains', nargs='?', help="JSON file with a list of train configs (id, name, priority, speed)")
+    parser.add_argument('--until', type=float, default=Config.SIMULATION_TIME,
+                        help="Simulated minute to run to, counted from the original start (default: one day)")
+    parser.add_argument('--delays', help="JSON file with scripted delays: [{minute, train? or candidates?, delay?}]")
+    parser.add_argument('--output', help="Write summary metrics to this JSON file instead of stdout")
+    parser.add_argument('--engine', choices=["object", "vectorized", "auto"], default="object")
+    parser.add_argument('--step', type=float, default=0.05, help="Simulated minutes per step")
+    parser.add_argument('--event-driven', action='store_true', help="Jump between events instead of stepping every tick")
+    parser.add_argument('--seed', type=int, help="Seed for the start order shuffle and random delays")
+    parser.add_argument('--fixed-order', action='store_true', help="Start trains in config order instead of shuffling")
+    parser.add_argument('--verbose', action='store_true', help="Print scheduler events to the console")
+    parser.add_argument('--log-file', help="Append scheduler events to this file")
+    parser.add_argument('--log-level', choices=list(LEVEL_NAMES.values()), default="INFO")
+    parser.add_argument('--checkpoint', help="Save the final scheduler state to this file")
+    parser.add_argument('--resume', help="Continue from a checkpoint file instead of starting the trains file")
+    parser.add_argument('--trace', help="Record every step's train state into this directory for replay")
+    parser.add_argument('--lookahead', type=float, metavar='MS',
+                        help="Answer each delay with the lookahead optimizer, searching for at most MS milliseconds")
+    parser.add_argument('--timetable', metavar='CSV',
+                        help="Stream trains from a timetable CSV (id, name, priority, speed, departure HH:MM)")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics while the run lasts")
+    parser.add_argument('--profile', action='store_true',
+                        help="Time each simulate_step stage, add the report to the summary and print it to stderr")
+    args = parser.parse_args(argv)
+    if not args.trains and not args.resume and not args.timetable:
+        parser.error("a trains file is required unless --resume or --timetable is given")
+    if args.resume and args.timetable:
+        parser.error("--timetable starts a new day and cannot be combined with --resume")
+    if args.trace and args.timetable:
+        parser.error("--trace records a fixed set of trains and cannot be combined with --timetable")
+
+    runner = BatchRunner(
+        load_json(args.trains) if args.trains else None,
+        load_json(args.delays) if args.delays else None,
+        engine=args.engine,
+        step_minutes=args.step,
+        seed=args.seed,
+        verbose=args.verbose,
+        event_driven=args.event_driven,
+        log_file=args.log_file,
+        log_level={name: level for level, name in LEVEL_NAMES.items()}[args.log_level],
+        shuffle=not args.fixed_order,
+        resume_from=args.resume,
+        checkpoint_file=args.checkpoint,
+        trace_dir=args.trace,
+        lookahead_budget_ms=args.lookahead,
+        profile=args.profile,
+        metrics_port=args.metrics_port,
+        timetable=args.timetable
+    )
+    summary = runner.run(args.until)
+    if args.profile:
+        print(format_report(summary['profile']), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"✅ Simulated {summary['simulated_minutes']:.0f} min in {summary['steps']} steps, "
+              f"{summary['wall_seconds']:.2f}s -> {args.output}")
+    else:
+        print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
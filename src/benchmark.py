@@ -0,0 +1,241 @@
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import subprocess
+import tracemalloc
+import contextlib
+import numpy as np
+from datetime import datetime
+from src.dynamic_scheduler import DynamicRailwayScheduler
+from src.batch_runner import load_json
+
+DEFAULT_SIZES = [8, 100, 1000, 10000]
+STEP_MINUTES = 0.05
+TRACKS = ['main_line', 'loop_line', 'express_line']
+
+class SchedulerBenchmark:
+    """Latency and memory of the scheduler hot paths at growing train counts"""
+
+    def __init__(self, train_configs, sizes=None, engine="object", repeats=50, budget_seconds=10.0,
+                 settle_limit=200, perceive_limit=100, seed=0):
+        self.train_configs = train_configs
+        self.sizes = sizes or DEFAULT_SIZES
+        self.engine = engine
+        self.repeats = repeats
+        self.budget_seconds = budget_seconds  # Stop sampling a case after this long (at least one sample)
+        self.settle_limit = settle_limit
+        self.perceive_limit = perceive_limit  # perceive_environment scans all train pairs - O(n^2)
+        self.seed = seed
+        self._agent_models = None
+        self._delay_builds = 0
+
+    def run(self):
+        """Run every benchmark at every size"""
+        results = []
+        for size in self.sizes:
+            results.append(self._measure("simulate_step", size, self.build_scheduler,
+                                         lambda s: s.simulate_step(STEP_MINUTES)))
+            results.append(self._measure("trigger_user_delay_settle", size, self._build_delay_scheduler,
+                                         self._delay_and_settle, fresh_state=True))
+            results.append(self._measure("get_system_status", size, self.build_scheduler,
+                                         lambda s: s.get_system_status()))
+            results.append(self._measure_perceive(size))
+        return {'meta': self._metadata(), 'results': results}
+
+    def build_scheduler(self, size):
+        """Scheduler with size trains already running, spread along the line"""
+        rng = random.Random(self.seed)
+        configs = [dict(self.train_configs[i % len(self.train_configs)], id=i + 1) for i in range(size)]
+        for i, config in enumerate(configs):
+            config['name'] = f"{config['name']} #{i + 1}"
+
+        scheduler = DynamicRailwayScheduler(engine=self.engine, seed=self.seed)
+        scheduler.create_dynamic_schedule(configs, shuffle=False)
+        for train in scheduler.trains:
+            train.scheduled_start = scheduler.current_time
+            train.start_journey(scheduler.current_time)
+            train.position_km = rng.uniform(0, scheduler.track.total_length_km - 1)
+        scheduler.rebuild_indexes()  # Positions were written directly - bring every index and the engine in line
+        return scheduler
+
+    def _build_delay_scheduler(self, size):
+        """Untouched scheduler for one rescheduling sample - each build delays a different random train"""
+        scheduler = self.build_scheduler(size)
+        self._delay_builds += 1
+        scheduler.rng.seed(self.seed + self._delay_builds)
+        return scheduler
+
+    def _delay_and_settle(self, scheduler):
+        """Rescheduling latency: trigger_user_delay, then step until the phase counts stop changing"""
+        scheduler.trigger_user_delay()
+        previous = scheduler.get_system_status()['phase_counts']
+        for steps in range(1, self.settle_limit + 1):
+            scheduler.simulate_step(STEP_MINUTES)
+            current = scheduler.get_system_status()['phase_counts']
+            if current == previous:
+                return steps
+            previous = current
+        return self.settle_limit
+
+    def _measure_perceive(self, size):
+        """IntelligentAgent.perceive_environment over a SlowRailwaySimulator fleet"""
+        name = "perceive_environment"
+        if size > self.perceive_limit:
+            return {'benchmark': name, 'trains': size, 'skipped': f"above perceive limit ({self.perceive_limit} trains)"}
+        try:
+            from src.railway_simulator import SlowRailwaySimulator
+            from src.intelligent_agent import IntelligentAgent
+            agent = IntelligentAgent(*self._load_agent_models())
+        except ImportError as e:
+            return {'benchmark': name, 'trains': size, 'skipped': f"missing dependency: {e.name}"}
+
+        def build(size):
+            rng = random.Random(self.seed)
+            simulator = SlowRailwaySimulator()
+            for i in range(size):
+                config = self.train_configs[i % len(self.train_configs)]
+                simulator.add_train_with_schedule(dict(config, id=i + 1, name=f"{config['name']} #{i + 1}",
+                                                       station=simulator.stations[0], track=TRACKS[i % len(TRACKS)]))
+            for train in simulator.trains:
+                train.has_started = True
+                train.position = rng.uniform(0, 0.98)
+            return {'current_time': simulator.current_time, 'trains': simulator.trains}
+
+        return self._measure(name, size, build, agent.perceive_environment)
+
+    def _load_agent_models(self):
+        """Delay and conflict models from models/ (loaded once, their messages kept off stdout)"""
+        if self._agent_models is None:
+            from src.delay_predictor import DelayPredictor
+            from src.conflict_detector import ConflictDetector
+            delay_predictor, conflict_detector = DelayPredictor(), ConflictDetector()
+            with contextlib.redirect_stdout(sys.stderr):
+                delay_predictor.load_model()
+                conflict_detector.load_model()
+            self._agent_models = (delay_predictor, conflict_detector)
+        return self._agent_models
+
+    def _measure(self, name, size, build, operation, fresh_state=False):
+        """Time operation on a freshly built state; memory comes from a separate traced warm-up call
+
+        With fresh_state every sample gets a newly built state (built outside the timing), for operations
+        whose effects would otherwise pile up from one sample into the next.
+        """
+        tracemalloc.start()
+        state = build(size)
+        model_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        operation(state)
+        peak_bytes = tracemalloc.get_traced_memory()[1] - model_bytes
+        tracemalloc.stop()
+
+        samples, outputs = [], []
+        deadline = time.perf_counter() + self.budget_seconds
+        while len(samples) < self.repeats and (not samples or time.perf_counter() < deadline):
+            if fresh_state:
+                state = build(size)
+            started = time.perf_counter()
+            output = operation(state)
+            samples.append(time.perf_counter() - started)
+            outputs.append(output)
+
+        latency_ms = np.array(samples) * 1000
+        record = {
+            'benchmark': name,
+            'trains': size,
+            'samples': len(samples),
+            'p50_ms': round(float(np.percentile(latency_ms, 50)), 4),
+            'p99_ms': round(float(np.percentile(latency_ms, 99)), 4),
+            'mean_ms': round(float(latency_ms.mean()), 4),
+            'max_ms': round(float(latency_ms.max()), 4),
+            'model_bytes': model_bytes,
+            'peak_bytes': max(0, peak_bytes)
+        }
+        if name == "trigger_user_delay_settle":
+            record['settle_steps_max'] = max(outputs)
+        return record
+
+    def _metadata(self):
+        """Run context, so result files from different versions can be compared"""
+        try:
+            revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                      text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            revision = None
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': revision,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'engine': self.engine,
+            'step_minutes': STEP_MINUTES,
+            'repeats': self.repeats,
+            'seed': self.seed
+        }
+
+def compare_results(results, baseline, tolerance=1.2):
+    """Benchmarks whose p50 latency grew by more than tolerance against a baseline run"""
+    previous = {(r['benchmark'], r['trains']): r for r in baseline['results'] if 'p50_ms' in r}
+    regressions = []
+    for record in results['results']:
+        old = previous.get((record['benchmark'], record['trains']))
+        if old is None or 'p50_ms' not in record or old['p50_ms'] <= 0:
+            continue
+        ratio = record['p50_ms'] / old['p50_ms']
+        if ratio > tolerance:
+            regressions.append({'benchmark': record['benchmark'], 'trains': record['trains'],
+                                'baseline_p50_ms': old['p50_ms'], 'p50_ms': record['p50_ms'], 'ratio': round(ratio, 3)})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scheduler step, rescheduling and status latency")
+    parser.add_argument('trains', help="JSON file with train configs, repeated to reach each fleet size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Fleet sizes to benchmark")
+    parser.add_argument('--engine', choices=["object", "vectorized", "auto"], default="object")
+    parser.add_argument('--repeats', type=int, default=50, help="Samples per benchmark and size")
+    parser.add_argument('--budget', type=float, default=10.0, help="Max seconds of sampling per benchmark and size")
+    parser.add_argument('--perceive-limit', type=int, default=100, help="Largest fleet for perceive_environment")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results to this JSON file instead of stdout")
+    parser.add_argument('--baseline', help="Earlier results file to check for latency regressions")
+    parser.add_argument('--tolerance', type=float, default=1.2, help="Allowed p50 slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    benchmark = SchedulerBenchmark(
+        load_json(args.trains),
+        sizes=args.sizes,
+        engine=args.engine,
+        repeats=args.repeats,
+        budget_seconds=args.budget,
+        perceive_limit=args.perceive_limit,
+        seed=args.seed
+    )
+    results = benchmark.run()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        for record in results['results']:
+            if 'skipped' in record:
+                print(f"  {record['benchmark']:<26} {record['trains']:>6} trains  skipped: {record['skipped']}")
+            else:
+                print(f"  {record['benchmark']:<26} {record['trains']:>6} trains  p50 {record['p50_ms']:9.3f}ms  "
+                      f"p99 {record['p99_ms']:9.3f}ms  {record['model_bytes'] / 1e6:7.1f}MB")
+        print(f"✅ Benchmark results -> {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare_results(results, load_json(args.baseline), args.tolerance)
+        for r in regressions:
+            print(f"⚠️ {r['benchmark']} at {r['trains']} trains: p50 {r['baseline_p50_ms']}ms -> {r['p50_ms']}ms "
+                  f"({r['ratio']}x)", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
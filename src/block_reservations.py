@@ -0,0 +1,382 @@
+import json
+import bisect
+import argparse
+from collections import namedtuple
+from datetime import timedelta
+from src.batch_runner import load_json
+from src.dynamic_scheduler import DynamicRailwayScheduler
+from src.railway_network import build_corridor
+
+UP, DOWN = 1, -1  # UP runs towards increasing km - the direction DynamicRailwayScheduler simulates
+DIRECTIONS = {'up': UP, 'down': DOWN}
+MAX_REPLANS = 1000
+TOLERANCE_MINUTES = 1e-9  # Touching reservations do not conflict despite float rounding of travel times
+SLOT_SLACK_MINUTES = 1.0  # A running train this close to its reserved slot keeps it - the headway absorbs the drift
+
+# One train's claim on a section (or a crossing loop) for [start, end) simulated minutes
+Reservation = namedtuple('Reservation', ['train', 'direction', 'start', 'end', 'start_km', 'end_km'])
+
+class IntervalSet:
+    """Union of time intervals as sorted disjoint [start, end) pairs, with O(log n) overlap lookups"""
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def add(self, start, end):
+        """Add [start, end), merging it with the intervals it touches"""
+        lo = bisect.bisect_left(self.ends, start)     # First interval ending at or after start
+        hi = bisect.bisect_right(self.starts, end)    # First interval starting after end
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def overlapping(self, start, end):
+        """The first interval overlapping [start, end) as (start, end), or None"""
+        i = bisect.bisect_right(self.ends, start)  # First interval ending after start
+        if i < len(self.starts) and self.starts[i] < end:
+            return self.starts[i], self.ends[i]
+        return None
+
+class CapacityIndex:
+    """Intervals counted by overlap with a window - two bisects over sorted starts and ends"""
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def add(self, start, end):
+        bisect.insort(self.starts, start)
+        bisect.insort(self.ends, end)
+
+    def count(self, start, end):
+        """Intervals overlapping [start, end) - an upper bound on how many are in use at once"""
+        return bisect.bisect_left(self.starts, end) - bisect.bisect_right(self.ends, start)
+
+class FollowingOrder:
+    """Same-direction occupations of a section, kept in running order with a headway on entry and exit"""
+    __slots__ = ('occupations',)
+
+    def __init__(self):
+        self.occupations = []  # Sorted (start, end) pairs - admitted ones are ordered by entry and exit alike
+
+    def add(self, start, end):
+        bisect.insort(self.occupations, (start, end))
+
+    def conflict(self, start, end, headway):
+        """Occupation (start, end) that [start, end) can neither follow nor lead by headway, or None"""
+        pad = headway - TOLERANCE_MINUTES
+        i = bisect.bisect_right(self.occupations, (start, end))
+        if i > 0:
+            leader_start, leader_end = self.occupations[i - 1]
+            if start < leader_start + pad or end < leader_end + pad:
+                return leader_start, leader_end  # Would enter too soon behind, or catch up with, its leader
+        if i < len(self.occupations):
+            follower_start, follower_end = self.occupations[i]
+            if follower_start < start + pad or follower_end < end + pad:
+                return follower_start, follower_end  # Its follower would enter too soon behind, or catch it up
+        return None
+
+class BlockReservationIndex:
+    """Time and km reservations per track section for trains running in both directions
+
+    Opposing trains may not share a single-track section (capacity 1), and trains in the same direction
+    run through it in order, entering and leaving at least a headway apart - one can only pass another
+    that waits on a side track. Double-track sections never conflict. Trains cross by waiting on a side
+    track at a double-track location.
+    """
+
+    def __init__(self, track, headway_minutes=2.0):
+        self.track = track
+        self.headway_minutes = headway_minutes  # Clear time kept between trains in a single-track section
+        self.sections = track.segments
+        self.reservations = [[] for _ in self.sections]
+        self.occupied = [{UP: IntervalSet(), DOWN: IntervalSet()} for _ in self.sections]
+        self.following = [{UP: FollowingOrder(), DOWN: FollowingOrder()} for _ in self.sections]
+        self.loop_holds = {location: [] for location in track.locations if is_crossing_loop(location)}
+        self.loop_use = {location: CapacityIndex() for location in self.loop_holds}
+        self.train_sections = {}  # Train -> sections it has reservations in, so release only rebuilds those
+        self.train_loops = {}     # Train -> crossing loops it holds a side track at
+
+    def can_enter(self, section, direction, start, end):
+        """Whether a train running in direction may occupy section during [start, end)"""
+        return self.conflict(section, direction, start, end) is None
+
+    def conflict(self, section, direction, start, end):
+        """Occupation (start, end) that blocks [start, end) in section, or None"""
+        if self.sections[section].capacity > 1:
+            return None
+        pad = self.headway_minutes - TOLERANCE_MINUTES
+        blocked = self.occupied[section][-direction].overlapping(start - pad, end + pad)
+        if blocked is None:
+            blocked = self.following[section][direction].conflict(start, end, self.headway_minutes)
+        return blocked
+
+    def earliest_entry(self, section, direction, start, end):
+        """Entry time no earlier than start that clears the first conflict of [start, end) in section"""
+        if self.sections[section].capacity > 1:
+            return start
+        pad = self.headway_minutes - TOLERANCE_MINUTES
+        blocked = self.occupied[section][-direction].overlapping(start - pad, end + pad)
+        if blocked is not None:
+            return blocked[1] + self.headway_minutes  # Wait until the opposing train has cleared the section
+        blocked = self.following[section][direction].conflict(start, end, self.headway_minutes)
+        if blocked is not None:
+            # Fall in behind that train: enter a headway after it and never catch it up inside the section
+            return max(blocked[0] + self.headway_minutes, start + blocked[1] + self.headway_minutes - end)
+        return start
+
+    def can_hold(self, location, start, end):
+        """Whether a side track at a crossing loop is free for a waiting train during [start, end)"""
+        if location not in self.loop_use:
+            return False
+        return self.loop_use[location].count(start, end) < location.side_tracks
+
+    def reserve(self, train, section, direction, start, end):
+        segment = self.sections[section]
+        self.reservations[section].append(Reservation(train, direction, start, end, segment.start_km, segment.end_km))
+        self.occupied[section][direction].add(start, end)
+        self.following[section][direction].add(start, end)
+        self.train_sections.setdefault(train, set()).add(section)
+
+    def reservation(self, train, section):
+        """The reservation train holds in section, or None"""
+        if section not in self.train_sections.get(train, ()):
+            return None
+        return next(r for r in self.reservations[section] if r.train == train)
+
+    def hold(self, train, location, direction, start, end):
+        """Reserve a side track at a crossing loop"""
+        if location not in self.loop_use:
+            raise ValueError(f"{location.name} is not a crossing loop")
+        self.loop_holds[location].append(Reservation(train, direction, start, end, location.position_km,
+                                                     location.position_km))
+        self.loop_use[location].add(start, end)
+        self.train_loops.setdefault(train, set()).add(location)
+
+    def release(self, train):
+        """Drop every reservation of train, e.g. to replan it"""
+        for section in self.train_sections.pop(train, ()):
+            kept = [r for r in self.reservations[section] if r.train != train]
+            self.reservations[section] = kept
+            self.occupied[section] = {UP: IntervalSet(), DOWN: IntervalSet()}
+            self.following[section] = {UP: FollowingOrder(), DOWN: FollowingOrder()}
+            for r in kept:
+                self.occupied[section][r.direction].add(r.start, r.end)
+                self.following[section][r.direction].add(r.start, r.end)
+        for location in self.train_loops.pop(train, ()):
+            kept = [r for r in self.loop_holds[location] if r.train != train]
+            self.loop_holds[location] = kept
+            self.loop_use[location] = CapacityIndex()
+            for r in kept:
+                self.loop_use[location].add(r.start, r.end)
+
+def is_crossing_loop(location):
+    """Double-track location with side tracks - the only places opposing trains can pass"""
+    return location.has_double_track and location.side_tracks > 0
+
+class CrossingPlanner:
+    """Plans end-to-end runs in both directions, holding trains at crossing loops around opposing traffic
+
+    Trains are planned first come, first served, so a later train follows the ones already planned in its
+    direction on single track. It only passes one on double track, or one held in a loop at the time.
+    A DynamicRailwayScheduler given a planner runs its trains UP and replans each one at every loop it
+    reaches, holding it there when the block ahead is taken.
+    """
+
+    def __init__(self, track, headway_minutes=2.0):
+        self.track = track
+        self.index = BlockReservationIndex(track, headway_minutes)
+        self.plans = {}  # Train -> its latest plan
+
+    def is_block_start(self, section, direction=UP):
+        """Whether a train entering section starts a block - at its origin or from a crossing loop"""
+        segment = self.index.sections[section]
+        if direction == UP:
+            return section == 0 or is_crossing_loop(segment.start)
+        return section == len(self.index.sections) - 1 or is_crossing_loop(segment.end)
+
+    def enter(self, train, section, minute, speed_kmh, direction=UP):
+        """Minutes a running train entering section at minute waits there before going on
+
+        A train about on time for its reserved slot keeps it, one early waits for it and
+        one late, e.g. slowed behind a delayed train, is re-planned from here.
+        """
+        reservation = self.index.reservation(train, section)
+        if reservation is None or reservation.start < minute - SLOT_SLACK_MINUTES:
+            return self.replan(train, section, minute, speed_kmh, direction)['departure'] - minute
+        if reservation.start - minute <= SLOT_SLACK_MINUTES:
+            return 0.0
+        location = self._entry_location(section, direction)
+        if location in self.index.loop_use:
+            self.index.hold(train, location, direction, minute, reservation.start)
+        return reservation.start - minute
+
+    def replan(self, train, section, minute, speed_kmh, direction=UP):
+        """Drop a train's reservations and plan it again from the start of section at minute, returns its plan
+
+        A departure later than minute is a hold where the train stands, on a side track at a crossing loop.
+        """
+        self.index.release(train)
+        plan = self.plan(train, direction, minute, speed_kmh, first_section=section)
+        location = self._entry_location(section, direction)
+        if plan['departure'] > minute and location in self.index.loop_use:
+            self.index.hold(train, location, direction, minute, plan['departure'])
+        return plan
+
+    def plan(self, train, direction, depart_minute, speed_kmh, first_section=None):
+        """Reserve the path of a train to the end of the track, from one end or from first_section, returns its plan"""
+        if direction not in (UP, DOWN):
+            raise ValueError(f"Unknown direction: {direction}")
+        if speed_kmh <= 0:
+            raise ValueError(f"Speed must be positive: {speed_kmh}")
+        sections = list(range(len(self.index.sections)))
+        if direction == DOWN:
+            sections.reverse()
+        if first_section is not None:
+            sections = sections[sections.index(first_section):]
+
+        departure = depart_minute
+        for _ in range(MAX_REPLANS):
+            legs, holds, late_start = self._route(train, direction, departure, speed_kmh, sections)
+            if late_start is None:
+                break
+            departure = late_start  # A loop on the way had no free side track - leave the origin later instead
+        else:
+            raise ValueError(f"No conflict-free path for {train} within {MAX_REPLANS} replans")
+
+        for section, start, end in legs:
+            self.index.reserve(train, section, direction, start, end)
+        for location, start, end in holds:
+            self.index.hold(train, location, direction, start, end)
+        plan = {
+            'train': train,
+            'direction': 'up' if direction == UP else 'down',
+            'scheduled_departure': depart_minute,
+            'departure': departure,
+            'arrival': legs[-1][2] if legs else departure,
+            'crossings': [{'location': location.name, 'from': start, 'until': end} for location, start, end in holds]
+        }
+        self.plans[train] = plan
+        return plan
+
+    def _route(self, train, direction, departure, speed_kmh, sections):
+        """(legs, holds, None) for a departure, or (.., .., later departure) when a needed hold is impossible"""
+        index = self.index
+        legs, holds = [], []
+        time = departure
+        k = 0
+        while k < len(sections):
+            # A block runs from here to the next crossing loop - it is entered only once it is clear throughout
+            block = [sections[k]]
+            while k + len(block) < len(sections) and not is_crossing_loop(self._exit_location(block[-1], direction)):
+                block.append(sections[k + len(block)])
+            travel = [index.sections[s].length_km / speed_kmh * 60 for s in block]
+
+            leave = time
+            moved = True
+            while moved:
+                moved = False
+                offset = 0.0
+                for section, minutes in zip(block, travel):
+                    entry = leave + offset
+                    clear = index.earliest_entry(section, direction, entry, entry + minutes)
+                    if clear > entry:
+                        leave += clear - entry
+                        moved = True
+                        break
+                    offset += minutes
+
+            if leave > time:
+                if k == 0:
+                    departure = leave  # Still at the origin - simply depart later
+                else:
+                    location = self._entry_location(block[0], direction)
+                    if not index.can_hold(location, time, leave):
+                        return legs, holds, departure + (leave - time)
+                    holds.append((location, time, leave))
+            offset = leave
+            for section, minutes in zip(block, travel):
+                legs.append((section, offset, offset + minutes))
+                offset += minutes
+            time = offset
+            k += len(block)
+        if legs and legs[0][1] > departure:
+            departure = legs[0][1]
+        return legs, holds, None
+
+    def _entry_location(self, section, direction):
+        segment = self.index.sections[section]
+        return segment.start if direction == UP else segment.end
+
+    def _exit_location(self, section, direction):
+        segment = self.index.sections[section]
+        return segment.end if direction == UP else segment.start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan opposing trains over single-track sections with crossings at loops")
+    parser.add_argument('network', help="JSON file with {corridors: [{name, locations: [{name, type, km, side_tracks}]}]}")
+    parser.add_argument('trains', help="JSON list of trains: {name, speed, direction: up|down, departure (minute)}")
+    parser.add_argument('--corridor', help="Corridor to plan (default: the first in the network file)")
+    parser.add_argument('--headway', type=float, default=2.0, help="Minutes kept between trains in a single-track section")
+    parser.add_argument('--simulate', action='store_true',
+                        help="Run the up trains through the scheduler, held at loops by the plan, against the planned down trains")
+    parser.add_argument('--engine', choices=['object', 'vectorized', 'auto'], default='object',
+                        help="Scheduler backend for --simulate")
+    parser.add_argument('--step', type=float, default=0.05, help="Simulated minutes per step for --simulate")
+    parser.add_argument('--until', type=float, default=24 * 60, help="Stop --simulate after this many simulated minutes")
+    parser.add_argument('--output', help="Write the plans to this JSON file instead of stdout")
+    args = parser.parse_args(argv)
+
+    corridors = load_json(args.network)['corridors']
+    configs = [c for c in corridors if args.corridor is None or c['name'] == args.corridor]
+    if not configs:
+        parser.error(f"no corridor named {args.corridor} in {args.network}")
+    track = build_corridor(configs[0])
+    planner = CrossingPlanner(track, headway_minutes=args.headway)
+    scheduler = DynamicRailwayScheduler(engine=args.engine, track=track, crossings=planner) if args.simulate else None
+    for order, train in enumerate(sorted(load_json(args.trains), key=lambda t: t['departure'])):
+        if train['direction'] not in DIRECTIONS:
+            raise ValueError(f"Unknown direction for {train['name']}: {train['direction']}")
+        if scheduler is not None and DIRECTIONS[train['direction']] == UP:
+            # Admitting reserves the train's path in departure order, alongside the planned down trains
+            config = {'id': order + 1, 'name': train['name'], 'priority': train.get('priority', 2), 'speed': train['speed']}
+            scheduler.admit_train(config, scheduled_start=scheduler.current_time + timedelta(minutes=train['departure']))
+        else:
+            planner.plan(train['name'], DIRECTIONS[train['direction']], train['departure'], train['speed'])
+
+    if scheduler is not None:
+        while scheduler.simulation_minutes < args.until:
+            scheduler.sync_trains()
+            if all(t.destination_reached for t in scheduler.trains):
+                break
+            scheduler.simulate_event_step(args.step)
+        scheduler.sync_trains()
+
+    plans = [plan for train, plan in planner.plans.items() if scheduler is None or train not in scheduler.trains]
+    result = {'track': track.name,
+              'single_track_sections': sum(1 for segment in track.segments if segment.capacity == 1),
+              'plans': plans}
+    if scheduler is not None:
+        result['simulation'] = {
+            'engine': args.engine,
+            'simulated_minutes': scheduler.simulation_minutes,
+            'crossing_holds': [e for e in scheduler.delay_events if e['type'] == 'crossing'],
+            'trains': [t.record() for t in scheduler.trains]
+        }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        crossings = sum(len(plan['crossings']) for plan in result['plans'])
+        if scheduler is not None:
+            crossings += len(result['simulation']['crossing_holds'])
+        print(f"✅ Planned {len(planner.plans)} trains with {crossings} crossing holds -> {args.output}")
+    else:
+        print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
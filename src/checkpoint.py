@@ -0,0 +1,148 @@
+import os
+import json
+import numpy as np
+from operator import attrgetter
+from datetime import datetime, timedelta
+from src.dynamic_scheduler import DynamicRailwayScheduler, RailwayTrack, Location, Train
+
+CHECKPOINT_VERSION = 1
+MICROSECOND = timedelta(microseconds=1)
+NO_TIME = np.iinfo(np.int64).min  # last_update_time of a train that has not moved yet
+
+# Train attributes stored as one array column each
+FLOAT_FIELDS = ['position_km']
+NUMBER_FIELDS = ['base_speed', 'current_speed', 'original_speed', 'delay_minutes', 'total_delay_accumulated',
+                 'side_track_timer', 'animation_offset']  # Restored as int when integral, like the engine does
+INT_FIELDS = ['priority', 'times_rerouted']
+BOOL_FIELDS = ['is_stopped', 'has_started', 'destination_reached', 'is_slowing_for_delayed_train',
+               'emergency_stopped', 'is_on_side_track', 'is_speed_matched', 'waiting_for_double_track']
+TRAIN_REFERENCES = ['phase_target_train', 'speed_matched_to_train', 'waiting_for_train']  # Stored as train indexes
+STORED_FIELDS = (FLOAT_FIELDS + NUMBER_FIELDS + INT_FIELDS + BOOL_FIELDS + TRAIN_REFERENCES +
+                 ['side_track_location', 'phase', 'scheduled_start', 'last_update_time', 'id', 'name', 'stop_reason'])
+
+def save_checkpoint(scheduler, file, trains=None):
+    """Write the scheduler state to a path or binary file object (uncompressed .npz)
+
+    trains saves only that subset, e.g. for a small local fork - references to other trains are dropped.
+    """
+    scheduler.sync_trains()
+    trains = scheduler.trains if trains is None else trains
+    track = scheduler.track
+    epoch = scheduler.current_time
+    train_index = {id(t): i for i, t in enumerate(trains)}
+
+    def ref(obj, table):
+        return table.get(id(obj), -1)
+
+    def offset_us(time):
+        return NO_TIME if time is None else (time - epoch) // MICROSECOND
+
+    stored = list(zip(*map(attrgetter(*STORED_FIELDS), trains))) or [()] * len(STORED_FIELDS)
+    values = dict(zip(STORED_FIELDS, stored))  # Field -> its value on every train
+    columns = {}
+    for field in FLOAT_FIELDS + NUMBER_FIELDS:
+        columns[field] = np.array(values[field], dtype=np.float64)
+    for field in INT_FIELDS:
+        columns[field] = np.array(values[field], dtype=np.int64)
+    for field in BOOL_FIELDS:
+        columns[field] = np.array(values[field], dtype=bool)
+    for field in TRAIN_REFERENCES:
+        columns[field] = np.array([ref(t, train_index) for t in values[field]], dtype=np.int64)
+    columns['side_track_location'] = np.array([-1 if loc is None else track.location_order[loc]
+                                               for loc in values['side_track_location']], dtype=np.int64)
+    columns['current_phase'] = np.array(values['phase'], dtype=np.int8)
+    columns['scheduled_start'] = np.array([offset_us(time) for time in values['scheduled_start']], dtype=np.int64)
+    columns['last_update_time'] = np.array([offset_us(time) for time in values['last_update_time']], dtype=np.int64)
+    columns['occupied_side_tracks'] = np.array([loc.occupied_side_tracks for loc in track.locations], dtype=np.int64)
+
+    rng_version, rng_internal, rng_gauss = scheduler.rng.getstate()
+    header = {
+        'version': CHECKPOINT_VERSION,
+        'engine': "object" if scheduler.engine is None else "vectorized",
+        'current_time': epoch.isoformat(),
+        'simulation_minutes': scheduler.simulation_minutes,
+        'rng_state': [rng_version, list(rng_internal), rng_gauss],
+        'track': {
+            'name': track.name,
+            'total_length_km': track.total_length_km,
+            'locations': [[loc.name, loc.type, loc.position_km, loc.side_tracks] for loc in track.locations]
+        },
+        'ids': list(values['id']),
+        'names': list(values['name']),
+        'stop_reasons': list(values['stop_reason']),
+        'delay_events': scheduler.delay_events,
+        'overtaking_events': scheduler.overtaking_events,
+        'retired_trains': scheduler.retired_trains,
+        'retired_records': scheduler.retired_records
+    }
+    columns['header'] = np.frombuffer(json.dumps(header).encode(), dtype=np.uint8)
+
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'wb') as f:  # np.savez would append .npz to a path
+            np.savez(f, **columns)
+    else:
+        np.savez(file, **columns)
+
+def load_checkpoint(file, event_log=None, engine=None):
+    """Rebuild a scheduler from save_checkpoint output - stepping it continues the saved run exactly"""
+    with np.load(file) as data:
+        header = json.loads(data['header'].tobytes())
+        if header.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version: {header.get('version')}")
+        arrays = {name: data[name] for name in data.files if name != 'header'}
+
+    track_state = header['track']
+    locations = [Location(*loc) for loc in track_state['locations']]
+    track = RailwayTrack(track_state['name'], track_state['total_length_km'], locations=locations)
+    for location, occupied in zip(locations, arrays['occupied_side_tracks'].tolist()):
+        location.occupied_side_tracks = occupied
+
+    scheduler = DynamicRailwayScheduler(engine=engine or header['engine'], event_log=event_log, track=track)
+    epoch = datetime.fromisoformat(header['current_time'])
+    scheduler.current_time = epoch
+    scheduler.simulation_minutes = header['simulation_minutes']
+    rng_version, rng_internal, rng_gauss = header['rng_state']
+    scheduler.rng.setstate((rng_version, tuple(rng_internal), rng_gauss))
+    scheduler.delay_events = header['delay_events']
+    scheduler.overtaking_events = header['overtaking_events']
+    scheduler.retired_trains = header.get('retired_trains', 0)
+    scheduler.retired_records = header.get('retired_records', [])
+
+    def numbers(column):
+        # Integral values come back as int, like the vectorized engine writes them
+        integral = np.mod(column, 1) == 0
+        return [int(value) if whole else value for value, whole in zip(column.tolist(), integral.tolist())]
+
+    def times(column):
+        return [None if offset == NO_TIME else epoch + offset * MICROSECOND for offset in column.tolist()]
+
+    fields = {field: arrays[field].tolist() for field in FLOAT_FIELDS + INT_FIELDS + BOOL_FIELDS}
+    fields.update({field: numbers(arrays[field]) for field in NUMBER_FIELDS})
+    fields['id'] = header['ids']
+    fields['name'] = header['names']
+    fields['stop_reason'] = header['stop_reasons']
+    fields['phase'] = arrays['current_phase'].tolist()
+    fields['scheduled_start'] = times(arrays['scheduled_start'])
+    fields['last_update_time'] = times(arrays['last_update_time'])
+    fields['side_track_location'] = [locations[i] if i >= 0 else None for i in arrays['side_track_location'].tolist()]
+
+    trains = []
+    names = list(fields)
+    for row in zip(*fields.values()):
+        train = Train.__new__(Train)  # Every attribute is set here, skip __init__
+        for name, value in zip(names, row):
+            setattr(train, name, value)  # stop_reason comes back as free text
+        train.color = train._get_priority_color(train.priority)
+        train.event_log = scheduler.event_log
+        train.status_counters = None
+        train.status_labels = ()
+        train.delay_cascade = None
+        trains.append(train)
+
+    for field in TRAIN_REFERENCES:
+        for train, index in zip(trains, arrays[field].tolist()):
+            setattr(train, field, trains[index] if index >= 0 else None)
+
+    scheduler.trains = trains
+    scheduler.rebuild_indexes()
+    return scheduler
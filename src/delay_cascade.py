@@ -0,0 +1,56 @@
+from src.train_codes import NORMAL
+
+class DelayCascade:
+    """Delay dependencies between trains, updated as trains change state instead of rescanned every tick"""
+
+    def __init__(self):
+        self.order = {}        # Train id -> index in the scheduler's train list
+        self.delayed = {}      # Running trains holding a delay - cascade sources (secondary ones have a phase target)
+        self.constrained = {}  # Trains in a delay phase or emergency stop - recovery candidates
+        self._in_order = {}    # Cached train-list-order views, replaced (never mutated) on membership changes
+
+    def rebuild(self, trains):
+        """Rebuild from scratch, e.g. after trains were edited directly"""
+        self.order = {id(train): i for i, train in enumerate(trains)}
+        self.delayed.clear()
+        self.constrained.clear()
+        self._in_order.clear()
+        for train in trains:
+            self.update(train)
+
+    def add(self, train, order):
+        """Register a train appended to the scheduler's train list"""
+        self.order[id(train)] = order
+        self.update(train)
+
+    def update(self, train):
+        """Move a train in or out of the cascade after a state change"""
+        key = id(train)
+        if key not in self.order:
+            return
+        if (train.has_started and train.delay_minutes > 0) != (key in self.delayed):
+            self._toggle('delayed', key, train)
+        if (train.phase != NORMAL or train.emergency_stopped) != (key in self.constrained):
+            self._toggle('constrained', key, train)
+
+    def _toggle(self, group, key, train):
+        members = getattr(self, group)
+        if key in members:
+            del members[key]
+        else:
+            members[key] = train
+        self._in_order.pop(group, None)
+
+    def delayed_trains(self):
+        """Delayed running trains in train list order"""
+        return self._ordered('delayed')
+
+    def constrained_trains(self):
+        """Trains held in a delay phase or emergency stop, in train list order"""
+        return self._ordered('constrained')
+
+    def _ordered(self, group):
+        trains = self._in_order.get(group)
+        if trains is None:
+            trains = self._in_order[group] = sorted(getattr(self, group).values(), key=lambda t: self.order[id(t)])
+        return trains
@@ -0,0 +1,1330 @@
+import math
+import random
+import bisect
+from time import perf_counter_ns
+from datetime import datetime, timedelta
+from src.train_codes import (PHASES, PHASE_CODES, NORMAL, EMERGENCY, reason_text,
+                             REASON_NONE, REASON_CUSTOM, REASON_SIDE_TRACK, REASON_DELAY_REMAINING,
+                             REASON_JOURNEY_COMPLETED, REASON_INHERITED, REASON_DELAYED, REASON_MONITOR,
+                             REASON_PROGRESSIVE, REASON_SPEED_MATCH, REASON_PHASE_EMERGENCY,
+                             REASON_EMERGENCY_HOLD, REASON_YELLOW_TRACK)
+from src.event_log import EventLog, INFO, WARNING
+from src.status_counters import StatusCounters
+from src.delay_cascade import DelayCascade
+from src.step_profiler import QUIET_STAGE
+
+# engine="auto" switches to the vectorized engine at this many trains - below about 120 running
+# trains its fixed per-step NumPy overhead makes it slower than stepping Train objects
+VECTORIZED_MIN_TRAINS = 200
+
+class Location:
+    """Represents a location on the railway network"""
+    __slots__ = ('name', 'type', 'position_km', 'side_tracks', 'has_double_track', '_occupied_side_tracks', 'railway_track')
+    
+    def __init__(self, name, location_type, position_km, side_tracks=0):
+        self.name = name
+        self.type = location_type  # 'city', 'town', 'village', 'open'
+        self.position_km = position_km
+        self.side_tracks = side_tracks
+        self.has_double_track = location_type in ['city', 'town', 'village']
+        self._occupied_side_tracks = 0  # Track side track usage
+        self.railway_track = None  # Track that indexes this location's free side tracks
+    
+    @property
+    def occupied_side_tracks(self):
+        return self._occupied_side_tracks
+    
+    @occupied_side_tracks.setter
+    def occupied_side_tracks(self, value):
+        was_free = self.has_free_side_track()
+        self._occupied_side_tracks = value
+        if self.railway_track is not None and self.has_free_side_track() != was_free:
+            self.railway_track.side_track_availability_changed(self)
+    
+    def has_free_side_track(self):
+        return self.side_tracks > self._occupied_side_tracks
+
+class Segment:
+    """Track section between two adjacent locations"""
+    __slots__ = ('start', 'end', 'start_km', 'end_km', 'length_km', 'has_double_track', 'capacity', 'trains')
+    
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.start_km = start.position_km
+        self.end_km = end.position_km
+        self.length_km = end.position_km - start.position_km
+        self.has_double_track = start.has_double_track or end.has_double_track
+        self.capacity = 2 if self.has_double_track else 1
+        self.trains = {}  # Insertion-ordered set of trains in the segment
+    
+    def __getitem__(self, key):
+        return getattr(self, key)  # Segments used to be dicts - segment['end_km'] still reads
+
+class RailwayTrack:
+    """Railway track with single/double sections and side tracks"""
+    def __init__(self, name="main_line", total_length_km=400, locations=None):
+        self.name = name
+        self.total_length_km = total_length_km
+        self.locations = locations if locations is not None else self._create_locations()
+        self.segments = self._create_segments()
+        self._index_locations()
+        self.segment_ends = [segment.end_km for segment in self.segments]  # Sorted, for bisect lookups
+        self.train_segments = {}  # Train -> index of the segment it occupies
+        
+    def _create_locations(self):
+        """Create realistic railway locations"""
+        return [
+            Location("Mumbai", "city", 0, side_tracks=4),
+            Location("Thane", "city", 25, side_tracks=3),
+            Location("Kalyan", "town", 55, side_tracks=2),
+            Location("Karjat", "village", 85, side_tracks=2),
+            Location("Lonavala", "village", 115, side_tracks=2),
+            Location("Pune", "city", 150, side_tracks=4),
+            Location("Satara", "town", 200, side_tracks=2),
+            Location("Kolhapur", "village", 250, side_tracks=1),
+            Location("Belgaum", "city", 300, side_tracks=3),
+            Location("Bangalore", "city", 400, side_tracks=4)
+        ]
+    
+    def _create_segments(self):
+        """Create track segments between locations"""
+        return [Segment(self.locations[i], self.locations[i + 1]) for i in range(len(self.locations) - 1)]
+    
+    def _index_locations(self):
+        """Sorted (position_km, list index) keys for bisect queries over locations"""
+        positions = [location.position_km for location in self.locations]
+        if positions != sorted(positions):
+            raise ValueError("Locations must be listed in corridor order")
+        
+        self.location_order = {location: i for i, location in enumerate(self.locations)}
+        self.double_track_keys = [(location.position_km, i) for i, location in enumerate(self.locations)
+                                  if location.has_double_track]
+        # Locations with a free side track, kept current as occupancy changes
+        self.free_side_track_keys = []
+        self.free_village_keys = []
+        for i, location in enumerate(self.locations):
+            location.railway_track = self
+            if location.has_free_side_track():
+                self._set_free(location, i, True)
+    
+    def side_track_availability_changed(self, location):
+        """A location's side tracks filled up or one was freed"""
+        self._set_free(location, self.location_order[location], location.has_free_side_track())
+    
+    def _set_free(self, location, index, free):
+        key = (location.position_km, index)
+        indexes = [self.free_side_track_keys] + ([self.free_village_keys] if location.has_double_track else [])
+        for keys in indexes:
+            i = bisect.bisect_left(keys, key)
+            present = i < len(keys) and keys[i] == key
+            if free and not present:
+                keys.insert(i, key)
+            elif not free and present:
+                del keys[i]
+    
+    def get_segment_at_position(self, position_km):
+        """Get track segment at given position"""
+        index = self.segment_index_at_position(position_km)
+        return self.segments[index] if index is not None else None
+    
+    def segment_index_at_position(self, position_km):
+        """Index of the segment at given position - a boundary belongs to the segment before it"""
+        index = bisect.bisect_left(self.segment_ends, position_km)
+        if index < len(self.segments) and self.segments[index].start_km <= position_km:
+            return index
+        return None
+    
+    def update_train_segment(self, train, position_km):
+        """Keep segment occupancy in step with a train's position (None takes it off the track), returns whether it moved"""
+        current = self.train_segments.get(train)
+        if position_km is None and current is None:
+            return False  # Off the track and staying off
+        if current is not None and position_km is not None:
+            after_start = position_km > self.segment_ends[current - 1] if current else position_km >= self.segments[0].start_km
+            if after_start and position_km <= self.segment_ends[current]:
+                return False  # Still inside the same segment - nothing to move
+        index = None if position_km is None else self.segment_index_at_position(position_km)
+        self.set_train_segment(train, index)
+        return index != current
+    
+    def set_train_segment(self, train, index):
+        """Move a train into segment index (None for no segment)"""
+        current = self.train_segments.get(train)
+        if current == index:
+            return
+        if current is not None:
+            del self.segments[current].trains[train]
+            del self.train_segments[train]
+        if index is not None:
+            self.segments[index].trains[train] = None
+            self.train_segments[train] = index
+    
+    def is_in_double_track_area(self, position_km):
+        """Check if position is in double-track area (village/city)"""
+        keys = self.double_track_keys
+        i = bisect.bisect_left(keys, (position_km - 10, -1))
+        # Step back over keys that only rounding put below the window
+        while i > 0 and position_km - keys[i - 1][0] <= 10:
+            i -= 1
+        # Check if within 10km of a settlement (double-track area), first in corridor order
+        for location_km, index in keys[i:]:
+            if location_km - position_km > 10:
+                break
+            if abs(location_km - position_km) <= 10:
+                return True, self.locations[index]
+        return False, None
+    
+    def find_nearest_side_track(self, position_km):
+        """Find nearest location with available side tracks"""
+        keys = self.free_side_track_keys
+        i = bisect.bisect_left(keys, (position_km, -1))
+        candidates = []
+        if i < len(keys):
+            candidates.append(keys[i])
+        if i > 0:
+            # First key at the closest position behind, so ties go to the earlier location
+            candidates.append(keys[bisect.bisect_left(keys, (keys[i - 1][0], -1))])
+        
+        if candidates:
+            _, index = min((abs(location_km - position_km), index) for location_km, index in candidates)
+            return self.locations[index]
+        return None
+    
+    def find_next_village_ahead(self, position_km):
+        """Find the next village/city AHEAD of current position with available side tracks"""
+        keys = self.free_village_keys
+        i = bisect.bisect_right(keys, (position_km, math.inf))
+        return self.locations[keys[i][1]] if i < len(keys) else None
+    
+    def is_in_single_track_section(self, position_km):
+        """Check if position is in single-track section (outside villages/cities)"""
+        is_double_track, _ = self.is_in_double_track_area(position_km)
+        return not is_double_track
+    
+    def get_next_double_track_location(self, position_km):
+        """Get the next double-track location ahead"""
+        keys = self.double_track_keys
+        i = bisect.bisect_right(keys, (position_km, math.inf))
+        return self.locations[keys[i][1]] if i < len(keys) else None
+
+class Train:
+    """Train with realistic speeds and behavior"""
+    __slots__ = ('id', 'name', 'priority', 'base_speed', 'current_speed', 'scheduled_start', 'position_km',
+                 'delay_minutes', 'is_stopped', 'has_started', 'destination_reached', 'is_slowing_for_delayed_train',
+                 'emergency_stopped', 'is_on_side_track', 'side_track_location', 'waiting_for_train',
+                 'side_track_timer', 'original_speed', 'is_speed_matched', 'speed_matched_to_train',
+                 'waiting_for_double_track', 'phase', 'phase_target_train', 'reason', 'reason_value', 'reason_ref',
+                 'color', 'animation_offset', 'last_update_time', 'total_delay_accumulated', 'times_rerouted',
+                 'event_log', 'status_counters', 'status_labels', 'delay_cascade')
+    
+    def __init__(self, id, name, priority, base_speed, scheduled_start, event_log=None, status_counters=None,
+                 delay_cascade=None):
+        self.id = id
+        self.name = name
+        self.priority = priority  # 1=highest, 4=lowest
+        self.base_speed = base_speed  # km/h
+        self.current_speed = base_speed
+        self.scheduled_start = scheduled_start
+        self.position_km = 0.0
+        self.delay_minutes = 0
+        self.is_stopped = False
+        self.set_reason(REASON_NONE)
+        self.has_started = False
+        self.destination_reached = False
+        self.is_slowing_for_delayed_train = False
+        self.emergency_stopped = False  # NEW: Track emergency stops
+        
+        # Side track management
+        self.is_on_side_track = False
+        self.side_track_location = None
+        self.waiting_for_train = None
+        self.side_track_timer = 0
+        
+        # Speed matching for overtaking
+        self.original_speed = base_speed
+        self.is_speed_matched = False
+        self.speed_matched_to_train = None
+        self.waiting_for_double_track = False
+        
+        # NEW: Phase tracking
+        self.phase = NORMAL  # Index into PHASES: NORMAL, MONITOR, PROGRESSIVE, SPEED_MATCH, EMERGENCY
+        self.phase_target_train = None
+        
+        # Visual properties
+        self.color = self._get_priority_color(priority)
+        self.animation_offset = 0
+        self.last_update_time = None
+        
+        # State tracking
+        self.total_delay_accumulated = 0
+        self.times_rerouted = 0
+        self.event_log = event_log
+        
+        # Status labels this train is counted under (see get_system_status)
+        self.status_counters = status_counters
+        self.status_labels = ()
+        self.delay_cascade = delay_cascade
+        self.update_status_counters()
+        
+    def _get_priority_color(self, priority):
+        """Get color based on train priority"""
+        colors = {
+            1: (255, 0, 0),    # Red - Highest priority
+            2: (255, 140, 0),  # Dark orange - High priority
+            3: (0, 100, 255),  # Blue - Medium priority
+            4: (100, 100, 100) # Gray - Lowest priority
+        }
+        return colors.get(priority, (0, 0, 0))
+    
+    @property
+    def current_phase(self):
+        return PHASES[self.phase]
+    
+    @current_phase.setter
+    def current_phase(self, phase):
+        self.phase = PHASE_CODES[phase]
+    
+    @property
+    def stop_reason(self):
+        """Why the train is stopped or slowed - built from the reason code when something asks"""
+        return reason_text(self.reason, self.reason_value, self.reason_ref)
+    
+    @stop_reason.setter
+    def stop_reason(self, text):
+        if text:
+            self.set_reason(REASON_CUSTOM, ref=text)
+        else:
+            self.set_reason(REASON_NONE)
+    
+    def set_reason(self, code, value=0, ref=None):
+        """Record a stop reason code (see reason_text) - value and ref fill in the text"""
+        self.reason = code
+        self.reason_value = value
+        self.reason_ref = ref
+    
+    def _log(self, level, kind, template, *args):
+        if self.event_log is not None:
+            self.event_log.emit(level, kind, template, *args)
+    
+    def _status_labels(self):
+        """Status labels for the current state - one count each in the scheduler status"""
+        if not self.has_started:
+            return ('waiting_to_start',)
+        if self.destination_reached:
+            return ('completed_trains',)
+        labels = ['active_trains', ('phase', self.current_phase)]
+        if self.delay_minutes > 0:
+            labels.append('primary_delays' if self.phase_target_train is None else 'secondary_delays')
+        if self.delay_minutes > 0 or self.total_delay_accumulated > 0:
+            labels.append('total_delayed_trains')
+        if self.is_on_side_track:
+            labels.append('side_track_trains')
+        if self.emergency_stopped:
+            labels.append('emergency_stopped')
+        return tuple(labels)
+    
+    def update_status_counters(self):
+        """Move this train between status counters and delay cascade sets after a state change"""
+        if self.status_counters is not None:
+            labels = self._status_labels()
+            if labels != self.status_labels:
+                self.status_counters.move(self.status_labels, labels)
+                self.status_labels = labels
+        if self.delay_cascade is not None:
+            self.delay_cascade.update(self)
+    
+    def can_start(self, current_time):
+        """Check if train can start based on schedule"""
+        return current_time >= self.scheduled_start and not self.has_started
+    
+    def start_journey(self, current_time):
+        """Start the train's journey"""
+        if self.can_start(current_time):
+            self.has_started = True
+            self.last_update_time = current_time
+            self.is_stopped = False
+            self.update_status_counters()
+            return True
+        return False
+    
+    def update_position(self, time_delta_minutes, track):
+        """Update train position with corrected delay handling"""
+        if not self.has_started or self.destination_reached:
+            return
+        
+        # Trains on yellow tracks cannot move at all
+        if self.is_on_side_track:
+            self.is_stopped = True
+            if self.side_track_location:
+                self.set_reason(REASON_SIDE_TRACK, ref=self.side_track_location)
+            return
+        
+        # Handle delays
+        if self.delay_minutes > 0:
+            self.delay_minutes -= time_delta_minutes
+            self.is_stopped = True
+            self.set_reason(REASON_DELAY_REMAINING, self.delay_minutes)
+            if self.delay_minutes <= 0:
+                self.delay_minutes = 0
+                self.is_stopped = False
+                self.set_reason(REASON_NONE)
+                self.emergency_stopped = False  # Clear emergency stop when delay ends
+                self.update_status_counters()
+            return
+        
+        # Don't move if stopped for other reasons (including emergency stop)
+        if self.is_stopped or self.emergency_stopped:
+            return
+        
+        # Calculate movement
+        speed_km_per_min = self.current_speed / 60  # Convert to km/min
+        distance_increment = speed_km_per_min * time_delta_minutes
+        
+        # Move train
+        new_position = min(track.total_length_km, self.position_km + distance_increment)
+        self.position_km = new_position
+        
+        # Check if destination reached
+        if self.position_km >= track.total_length_km:
+            self.destination_reached = True
+            self.is_stopped = True
+            self.set_reason(REASON_JOURNEY_COMPLETED)
+            self.update_status_counters()
+    
+    def add_delay(self, minutes, reason):
+        """Add delay to train"""
+        self._add_delay(minutes, REASON_DELAYED, reason)
+    
+    def _add_delay(self, minutes, code, ref):
+        self.delay_minutes += minutes
+        self.total_delay_accumulated += minutes
+        self.is_stopped = True
+        self.set_reason(code, self.delay_minutes, ref)
+        self.update_status_counters()
+    
+    def emergency_stop(self, delayed_train, reason):
+        """NEW: Emergency stop the train completely"""
+        self._log(WARNING, "EMERGENCY_STOP", "EMERGENCY STOP: {} - {}", self.name, reason)
+        self.emergency_stopped = True
+        self.current_speed = 0
+        self.is_stopped = True
+        self.phase = EMERGENCY
+        self.phase_target_train = delayed_train
+        # Inherit the SAME delay as the delayed train
+        self._add_delay(delayed_train.delay_minutes, REASON_INHERITED, delayed_train)
+    
+    def set_phase(self, phase, distance, delayed_train):
+        """NEW: Set the current phase and adjust speed accordingly"""
+        old_phase = self.current_phase
+        self.phase = PHASE_CODES[phase]
+        self.phase_target_train = delayed_train
+        
+        if phase != old_phase:
+            self._log(INFO, "PHASE_CHANGE", "PHASE CHANGE: {} {} → {} (Distance: {:.1f}km)", self.name, old_phase, phase, distance)
+        
+        if phase == "MONITOR":
+            # Phase 1: Far away, maintain original speed
+            self.current_speed = self.original_speed
+            self.set_reason(REASON_MONITOR, ref=delayed_train)
+            
+        elif phase == "PROGRESSIVE":
+            # Phase 2: Progressive slowdown from 35km to 20km
+            # Linear interpolation between original speed and delayed train speed
+            distance_factor = (distance - 20) / (35 - 20)  # 1.0 at 35km, 0.0 at 20km
+            distance_factor = max(0, min(1, distance_factor))
+            
+            target_speed = delayed_train.current_speed + (self.original_speed - delayed_train.current_speed) * distance_factor
+            self.current_speed = max(delayed_train.current_speed, target_speed)
+            self.set_reason(REASON_PROGRESSIVE, self.current_speed)
+            
+        elif phase == "SPEED_MATCH":
+            # Phase 3: Speed matching
+            self.current_speed = delayed_train.current_speed
+            self.is_speed_matched = True
+            self.speed_matched_to_train = delayed_train
+            self.set_reason(REASON_SPEED_MATCH, ref=delayed_train)
+            
+        elif phase == "EMERGENCY":
+            # Phase 4: Emergency stop
+            self.current_speed = 0
+            self.emergency_stopped = True
+            self.is_stopped = True
+            self.set_reason(REASON_PHASE_EMERGENCY)
+        
+        self.update_status_counters()
+    
+    def resume_normal_speed(self):
+        """Enhanced resume normal speed with complete state reset"""
+        if self.phase != NORMAL or self.emergency_stopped or self.is_speed_matched:
+            self._log(INFO, "RECOVERY", "FULL RECOVERY: {} → {}km/h (was {}km/h)", self.name, self.original_speed, self.current_speed)
+            
+            # Reset all speed and phase states
+            self.current_speed = self.original_speed
+            self.phase = NORMAL
+            self.phase_target_train = None
+            self.is_slowing_for_delayed_train = False
+            self.is_speed_matched = False
+            self.speed_matched_to_train = None
+            self.emergency_stopped = False
+            self.is_stopped = False
+            self.set_reason(REASON_NONE)
+            self.update_status_counters()
+    
+    def move_to_side_track(self, side_track_location, reason):
+        """Move train to side track"""
+        if side_track_location and side_track_location.occupied_side_tracks < side_track_location.side_tracks:
+            self.is_on_side_track = True
+            self.side_track_location = side_track_location
+            self.position_km = side_track_location.position_km
+            self.is_stopped = True
+            self.set_reason(REASON_YELLOW_TRACK, ref=(side_track_location, reason))
+            self.times_rerouted += 1
+            side_track_location.occupied_side_tracks += 1
+            self.update_status_counters()
+            self._log(INFO, "SIDE_TRACK", "YELLOW TRACK: {} moved to {} - {}", self.name, side_track_location.name, reason)
+            return True
+        return False
+    
+    def return_to_main_track(self):
+        """Return train from side track to main track"""
+        if self.is_on_side_track and self.side_track_location:
+            self.side_track_location.occupied_side_tracks -= 1
+            self.is_on_side_track = False
+            old_location = self.side_track_location.name
+            self.side_track_location = None
+            self.waiting_for_train = None
+            self.is_stopped = False
+            self.set_reason(REASON_NONE)
+            self.update_status_counters()
+            self._log(INFO, "MAIN_TRACK", "MAIN TRACK: {} returned from {}", self.name, old_location)
+    
+    def record(self):
+        """Summary of the train for run reports - kept for retired trains after the Train is dropped"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'priority': self.priority,
+            'position_km': self.position_km,
+            'destination_reached': self.destination_reached,
+            'total_delay_minutes': self.total_delay_accumulated,
+            'times_rerouted': self.times_rerouted,
+            'phase': self.current_phase
+        }
+
+class TrainPositionIndex:
+    """Trains on the main line kept sorted by position for range queries"""
+    def __init__(self):
+        self.trains = []     # Main line trains sorted by position
+        self.positions = []  # Their positions as of the last refresh
+        self.order = {}      # Train id -> index in the scheduler's train list
+    
+    def rebuild(self, trains):
+        """Rebuild the index from scratch, e.g. after loading a saved state"""
+        self.order = {id(train): i for i, train in enumerate(trains)}
+        self.trains = sorted((t for t in trains if self._on_main_line(t)), key=lambda t: t.position_km)
+        self.positions = [t.position_km for t in self.trains]
+    
+    def add(self, train, order):
+        """Insert a train that just joined the main line"""
+        self.order[id(train)] = order
+        i = bisect.bisect_right(self.positions, train.position_km)
+        self.trains.insert(i, train)
+        self.positions.insert(i, train.position_km)
+    
+    def refresh(self):
+        """Drop trains that left the main line and restore position order after moves"""
+        trains = [t for t in self.trains if self._on_main_line(t)]
+        positions = [t.position_km for t in trains]
+        
+        # Insertion sort - trains rarely pass each other, so this is close to linear
+        for i in range(1, len(trains)):
+            train, position = trains[i], positions[i]
+            j = i
+            while j > 0 and positions[j - 1] > position:
+                trains[j], positions[j] = trains[j - 1], positions[j - 1]
+                j -= 1
+            trains[j], positions[j] = train, position
+        
+        self.trains, self.positions = trains, positions
+    
+    def within(self, position_km, distance_km):
+        """Trains within distance_km of position_km as (distance, train), closest first"""
+        lo = bisect.bisect_left(self.positions, position_km - distance_km - 1e-6)
+        hi = bisect.bisect_right(self.positions, position_km + distance_km + 1e-6)
+        
+        nearby = []
+        for train in self.trains[lo:hi]:
+            distance = abs(position_km - train.position_km)
+            if distance <= distance_km:
+                nearby.append((distance, self.order[id(train)], train))
+        
+        # Ties keep the scheduler's train list order
+        nearby.sort()
+        return [(distance, train) for distance, _, train in nearby]
+    
+    def _on_main_line(self, train):
+        return train.has_started and not train.destination_reached and not train.is_on_side_track
+
+class DynamicRailwayScheduler:
+    """Railway scheduler with 4-phase progressive delay handling"""
+    
+    def __init__(self, engine="object", event_log=None, track=None, seed=None, optimizer=None, profiler=None,
+                 crossings=None):
+        self.trains = []
+        self.track = track if track is not None else RailwayTrack()
+        if crossings is not None and crossings.track is not self.track:
+            raise ValueError("The crossing planner must plan the scheduler's track")
+        self.current_time = datetime.now().replace(hour=6, minute=0, second=0, microsecond=0)
+        self.simulation_minutes = 0
+        self.delay_events = []
+        self.overtaking_events = []
+        self.position_index = TrainPositionIndex()
+        self.status_counters = StatusCounters()
+        self.delay_cascade = DelayCascade()  # Delayed and constrained trains for the 4-phase handlers
+        self.rng = random.Random(seed)  # Start order and random delays - seed it to reproduce a run
+        self.optimizer = optimizer  # Optional LookaheadOptimizer, consulted on every user delay
+        self.optimizer_reports = []
+        self.profiler = profiler  # Optional StepProfiler timing each simulate_step stage
+        self.retired_trains = 0  # Finished trains dropped by retire_finished_trains, still counted as completed
+        self.retired_records = []  # Train.record() of each retired train, so run reports still cover them
+        
+        # Optional CrossingPlanner: trains reserve their blocks when admitted and are checked against their
+        # slot each time they enter a block - held when early, re-planned when late
+        self.crossings = crossings
+        self.block_start_km = [] if crossings is None else [
+            segment.start_km for index, segment in enumerate(self.track.segments)
+            if index and crossings.is_block_start(index)]
+        
+        # Diagnostics go to the event log instead of stdout
+        self.event_log = event_log if event_log is not None else EventLog()
+        self.event_log.time_source = lambda: self.simulation_minutes
+        
+        # Engine backend: "object" steps Train objects, "vectorized" steps NumPy arrays,
+        # "auto" steps objects until the fleet reaches VECTORIZED_MIN_TRAINS
+        if engine == "vectorized":
+            from src.vectorized_engine import VectorizedRailwayEngine  # Optional NumPy backend, loaded on demand
+            self.engine = VectorizedRailwayEngine(self)
+        elif engine in ("object", "auto"):
+            self.engine = None
+        else:
+            raise ValueError(f"Unknown engine: {engine}")
+        self.auto_engine = engine == "auto"
+        
+    def create_dynamic_schedule(self, train_configs, shuffle=True):
+        """Create schedule with dynamic starting order (config order when shuffle is off)"""
+        shuffled_configs = train_configs.copy()
+        if shuffle:
+            self.rng.shuffle(shuffled_configs)
+        
+        self.event_log.info("SCHEDULE", "=== DYNAMIC TRAIN SCHEDULING ===\nTrains will start in mixed priority order with 1-hour intervals:")
+        
+        start_time = self.current_time
+        for i, config in enumerate(shuffled_configs):
+            scheduled_time = start_time + timedelta(hours=i)
+            
+            train = Train(
+                config['id'],
+                config['name'],
+                config['priority'],
+                config['speed'],
+                scheduled_time,
+                event_log=self.event_log,
+                status_counters=self.status_counters if self.engine is None else None,  # The engine counts from its arrays
+                delay_cascade=self.delay_cascade if self.engine is None else None
+            )
+            
+            self.trains.append(train)
+            self.delay_cascade.add(train, len(self.trains) - 1)
+            self.event_log.info("SCHEDULE", "  {} (P{}, {}km/h) -> {:%H:%M}", train.name, train.priority, train.base_speed, scheduled_time)
+            if self.crossings is not None:
+                self._reserve_path(train)
+        
+        self.event_log.info("SCHEDULE", "Total trains scheduled: {}", len(self.trains))
+        if self.engine is not None:
+            self.engine.load()
+        return self.trains
+    
+    def admit_train(self, config, total_delay=0, times_rerouted=0, scheduled_start=None):
+        """Add a train mid-run, e.g. one arriving over a junction - it starts on the next step unless scheduled later"""
+        self.sync_trains()
+        train = self._add_train(config, total_delay, times_rerouted, scheduled_start)
+        if self.engine is not None:
+            self.engine.load()
+        return train
+    
+    def admit_trains(self, configs, scheduled_starts):
+        """Add a batch of new trains mid-run, returns them - the vectorized engine appends them to its arrays
+        instead of reloading the whole fleet, so admitting stays proportional to the trains admitted
+        """
+        trains = [self._add_train(config, 0, 0, scheduled_start)
+                  for config, scheduled_start in zip(configs, scheduled_starts)]
+        if trains and self.engine is not None:
+            self.engine.append_trains(trains)
+        return trains
+    
+    def _add_train(self, config, total_delay, times_rerouted, scheduled_start):
+        scheduled_start = self.current_time if scheduled_start is None else scheduled_start
+        train = Train(
+            config['id'],
+            config['name'],
+            config['priority'],
+            config['speed'],
+            scheduled_start,
+            event_log=self.event_log,
+            status_counters=self.status_counters if self.engine is None else None,
+            delay_cascade=self.delay_cascade if self.engine is None else None
+        )
+        train.total_delay_accumulated = total_delay
+        train.times_rerouted = times_rerouted
+        self.trains.append(train)
+        self.delay_cascade.add(train, len(self.trains) - 1)
+        self.event_log.info("SCHEDULE", "  {} (P{}, {}km/h) joins {} at {:%H:%M}", train.name, train.priority,
+                            train.base_speed, self.track.name, scheduled_start)
+        if self.crossings is not None:
+            self._reserve_path(train)
+        return train
+    
+    def _reserve_path(self, train):
+        """Reserve the blocks of a newly admitted train from its scheduled start"""
+        minutes_to_start = (train.scheduled_start - self.current_time).total_seconds() / 60
+        self.crossings.replan(train, 0, self.simulation_minutes + minutes_to_start, train.base_speed)
+    
+    def _enter_blocks(self, entries):
+        """Check trains that just entered a block against their slots, returns (train, minutes, reason) for each one to hold
+        
+        entries holds (train, section, speed_kmh) for trains that moved into a new section this step.
+        The hold is the wait for the block ahead, which the caller adds as a delay so that the
+        four-phase logic slows the trains behind it.
+        """
+        holds = []
+        for train, section, speed_kmh in entries:
+            if section is None or speed_kmh <= 0 or not self.crossings.is_block_start(section):
+                continue
+            minutes = self.crossings.enter(train, section, self.simulation_minutes, speed_kmh)
+            if minutes <= 0:
+                continue
+            location = self.track.segments[section].start
+            self.event_log.info("CROSSING", "🔀 CROSSING HOLD: {} waits {:.1f}min at {} for the block ahead",
+                                train.name, minutes, location.name)
+            self.delay_events.append({'type': 'crossing', 'train': train.name, 'source': location.name,
+                                      'minutes': minutes, 'time': self.simulation_minutes})
+            holds.append((train, minutes, f"Crossing at {location.name}"))
+        return holds
+    
+    def simulate_step(self, time_delta_minutes=0.05):
+        """Simulate one time step with 4-phase delay logic"""
+        self.current_time += timedelta(minutes=time_delta_minutes)
+        self.simulation_minutes += time_delta_minutes
+        
+        if self.auto_engine and self.engine is None and len(self.trains) >= VECTORIZED_MIN_TRAINS:
+            self._switch_to_vectorized()
+        if self.engine is not None:
+            self.engine.step(time_delta_minutes)
+            return
+        if self.profiler is not None:
+            self.profiler.run_step(self, time_delta_minutes, self._stage_visits())
+            return
+        
+        # Start ready trains
+        self._start_ready_trains()
+        
+        # Handle 4-phase delay consequences
+        self._handle_four_phase_delay_logic()
+        
+        # Handle delay recovery
+        self._handle_delay_recovery()
+        
+        # Handle overtaking logic
+        self._handle_overtaking_logic()
+        
+        # Update all train positions
+        self._update_positions(time_delta_minutes)
+        
+        # Process side track returns
+        self._process_side_track_returns()
+        
+        # Update track occupancy
+        self._update_track_occupancy()
+    
+    def _switch_to_vectorized(self):
+        """Hand the fleet to the vectorized engine - both engines produce identical state"""
+        from src.vectorized_engine import VectorizedRailwayEngine
+        self.engine = VectorizedRailwayEngine(self)
+        self.rebuild_indexes()
+    
+    def _start_ready_trains(self):
+        """Start every train whose departure time has come"""
+        for order, train in enumerate(self.trains):
+            if train.can_start(self.current_time):
+                train.start_journey(self.current_time)
+                self.position_index.add(train, order)
+                self.event_log.info("TRAIN_STARTED", "🚀 TRAIN STARTED: {} (P{}, {}km/h) at {:%H:%M}",
+                                    train.name, train.priority, train.original_speed, self.current_time)
+    
+    def _update_positions(self, time_delta_minutes):
+        """Move every running train and re-sort the position index"""
+        for train in self.trains:
+            if train.has_started and not train.destination_reached:
+                train.update_position(time_delta_minutes, self.track)
+        self.position_index.refresh()
+    
+    def _stage_visits(self):
+        """Trains each simulate_step stage works on, in StepProfiler stage order"""
+        counts = self.status_counters
+        running = counts['active_trains']
+        return (counts['waiting_to_start'], len(self.delay_cascade.delayed), len(self.delay_cascade.constrained),
+                running, running, counts['side_track_trains'], len(self.trains))
+    
+    def simulate_event_step(self, time_delta_minutes=0.05, max_steps=None):
+        """Event-driven step: merge fixed steps up to the next event, returns the steps covered"""
+        steps = self._steps_to_next_event(time_delta_minutes)
+        if max_steps is not None:
+            steps = min(steps, max(1, max_steps))
+        if math.isinf(steps):
+            steps = 1
+        
+        # Nothing fires before the last merged step, which runs in full
+        if steps > 1:
+            if self.profiler is None:
+                self._advance_quiet_steps(steps - 1, time_delta_minutes)
+            else:
+                started = perf_counter_ns()
+                self._advance_quiet_steps(steps - 1, time_delta_minutes)
+                self.profiler.record(QUIET_STAGE, perf_counter_ns() - started, len(self.trains))
+        self.simulate_step(time_delta_minutes)
+        return steps
+    
+    def _advance_quiet_steps(self, steps, time_delta_minutes):
+        """Advance clock, positions and delay countdowns through steps in which no logic fires"""
+        self.current_time += timedelta(minutes=time_delta_minutes) * steps
+        for _ in range(steps):
+            self.simulation_minutes += time_delta_minutes
+        
+        if self.engine is not None:
+            self.engine.advance_quiet(steps, time_delta_minutes)
+            return
+        
+        # Repeat the per-step arithmetic of update_position so positions match fixed stepping exactly
+        for train in self.trains:
+            if not train.has_started or train.destination_reached or train.is_on_side_track:
+                continue
+            if train.delay_minutes > 0:
+                delay = train.delay_minutes
+                for _ in range(steps):
+                    delay -= time_delta_minutes
+                train.delay_minutes = delay
+            elif not train.is_stopped and not train.emergency_stopped:
+                distance_increment = train.current_speed / 60 * time_delta_minutes
+                position = train.position_km
+                for _ in range(steps):
+                    position = min(self.track.total_length_km, position + distance_increment)
+                train.position_km = position
+        self.position_index.refresh()
+    
+    def _steps_to_next_event(self, time_delta_minutes):
+        """How many fixed steps can be merged before the next event
+        
+        Events are scheduled starts, delay expiry, a train crossing a 50/35/20/10km phase
+        boundary around a delayed train, an overtaking trigger at 25km, a side track release,
+        entering a block when crossings are planned and arrival at the end of the line. Returns 1
+        while any handler would change state, so every phase change happens on the same step as
+        with fixed stepping.
+        """
+        self.sync_trains()
+        next_event = math.inf  # First step whose logic would change anything
+        
+        def steps_until(distance_km, closing_speed):
+            if closing_speed <= 0:
+                return math.inf
+            return math.ceil(distance_km / (closing_speed / 60 * time_delta_minutes))
+        
+        def steps_to_cross(gap, rate, boundaries):
+            # First step at which a signed gap changing at rate km/h reaches the next boundary
+            if rate > 0:
+                ahead = [b for b in boundaries if b >= gap]
+                return steps_until(min(ahead) - gap, rate) if ahead else math.inf
+            if rate < 0:
+                ahead = [b for b in boundaries if b <= gap]
+                return steps_until(gap - max(ahead), -rate) if ahead else math.inf
+            return math.inf
+        
+        def speed(train):
+            moving = (train.has_started and not train.destination_reached and not train.is_on_side_track and
+                      train.delay_minutes <= 0 and not train.is_stopped and not train.emergency_stopped)
+            return train.current_speed if moving else 0
+        
+        main_line = [t for t in self.trains if t.has_started and not t.destination_reached and not t.is_on_side_track]
+        
+        # Phase boundaries are only crossed inside the 50km window, which is scanned through a freshly
+        # sorted index - trains outside it are bounded by the nearest one closing in at the top speed
+        window_index = TrainPositionIndex()
+        if any(t.has_started and t.delay_minutes > 0 for t in self.trains):
+            window_index.rebuild(self.trains)
+        top_speed = max((speed(t) for t in main_line), default=0)
+        phase_boundaries = (-50, -35, -20, -10, 0, 10, 20, 35, 50)
+        
+        for train in self.trains:
+            if not train.has_started:
+                minutes_to_start = (train.scheduled_start - self.current_time).total_seconds() / 60
+                next_event = min(next_event, math.ceil(minutes_to_start / time_delta_minutes) - 1)
+                continue
+            
+            # Delay recovery holds within 10km and keeps re-applying speed matching up to 20km,
+            # both no-ops until the gap leaves that band - anything further acts right away
+            target = train.phase_target_train
+            if train.phase != NORMAL and target and target.delay_minutes <= 0:
+                gap = train.position_km - target.position_km
+                speed_matched = (train.current_phase == "SPEED_MATCH" and train.is_speed_matched and
+                                 train.speed_matched_to_train is target and
+                                 train.current_speed == target.current_speed)
+                if abs(gap) > 20 or (abs(gap) > 10 and not speed_matched):
+                    return 1
+                next_event = min(next_event, steps_to_cross(gap, speed(train) - speed(target), (-20, -10, 0, 10, 20)))
+            elif train.emergency_stopped and train.delay_minutes <= 0 and target is None:
+                return 1
+            
+            if train.delay_minutes > 0:
+                next_event = min(next_event, math.ceil(train.delay_minutes / time_delta_minutes) - 1)
+                
+                # Four-phase handling only changes anything when a train crosses a phase boundary
+                positions = window_index.positions
+                lo = bisect.bisect_left(positions, train.position_km - 50 - 1e-6)
+                hi = bisect.bisect_right(positions, train.position_km + 50 + 1e-6)
+                for other in window_index.trains[lo:hi]:
+                    if other is not train:
+                        next_event = min(next_event, steps_to_cross(other.position_km - train.position_km,
+                                                                    speed(other) - speed(train), phase_boundaries))
+                if lo > 0:
+                    next_event = min(next_event, steps_until(train.position_km - 50 - positions[lo - 1] - 1e-6,
+                                                             top_speed - speed(train)))
+            
+            if not train.destination_reached and speed(train) > 0:
+                remaining = self.track.total_length_km - train.position_km
+                next_event = min(next_event, steps_until(remaining, speed(train)) - 1)
+                
+                # Passing a crossing loop into the next block checks the train against its slot on that step
+                block = bisect.bisect_left(self.block_start_km, train.position_km)
+                if block < len(self.block_start_km):
+                    next_event = min(next_event, steps_until(self.block_start_km[block] - train.position_km, speed(train)))
+        
+        # ...or when a follower is not yet in the phase its most restrictive delayed train calls for
+        # (the window index is current, and only empty when there are no delayed trains)
+        position_index = self.position_index if self.engine is None else window_index
+        delayed_trains = [t for t in self.trains if t.has_started and t.delay_minutes > 0]
+        constraints, contested = self._resolve_four_phase_constraints(delayed_trains, position_index)
+        for other, train, distance in constraints:
+            phase = self._phase_for_distance(distance)
+            if (id(other) in contested or other.current_phase != phase or other.phase_target_train != train or
+                    (phase == "EMERGENCY" and not other.emergency_stopped)):
+                return 1
+        
+        # Overtaking: adjacent pairs reaching 25km, or changing order
+        active_trains = sorted((t for t in self.trains
+                                if (t.has_started and 
+                                    not t.destination_reached and
+                                    not t.is_stopped and
+                                    t.delay_minutes <= 0 and
+                                    t.phase == NORMAL)), key=lambda t: t.position_km)
+        for train_behind, train_ahead in zip(active_trains, active_trains[1:]):
+            distance_gap = train_ahead.position_km - train_behind.position_km
+            can_overtake = train_behind.original_speed > train_ahead.original_speed
+            if can_overtake and 0 < distance_gap <= 25:
+                if not train_behind.is_speed_matched or self.track.find_next_village_ahead(train_ahead.position_km):
+                    return 1
+            trigger_gap = 25 if can_overtake and distance_gap > 25 else 0
+            next_event = min(next_event, steps_until(distance_gap - trigger_gap, speed(train_behind) - speed(train_ahead)))
+        
+        # Side track release: faster train 30km past and main track clear for 15km
+        for train in self.trains:
+            if train.is_on_side_track and train.waiting_for_train and train.side_track_location:
+                faster_train = train.waiting_for_train
+                side_track_pos = train.side_track_location.position_km
+                if faster_train.destination_reached or faster_train.position_km > side_track_pos + 30:
+                    passed = 0
+                else:
+                    passed = steps_until(side_track_pos + 30 - faster_train.position_km, speed(faster_train)) - 1
+                blocking = [steps_until(side_track_pos + 15 - t.position_km, speed(t)) - 1
+                            for t in main_line if abs(t.position_km - side_track_pos) < 15]
+                next_event = min(next_event, max(passed, min(blocking, default=passed)))
+        
+        # One step of slack absorbs floating point drift in the merged step
+        return max(1, next_event - 1)
+    
+    def trigger_user_delay(self, train=None, delay_amount=None):
+        """Trigger delay with 4-phase logic, on a random running train unless one is given"""
+        self.sync_trains()
+        active_trains = [t for t in self.trains if t.has_started and not t.destination_reached and not t.is_on_side_track]
+        if not active_trains or (train is not None and train not in active_trains):
+            return None
+        
+        # Select random train for delay
+        delayed_train = train if train is not None else self.rng.choice(active_trains)
+        if delay_amount is None:
+            delay_amount = self.rng.randint(15, 45)  # 15-45 minute delay
+        
+        self.event_log.info("USER_DELAY", "=== USER DELAY TRIGGERED ===\nTrain: {} (Priority {})\nPosition: {:.1f}km\nDelay: {} minutes",
+                            delayed_train.name, delayed_train.priority, delayed_train.position_km, delay_amount)
+        
+        # Add the delay
+        delayed_train.add_delay(delay_amount, "User-triggered delay")
+        self.delay_events.append({
+            'type': 'primary',
+            'train': delayed_train.name,
+            'source': None,
+            'minutes': delay_amount,
+            'time': self.simulation_minutes
+        })
+        if self.engine is not None:
+            self.engine.reload_train(delayed_train)
+        if self.optimizer is not None:
+            self.optimizer_reports.append(self.optimizer.respond(self, delayed_train))
+        
+        return delayed_train
+    
+    def apply_position_reports(self, reports):
+        """Move trains to externally reported positions, e.g. from a live feed - returns how many applied
+        
+        reports holds (train, position_km) pairs. A report starts a train that has not started yet;
+        trains parked on a side track stay there.
+        """
+        if self.engine is not None:
+            return self.engine.apply_position_reports(reports)
+        
+        # Only the reported trains are touched - a tick costs one index refresh, not a rebuild
+        applied = 0
+        started = []
+        for train, position_km in reports:
+            if train.destination_reached or train.is_on_side_track:
+                continue
+            if not train.has_started:
+                train.scheduled_start = min(train.scheduled_start, self.current_time)
+                train.start_journey(self.current_time)
+                started.append(train)
+                self.event_log.info("TRAIN_STARTED", "🚀 TRAIN STARTED: {} (P{}, {}km/h) at {:%H:%M} - reported by feed",
+                                    train.name, train.priority, train.original_speed, self.current_time)
+            train.position_km = min(max(position_km, 0.0), self.track.total_length_km)
+            if train.position_km >= self.track.total_length_km:
+                train.destination_reached = True
+                train.is_stopped = True
+                train.set_reason(REASON_JOURNEY_COMPLETED)
+                train.update_status_counters()
+            self.track.update_train_segment(train, None if train.destination_reached else train.position_km)
+            applied += 1
+        
+        if applied:
+            self.position_index.refresh()
+            for train in started:
+                if not train.destination_reached:
+                    self.position_index.add(train, self.trains.index(train))
+        return applied
+    
+    def sync_trains(self):
+        """Bring Train objects up to date when the vectorized engine is running"""
+        if self.engine is not None:
+            self.engine.sync_to_trains()
+    
+    def _handle_four_phase_delay_logic(self):
+        """NEW: Implement universal 4-phase progressive delay handling with chain reactions"""
+        # ALL trains that are currently delayed (including chain delays) constrain the trains around them,
+        # each follower reacting once to the most restrictive of them
+        constraints, _ = self._resolve_four_phase_constraints(self.delay_cascade.delayed_trains(), self.position_index)
+        for approaching_train, delayed_train, distance in constraints:
+            if delayed_train.phase_target_train is not None:
+                self.event_log.debug("CHAIN_REACTION", "CHAIN REACTION: {} approaching secondary delayed {}",
+                                     approaching_train.name, delayed_train.name)
+            self._apply_four_phase_logic(delayed_train, approaching_train, distance)
+    
+    def _resolve_four_phase_constraints(self, delayed_trains, position_index):
+        """One (follower, delayed train, distance) per main line train within 50km of a delayed train
+        
+        The delayed train putting a follower in the most restrictive phase wins, then the slowest one,
+        then the nearest. Followers come in train list order. Also returns the ids of followers whose
+        winner is only decided by distance, as that can change without crossing a phase boundary.
+        """
+        order = position_index.order
+        best = {}
+        contested = set()
+        for delayed_train in delayed_trains:
+            for distance, train in position_index.within(delayed_train.position_km, 50):
+                # A secondary delayed train never constrains the train it is reacting to
+                if train is delayed_train or distance <= 0 or train is delayed_train.phase_target_train:
+                    continue
+                key = (-PHASE_CODES[self._phase_for_distance(distance)], delayed_train.current_speed,
+                       distance, order[id(delayed_train)])
+                current = best.get(train)
+                if current is not None and key[:2] == current[0][:2]:
+                    contested.add(id(train))
+                if current is None or key < current[0]:
+                    if current is not None and key[:2] != current[0][:2]:
+                        contested.discard(id(train))
+                    best[train] = (key, delayed_train, distance)
+        followers = sorted(best, key=lambda train: order[id(train)])
+        return [(train, best[train][1], best[train][2]) for train in followers], contested
+    
+    def _apply_four_phase_logic(self, delayed_train, approaching_train, distance):
+        """NEW: Apply the 4-phase progressive delay logic UNIVERSALLY (regardless of speed)"""
+        
+        # Apply 4-phase logic to ANY train approaching a delayed train
+        # Remove speed condition - works for faster, slower, or equal speed trains
+        
+        # Determine phase based on distance
+        new_phase = self._phase_for_distance(distance)
+        
+        # Apply phase if it's different from current phase
+        if approaching_train.current_phase != new_phase or approaching_train.phase_target_train != delayed_train:
+            approaching_train.set_phase(new_phase, distance, delayed_train)
+        
+        # Special handling for Phase 4 - Emergency Stop (UNIVERSAL)
+        if new_phase == "EMERGENCY" and not approaching_train.emergency_stopped:
+            # Calculate collision prediction
+            speed_diff = approaching_train.current_speed - delayed_train.current_speed
+            if speed_diff > 0:
+                time_to_collision = distance / (speed_diff / 60)  # minutes
+            else:
+                time_to_collision = float('inf')
+            
+            self.event_log.debug("EMERGENCY_ANALYSIS",
+                                 "UNIVERSAL EMERGENCY ANALYSIS:\n  Approaching train: {} ({}km/h)\n  Delayed train: {} ({}km/h)\n"
+                                 "  Distance: {:.1f}km\n  Speed difference: {:.1f}km/h\n  Time to collision: {:.1f} minutes\n"
+                                 "  Delay remaining: {:.1f} minutes",
+                                 approaching_train.name, approaching_train.original_speed,
+                                 delayed_train.name, delayed_train.original_speed,
+                                 distance, speed_diff, time_to_collision, delayed_train.delay_minutes)
+            
+            # Emergency stop with delay inheritance (REGARDLESS of speed relationship)
+            if time_to_collision <= delayed_train.delay_minutes:
+                self.event_log.debug("EMERGENCY_ANALYSIS", "  → COLLISION INEVITABLE - Emergency stop + delay inheritance")
+                approaching_train.emergency_stop(delayed_train, f"Collision inevitable with {delayed_train.name}")
+                self.delay_events.append({
+                    'type': 'secondary',
+                    'train': approaching_train.name,
+                    'source': delayed_train.name,
+                    'minutes': delayed_train.delay_minutes,
+                    'time': self.simulation_minutes
+                })
+            else:
+                self.event_log.warning("EMERGENCY_HOLD", "EMERGENCY HOLD: {} - delay on {} will end in time, maintaining emergency protocols",
+                                       approaching_train.name, delayed_train.name)
+                # Still emergency stop but with possibility of recovery
+                approaching_train.current_speed = 0
+                approaching_train.emergency_stopped = True
+                approaching_train.is_stopped = True
+                approaching_train.set_reason(REASON_EMERGENCY_HOLD, ref=delayed_train)
+                approaching_train.update_status_counters()
+    
+    def _phase_for_distance(self, distance):
+        """Four-phase band for a train this far from a delayed train"""
+        if distance > 35:
+            # Phase 1: Far Away - Monitor Only (50-35km)
+            return "MONITOR"
+        elif distance > 20:
+            # Phase 2: Getting Closer - Progressive Slowdown (35-20km)
+            return "PROGRESSIVE"
+        elif distance > 10:
+            # Phase 3: Very Close - Speed Matching (20-10km)
+            return "SPEED_MATCH"
+        else:
+            # Phase 4: Emergency Zone - Emergency Stop (≤10km)
+            return "EMERGENCY"
+    
+    def _handle_delay_recovery(self):
+        """Enhanced delay recovery handling with proper speed restoration"""
+        # Only trains in a delay phase or emergency stop can recover
+        for train in self.delay_cascade.constrained_trains():
+            # Check if train is in any delay-related phase but the target train is no longer delayed
+            if (train.phase != NORMAL and 
+                train.phase_target_train and 
+                train.phase_target_train.delay_minutes <= 0):
+                
+                delayed_train = train.phase_target_train
+                distance = abs(delayed_train.position_km - train.position_km)
+                
+                self.event_log.debug("RECOVERY_CHECK",
+                                     "DELAY RECOVERY: {} can potentially resume - {} no longer delayed\n  Current distance: {:.1f}km\n"
+                                     "  Current phase: {}\n  Current speed: {}km/h, Original speed: {}km/h",
+                                     train.name, delayed_train.name, distance, train.current_phase,
+                                     train.current_speed, train.original_speed)
+                
+                # Recovery logic based on distance
+                if distance > 35:  # Far enough for complete recovery
+                    self.event_log.debug("RECOVERY_CHECK", "  → FULL RECOVERY - Restoring to {}km/h", train.original_speed)
+                    train.resume_normal_speed()
+                elif distance > 20:  # Partial recovery
+                    self.event_log.debug("RECOVERY_CHECK", "  → PARTIAL RECOVERY - Gradual speed increase")
+                    train.set_phase("PROGRESSIVE", distance, delayed_train)
+                elif distance > 10:  # Still close, speed matching
+                    self.event_log.debug("RECOVERY_CHECK", "  → CAUTIOUS RECOVERY - Maintaining close monitoring")
+                    train.set_phase("SPEED_MATCH", distance, delayed_train)
+                else:
+                    self.event_log.debug("RECOVERY_CHECK", "  → TOO CLOSE - Maintaining emergency protocols")
+                    # Keep emergency status until more distance
+            
+            # NEW: Handle trains that had their own delay (not due to other trains) and should recover
+            elif (train.delay_minutes <= 0 and 
+                  train.emergency_stopped and 
+                  train.phase_target_train is None):
+                self.event_log.info("RECOVERY", "DIRECT DELAY RECOVERY: {} own delay ended - resuming normal speed", train.name)
+                train.resume_normal_speed()
+    
+    def _handle_overtaking_logic(self):
+        """Handle normal overtaking when no delays are involved"""
+        active_trains = [t for t in self.trains 
+                        if (t.has_started and 
+                            not t.destination_reached and
+                            not t.is_stopped and
+                            t.delay_minutes <= 0 and
+                            t.phase == NORMAL)]
+        
+        if len(active_trains) < 2:
+            return
+            
+        # Sweep the trains in position order - only a train and its immediate leader
+        # can start an overtake. Leaders go first so a matched speed passes back.
+        active_trains.sort(key=lambda t: t.position_km)
+        for k in range(len(active_trains) - 1, 0, -1):
+            train_behind = active_trains[k - 1]
+            train_ahead = active_trains[k]
+            
+            # Only process if conditions are met for overtaking
+            if (train_behind.position_km < train_ahead.position_km and
+                train_behind.original_speed > train_ahead.original_speed and
+                not train_behind.is_on_side_track and
+                not train_ahead.is_on_side_track):
+                
+                distance_gap = train_ahead.position_km - train_behind.position_km
+                
+                # When faster train gets within 25km
+                if distance_gap <= 25 and distance_gap > 0:
+                    # Step 1: Slow down faster train
+                    if not train_behind.is_speed_matched:
+                        self.event_log.info("OVERTAKE", "🚂 OVERTAKING STEP 1: {} slowing to match {}", train_behind.name, train_ahead.name)
+                        train_behind.current_speed = train_ahead.current_speed
+                        train_behind.is_speed_matched = True
+                        train_behind.speed_matched_to_train = train_ahead
+                    
+                    # Step 2: Move slower train to side track
+                    if not train_ahead.is_on_side_track:
+                        side_track = self.track.find_next_village_ahead(train_ahead.position_km)
+                        
+                        if side_track and side_track.occupied_side_tracks < side_track.side_tracks:
+                            self.event_log.info("OVERTAKE", "🛤  OVERTAKING STEP 2: Moving {} to yellow track at {}", train_ahead.name, side_track.name)
+                            
+                            train_ahead.move_to_side_track(side_track, f"Allowing {train_behind.name} to overtake")
+                            train_ahead.waiting_for_train = train_behind
+                            
+                            # Step 3: Restore faster train's speed
+                            self.event_log.info("OVERTAKE", "⚡ OVERTAKING STEP 3: {} resuming full speed", train_behind.name)
+                            train_behind.resume_normal_speed()
+                            
+                            self.overtaking_events.append({
+                                'slower_train': train_ahead.name,
+                                'faster_train': train_behind.name,
+                                'location': side_track.name,
+                                'time': self.simulation_minutes
+                            })
+    
+    def _process_side_track_returns(self):
+        """Process trains returning from side tracks"""
+        for train in self.trains:
+            if train.is_on_side_track and train.waiting_for_train and train.side_track_location:
+                faster_train = train.waiting_for_train
+                side_track_pos = train.side_track_location.position_km
+                faster_train_pos = faster_train.position_km
+                buffer_distance = 30  # 30km safety buffer
+                
+                # Check if faster train has passed with buffer
+                required_position = side_track_pos + buffer_distance
+                has_passed = (faster_train_pos > required_position or faster_train.destination_reached)
+                
+                if has_passed:
+                    # Check if main track is clear
+                    main_track_clear = self._is_main_track_clear_at_position(side_track_pos, 15)
+                    
+                    if main_track_clear:
+                        self.event_log.info("OVERTAKE", "🔄 STEP 4: {} returning from {}", train.name, train.side_track_location.name)
+                        train.return_to_main_track()
+                        self.position_index.add(train, self.trains.index(train))
+    
+    def _is_main_track_clear_at_position(self, position_km, buffer_km=20):
+        """Check if main track is clear at given position with buffer"""
+        for distance, train in self.position_index.within(position_km, buffer_km):
+            if distance < buffer_km:
+                return False
+        return True
+    
+    def _update_track_occupancy(self):
+        """Update which trains are in which segments - only boundary crossings change anything"""
+        entries = []
+        for train in self.trains:
+            on_main_line = train.has_started and not train.destination_reached and not train.is_on_side_track
+            moved = self.track.update_train_segment(train, train.position_km if on_main_line else None)
+            if moved and on_main_line and self.crossings is not None:
+                entries.append((train, self.track.train_segments.get(train), train.current_speed))
+        if entries:
+            for train, minutes, reason in self._enter_blocks(entries):
+                train.add_delay(minutes, reason)
+    
+    def get_system_status(self):
+        """Get comprehensive system status with chain reaction tracking"""
+        if self.engine is not None:
+            return self.engine.get_system_status()
+        
+        # Counters are kept up to date by the trains themselves, so this is O(1)
+        counts = self.status_counters
+        return {
+            'current_time': self.current_time.strftime('%H:%M:%S'),
+            'simulation_minutes': self.simulation_minutes,
+            'total_trains': len(self.trains) + self.retired_trains,
+            'waiting_to_start': counts['waiting_to_start'],
+            'active_trains': counts['active_trains'],
+            'primary_delays': counts['primary_delays'],
+            'secondary_delays': counts['secondary_delays'],
+            'total_delayed_trains': counts['total_delayed_trains'],
+            'side_track_trains': counts['side_track_trains'],
+            'emergency_stopped': counts['emergency_stopped'],
+            'completed_trains': counts['completed_trains'] + self.retired_trains,
+            'overtaking_events': len(self.overtaking_events),
+            'phase_counts': counts.grouped('phase')
+        }
+    
+    def retire_finished_trains(self):
+        """Drop trains that reached their destination, returns them - long runs stay proportional to trains in flight
+        
+        A finished train that a remaining train still refers to (e.g. as the train it waits for) stays until released.
+        """
+        self.sync_trains()
+        keep = {id(t) for t in self.trains if not t.destination_reached}
+        pending = [t for t in self.trains if id(t) in keep]
+        while pending:
+            train = pending.pop()
+            refs = (train.phase_target_train, train.speed_matched_to_train, train.waiting_for_train, train.reason_ref)
+            for other in refs:
+                if isinstance(other, Train) and id(other) not in keep:
+                    keep.add(id(other))
+                    pending.append(other)
+        retired = [t for t in self.trains if id(t) not in keep]
+        if retired:
+            self.trains = [t for t in self.trains if id(t) in keep]
+            self.retired_trains += len(retired)
+            self.retired_records.extend(train.record() for train in retired)
+            self.rebuild_indexes()
+        return retired
+    
+    def recount_status(self):
+        """Rebuild the status counters and delay cascade from scratch after trains were edited directly"""
+        self.status_counters.clear()
+        self.delay_cascade.rebuild(self.trains if self.engine is None else [])
+        for train in self.trains:
+            train.status_counters = self.status_counters if self.engine is None else None
+            train.delay_cascade = self.delay_cascade if self.engine is None else None
+            train.status_labels = ()
+            train.update_status_counters()
+
+    def rebuild_indexes(self):
+        """Rebuild position index, status counters and segment occupancy, e.g. after restoring a checkpoint"""
+        self.position_index.rebuild(self.trains)
+        self.recount_status()
+        self._update_track_occupancy()
+        if self.engine is not None:
+            self.engine.load()
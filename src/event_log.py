@@ -0,0 +1,96 @@
+import queue
+import threading
+from collections import deque
+
+# Event levels, lowest first
+DEBUG = 10
+INFO = 20
+WARNING = 30
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING"}
+
+class LogEvent:
+    """One logged event - the message text is only built when somebody reads it"""
+    __slots__ = ('time', 'level', 'kind', 'template', 'args')
+
+    def __init__(self, time, level, kind, template, args):
+        self.time = time
+        self.level = level
+        self.kind = kind
+        self.template = template
+        self.args = args
+
+    @property
+    def message(self):
+        return self.template.format(*self.args) if self.args else self.template
+
+    def __str__(self):
+        return f"[{self.time:9.2f}] {LEVEL_NAMES.get(self.level, self.level):<7} {self.kind}: {self.message}"
+
+class FileSink:
+    """Append events to a file from a background thread, off the simulation loop"""
+
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def write(self, event):
+        self.queue.put(event)
+
+    def close(self):
+        """Write out everything still queued and stop the writer thread"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _write_loop(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                event = self.queue.get()
+                if event is None:
+                    break
+                f.write(str(event) + "\n")
+                if self.queue.empty():
+                    f.flush()
+
+class EventLog:
+    """Bounded in-memory event log with level filtering and an optional file sink"""
+
+    def __init__(self, capacity=10000, level=INFO, echo=False, sink=None):
+        self.events = deque(maxlen=capacity)  # Ring buffer - oldest events drop off
+        self.level = level
+        self.echo = echo  # Also print messages, for interactive runs
+        self.sink = sink
+        self.time_source = lambda: 0  # Owner plugs in its simulation clock
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def emit(self, level, kind, template, *args):
+        """Record an event; template is a str.format string filled from args on demand"""
+        if level < self.level:
+            return
+        event = LogEvent(self.time_source(), level, kind, template, args)
+        self.events.append(event)
+        if self.echo:
+            print(event.message)
+        if self.sink is not None:
+            self.sink.write(event)
+
+    def debug(self, kind, template, *args):
+        self.emit(DEBUG, kind, template, *args)
+
+    def info(self, kind, template, *args):
+        self.emit(INFO, kind, template, *args)
+
+    def warning(self, kind, template, *args):
+        self.emit(WARNING, kind, template, *args)
+
+    def recent(self, count=None, kind=None, level=DEBUG):
+        """Latest events, optionally only one kind and at least a given level"""
+        events = [e for e in self.events if e.level >= level and (kind is None or e.kind == kind)]
+        return events if count is None else events[-count:]
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
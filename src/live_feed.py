@@ -0,0 +1,243 @@
+import json
+import heapq
+import asyncio
+import argparse
+from collections import Counter
+from src.dynamic_scheduler import DynamicRailwayScheduler
+from src.event_log import EventLog
+
+MESSAGE_TYPES = ('position', 'delay')
+
+class LiveFeed:
+    """Feeds position reports and delay incidents from asyncio sources into a scheduler between steps
+
+    Sources await put(), which blocks once max_pending messages are queued, so a fast feed is held
+    back instead of growing memory. Before each step the queue is drained and only the latest report
+    per train is kept - a position report replaces an older one, a delay incident replaces an older
+    estimate for the same train - then the batch is applied in one go.
+    """
+
+    def __init__(self, scheduler, max_pending=10000):
+        self.scheduler = scheduler
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.positions = {}  # Train -> latest reported position_km this tick
+        self.delays = {}     # Train -> latest reported delay minutes this tick
+        self.stats = Counter()
+        self._trains = {}    # Train id and name -> Train, rebuilt when trains are added
+        self._known = 0
+        self._waiters = []   # Heap of (minute, sequence, future) for wait_until
+        self._sequence = 0
+
+    async def put(self, message):
+        """Queue one feed message, waiting while the queue is full"""
+        if not isinstance(message, dict) or message.get('type') not in MESSAGE_TYPES or 'train' not in message:
+            raise ValueError(f"Not a feed message: {message!r}")
+        if message['type'] == 'position' and not isinstance(message.get('position_km'), (int, float)):
+            raise ValueError(f"Position report without position_km: {message!r}")
+        if message['type'] == 'delay' and not isinstance(message.get('minutes'), (int, float)):
+            raise ValueError(f"Delay incident without minutes: {message!r}")
+        if self.queue.full():
+            self.stats['backpressure_waits'] += 1
+        await self.queue.put(message)
+        self.stats['received'] += 1
+
+    async def wait_until(self, minute):
+        """Sleep until the simulation clock reaches minute"""
+        if self.scheduler.simulation_minutes >= minute:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._waiters, (minute, self._sequence, future))
+        await future
+
+    def ingest(self):
+        """Drain the queue into the per-train buffers and apply them, returns messages drained"""
+        drained = 0
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            drained += 1
+            train = self._find_train(message)
+            if train is None:
+                continue
+            buffer = self.positions if message['type'] == 'position' else self.delays
+            if train in buffer:
+                self.stats['coalesced'] += 1
+            buffer[train] = message['position_km'] if message['type'] == 'position' else message['minutes']
+        self.apply()
+        return drained
+
+    def apply(self):
+        """Hand the buffered reports to the scheduler - positions first, then delays"""
+        scheduler = self.scheduler
+        if self.positions:
+            applied = scheduler.apply_position_reports(self.positions.items())
+            self.stats['positions_applied'] += applied
+            self.stats['positions_ignored'] += len(self.positions) - applied
+            self.positions = {}
+        for train, minutes in self.delays.items():
+            if scheduler.trigger_user_delay(train, minutes) is not None:
+                self.stats['delays_applied'] += 1
+            else:
+                self.stats['delays_ignored'] += 1  # Train not running on the main line
+        self.delays = {}
+
+    async def run(self, until_minutes, step_minutes=0.05, speed=None):
+        """Step the scheduler to until_minutes, ingesting the feed before every step
+
+        speed is simulated seconds per real second; None steps as fast as the feed allows.
+        """
+        scheduler = self.scheduler
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        start_minutes = scheduler.simulation_minutes
+        while scheduler.simulation_minutes < until_minutes - step_minutes / 2:
+            self.ingest()
+            scheduler.simulate_step(step_minutes)
+            self.stats['steps'] += 1
+            self._wake_waiters()
+            if speed is None:
+                await asyncio.sleep(0)  # Let sources queue the next batch
+            else:
+                due = started + (scheduler.simulation_minutes - start_minutes) * 60 / speed
+                await asyncio.sleep(max(0.0, due - loop.time()))
+        self.ingest()
+        self._wake_waiters(force=True)
+        return dict(self.stats)
+
+    def _wake_waiters(self, force=False):
+        now = self.scheduler.simulation_minutes
+        while self._waiters and (force or self._waiters[0][0] <= now):
+            future = heapq.heappop(self._waiters)[2]
+            if not future.done():
+                future.set_result(None)
+
+    def _find_train(self, message):
+        """Train a message refers to by id or name - a position report with a speed admits a new train"""
+        ref = message['train']
+        trains = self.scheduler.trains
+        if self._known != len(trains):
+            self._known = len(trains)
+            self._trains = {}
+            for train in trains:
+                self._trains.setdefault(train.id, train)
+                self._trains.setdefault(train.name, train)
+        train = self._trains.get(ref)
+        if train is None and message['type'] == 'position' and 'speed' in message:
+            config = {'id': ref if isinstance(ref, int) else len(trains) + 1, 'name': message.get('name', str(ref)),
+                      'priority': message.get('priority', 3), 'speed': message['speed']}
+            train = self.scheduler.admit_train(config)
+            self.stats['trains_admitted'] += 1
+        if train is None:
+            self.stats['unknown_train'] += 1
+        return train
+
+async def replay_jsonl(feed, path, paced=True):
+    """Put every message of a JSONL file into the feed - with paced, each waits for its 'minute'"""
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+                if paced and 'minute' in message:
+                    await feed.wait_until(message['minute'])
+                await feed.put(message)
+            except ValueError:
+                feed.stats['invalid'] += 1
+
+async def serve_feed(feed, port, host='127.0.0.1'):
+    """Accept JSONL feed connections on host:port - a stand-in for a live socket feed"""
+    async def handle(reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    await feed.put(json.loads(line))
+                except ValueError:
+                    feed.stats['invalid'] += 1
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+class LiveFeedRunner:
+    """Scheduler driven by a JSONL replay or a socket feed instead of the D key"""
+
+    def __init__(self, train_configs, feed_file=None, listen_port=None, engine="object", step_minutes=0.05,
+                 seed=None, speed=None, max_pending=10000, shuffle=True):
+        self.train_configs = train_configs
+        self.feed_file = feed_file
+        self.listen_port = listen_port
+        self.engine = engine
+        self.step_minutes = step_minutes
+        self.seed = seed
+        self.speed = speed
+        self.max_pending = max_pending
+        self.shuffle = shuffle
+
+    def run(self, until_minutes):
+        """Run to until_minutes and return feed statistics and the final system status"""
+        return asyncio.run(self._run(until_minutes))
+
+    async def _run(self, until_minutes):
+        scheduler = DynamicRailwayScheduler(engine=self.engine, event_log=EventLog(), seed=self.seed)
+        scheduler.create_dynamic_schedule(self.train_configs or [], shuffle=self.shuffle)
+        feed = LiveFeed(scheduler, max_pending=self.max_pending)
+        sources = []
+        server = None
+        if self.feed_file:
+            sources.append(asyncio.create_task(replay_jsonl(feed, self.feed_file)))
+        if self.listen_port is not None:
+            server = await serve_feed(feed, self.listen_port)
+        try:
+            stats = await feed.run(until_minutes, self.step_minutes, self.speed)
+        finally:
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+            for source in sources:
+                source.cancel()
+            await asyncio.gather(*sources, return_exceptions=True)
+        scheduler.sync_trains()
+        return {'feed': stats, 'status': scheduler.get_system_status(),
+                'trains': [{'id': t.id, 'name': t.name, 'position_km': t.position_km,
+                            'total_delay_minutes': t.total_delay_accumulated} for t in scheduler.trains]}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the scheduler from a live position and incident feed")
+    parser.add_argument('trains', nargs='?', help="JSON file with the scheduled trains (feed trains may join too)")
+    parser.add_argument('--feed', help="JSONL file to replay: {type: position|delay, train, position_km|minutes, minute?}")
+    parser.add_argument('--listen', type=int, metavar='PORT', help="Also accept JSONL feed connections on 127.0.0.1:PORT")
+    parser.add_argument('--until', type=float, default=1440, help="Simulated minute to run to (default: one day)")
+    parser.add_argument('--speed', type=float, help="Simulated seconds per real second (default: as fast as possible)")
+    parser.add_argument('--engine', choices=["object", "vectorized", "auto"], default="object")
+    parser.add_argument('--step', type=float, default=0.05, help="Simulated minutes per step")
+    parser.add_argument('--max-pending', type=int, default=10000, help="Queued messages before sources are held back")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--fixed-order', action='store_true', help="Start trains in config order instead of shuffling")
+    parser.add_argument('--output', help="Write feed statistics and final status to this JSON file instead of stdout")
+    args = parser.parse_args(argv)
+    if not args.feed and args.listen is None:
+        parser.error("give a --feed file to replay or a --listen port")
+
+    train_configs = []
+    if args.trains:
+        with open(args.trains) as f:
+            train_configs = json.load(f)
+    runner = LiveFeedRunner(train_configs, feed_file=args.feed, listen_port=args.listen, engine=args.engine,
+                            step_minutes=args.step, seed=args.seed, speed=args.speed,
+                            max_pending=args.max_pending, shuffle=not args.fixed_order)
+    result = runner.run(args.until)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Ingested {result['feed'].get('received', 0)} messages over {result['feed'].get('steps', 0)} steps "
+              f"-> {args.output}")
+    else:
+        print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import io
+import math
+import time
+from src.checkpoint import save_checkpoint, load_checkpoint
+from src.event_log import EventLog, WARNING
+from src.train_codes import NORMAL
+
+SIDING_REACH_KM = 1.0  # A train this close to a free side track can pull in straight away
+STATION_REACH_KM = 1.0  # A train this close to a station can be held there
+EMERGENCY_KM = 10      # Followers that get this close to a delayed train stop and inherit its delay
+MONITOR_KM = 50        # Beyond this the 4-phase logic leaves followers alone
+
+class LookaheadOptimizer:
+    """Anytime search for holds, slow approaches and side-track moves that cut the delay a train passes on"""
+
+    def __init__(self, budget_ms=200, horizon_minutes=30, radius_km=150, max_followers=6, step_minutes=0.5):
+        self.budget_ms = budget_ms  # Wall-clock limit per delay event - the best plan so far is used
+        self.horizon_minutes = horizon_minutes  # Simulated past the end of the delay when scoring a plan
+        self.radius_km = radius_km  # Followers this far behind the delayed train are considered
+        self.max_followers = max_followers
+        self.step_minutes = step_minutes  # Coarser than the live run - plans only need ranking
+
+    def respond(self, scheduler, delayed_train):
+        """Optimize for a fresh delay and apply the best plan found, returns the report"""
+        report, actions = self.optimize(scheduler, delayed_train)
+        self.apply(scheduler, delayed_train, actions)
+        scheduler.event_log.info("LOOKAHEAD", "🧭 LOOKAHEAD: {} action(s) for {} - {:.1f} -> {:.1f} lost min ({} plans, {:.0f}ms)",
+                                 len(actions), delayed_train.name, report['baseline_lost_minutes'],
+                                 report['lost_minutes'], report['plans_evaluated'], report['latency_ms'])
+        return report
+
+    def optimize(self, scheduler, delayed_train):
+        """Best plan for delayed_train's followers within the time budget, as (report, actions)"""
+        started = time.perf_counter()
+        deadline = started + self.budget_ms / 1000
+        scheduler.sync_trains()
+
+        followers = self._followers(scheduler, delayed_train)
+        local = self._local_trains(scheduler, delayed_train, followers)
+        base = io.BytesIO()
+        save_checkpoint(scheduler, base, trains=local)
+        base = base.getvalue()
+        horizon = delayed_train.delay_minutes + self.horizon_minutes
+        index = {id(t): i for i, t in enumerate(local)}
+
+        evaluated = 0
+        def score(plan):
+            nonlocal evaluated
+            evaluated += 1
+            return self._simulate(base, index, index[id(delayed_train)], plan, horizon)
+
+        baseline = best = score([])
+        plan = []
+        complete = True
+        candidates = [(f, self._candidates(scheduler, delayed_train, f)) for f in followers]
+        # Greedy passes, nearest follower first: keep each follower's best action given the others
+        for _ in range(2):
+            improved = False
+            for follower, actions in candidates:
+                others = [a for a in plan if a[1] is not follower]
+                for action in actions:
+                    if time.perf_counter() >= deadline:
+                        complete = False
+                        break
+                    result = score(others + [action])
+                    if result < best:
+                        best, plan, improved = result, others + [action], True
+                if not complete:
+                    break
+            if not complete or not improved:
+                break
+
+        report = {
+            'train': delayed_train.name,
+            'time': scheduler.simulation_minutes,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 3),
+            'budget_ms': self.budget_ms,
+            'complete': complete,
+            'plans_evaluated': evaluated,
+            'baseline_lost_minutes': round(baseline[0], 3),
+            'lost_minutes': round(best[0], 3),
+            'baseline_inherited_minutes': round(baseline[1], 3),
+            'inherited_minutes': round(best[1], 3),
+            'actions': [self._describe(action) for action in plan]
+        }
+        return report, plan
+
+    def _followers(self, scheduler, delayed_train):
+        """Running trains behind the delayed train on the main line, nearest first"""
+        behind = [(delayed_train.position_km - t.position_km, t)
+                  for t in scheduler.trains
+                  if t is not delayed_train and t.has_started and not t.destination_reached and not t.is_on_side_track
+                  and 0 < delayed_train.position_km - t.position_km <= self.radius_km]
+        behind.sort(key=lambda pair: pair[0])
+        return [t for _, t in behind[:self.max_followers]]
+
+    def _local_trains(self, scheduler, delayed_train, followers):
+        """Trains the plan can affect, plus every train they refer to, in train list order"""
+        low = delayed_train.position_km - self.radius_km
+        high = delayed_train.position_km + MONITOR_KM
+        chosen = {id(t) for t in followers}
+        chosen.add(id(delayed_train))
+        for t in scheduler.trains:
+            if t.destination_reached:
+                continue
+            if t.has_started and low <= t.position_km <= high:
+                chosen.add(id(t))
+            elif not t.has_started and low <= 0:
+                chosen.add(id(t))  # May start into the cascade
+        by_id = {id(t): t for t in scheduler.trains}
+        pending = list(chosen)
+        while pending:
+            train = by_id[pending.pop()]
+            for other in (train.phase_target_train, train.speed_matched_to_train, train.waiting_for_train):
+                if other is not None and id(other) not in chosen:
+                    chosen.add(id(other))
+                    pending.append(id(other))
+        return [t for t in scheduler.trains if id(t) in chosen]
+
+    def _candidates(self, scheduler, delayed_train, follower):
+        """Actions worth trying for one follower: hold, slow approach or side track"""
+        gap = delayed_train.position_km - follower.position_km
+        remaining = delayed_train.delay_minutes
+        speed = follower.original_speed
+        reach_minutes = max(0.0, gap - EMERGENCY_KM) / speed * 60
+        wait = remaining - reach_minutes
+        if wait <= 0:
+            return []  # Would not catch up before the delay ends
+
+        actions = []
+        if self._station_at(scheduler.track, follower.position_km) is not None:
+            # Holds are only planned at stations - out on the line a follower is slowed or sided instead
+            actions += [('hold', follower, math.ceil(wait) + 1), ('hold', follower, math.ceil(wait / 2))]
+        if gap > MONITOR_KM and follower.phase == NORMAL:
+            # Cover the stretch to the 50km mark slowly, then the last 40km at full speed
+            final_minutes = (MONITOR_KM - EMERGENCY_KM) / speed * 60
+            if remaining > final_minutes:
+                target = (gap - MONITOR_KM) / (remaining - final_minutes) * 60
+                if target < speed:
+                    actions.append(('slow', follower, round(max(target, 5), 1)))
+            actions.append(('slow', follower, round(speed / 2, 1)))
+        siding = scheduler.track.find_nearest_side_track(follower.position_km)
+        if (siding and abs(siding.position_km - follower.position_km) <= SIDING_REACH_KM and
+                delayed_train.position_km - siding.position_km > EMERGENCY_KM):
+            actions.append(('side_track', follower, siding))
+        return actions
+
+    def _station_at(self, track, position_km):
+        """Location within STATION_REACH_KM of position_km, or None"""
+        index = track.segment_index_at_position(position_km)
+        if index is None:
+            return None
+        segment = track.segments[index]
+        for location in (segment.start, segment.end):
+            if abs(location.position_km - position_km) <= STATION_REACH_KM:
+                return location
+        return None
+
+    def _simulate(self, base, index, delayed_index, plan, horizon):
+        """(lost running minutes, inherited delay minutes) of the local fork under a plan"""
+        fork = load_checkpoint(io.BytesIO(base), event_log=EventLog(capacity=1, level=WARNING + 1), engine="object")
+        delayed_train = fork.trains[delayed_index]
+        for action in plan:
+            self._apply_action(fork, delayed_train, fork.trains[index[id(action[1])]], action)
+        events_before = len(fork.delay_events)
+
+        length = fork.track.total_length_km
+        start = fork.current_time
+        ideal = []
+        for t in fork.trains:
+            if t.destination_reached:
+                ideal.append(None)
+            elif t.has_started:
+                ideal.append(min(length, t.position_km + t.original_speed * horizon / 60))
+            else:
+                start_in = (t.scheduled_start - start).total_seconds() / 60
+                ideal.append(min(length, t.original_speed * max(0.0, horizon - start_in) / 60))
+
+        total_steps = int(round(horizon / self.step_minutes))
+        step = 0
+        while step < total_steps:
+            step += fork.simulate_event_step(self.step_minutes, total_steps - step)
+
+        # Ground not covered against a free run, plus standing time already committed past the horizon
+        lost = sum(max(0.0, target - t.position_km) / t.original_speed * 60 + t.delay_minutes
+                   for t, target in zip(fork.trains, ideal) if target is not None)
+        inherited = sum(e['minutes'] for e in fork.delay_events[events_before:] if e['type'] == 'secondary')
+        return lost, inherited
+
+    def apply(self, scheduler, delayed_train, actions):
+        """Carry out a plan on the live scheduler"""
+        scheduler.sync_trains()
+        for action in actions:
+            self._apply_action(scheduler, delayed_train, action[1], action)
+        if actions and scheduler.engine is not None:
+            scheduler.engine.load()
+
+    def _apply_action(self, scheduler, delayed_train, train, action):
+        """One plan action on train, a train of scheduler (the live one or a fork)"""
+        kind, _, value = action
+        if kind == 'hold':
+            station = self._station_at(scheduler.track, train.position_km)
+            train.add_delay(value, f"Planned hold at {station.name} for {delayed_train.name}")
+            scheduler.delay_events.append({'type': 'hold', 'train': train.name, 'source': delayed_train.name,
+                                           'minutes': value, 'time': scheduler.simulation_minutes})
+        elif kind == 'slow':
+            # A delay phase at a fixed speed - the usual recovery restores full speed once the delay ends
+            train.set_phase("PROGRESSIVE", delayed_train.position_km - train.position_km, delayed_train)
+            train.current_speed = value
+            train.stop_reason = f"Planned slow approach to {delayed_train.name} ({value:.0f}km/h)"
+        elif kind == 'side_track':
+            if train.move_to_side_track(value, f"Planned hold for {delayed_train.name}"):
+                train.waiting_for_train = delayed_train
+                scheduler.position_index.refresh()
+
+    def _describe(self, action):
+        kind, train, value = action
+        if kind == 'hold':
+            return {'action': kind, 'train': train.name, 'minutes': value}
+        if kind == 'slow':
+            return {'action': kind, 'train': train.name, 'speed': value}
+        return {'action': kind, 'train': train.name, 'location': value.name}
@@ -0,0 +1,147 @@
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from src.step_profiler import StageStats, BUCKET_BOUNDS_US
+
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost')
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# get_system_status counts exported as railnet_trains{state=...}
+TRAIN_STATES = (
+    ('waiting_to_start', 'waiting'),
+    ('active_trains', 'active'),
+    ('primary_delays', 'primary_delayed'),
+    ('secondary_delays', 'secondary_delayed'),
+    ('emergency_stopped', 'emergency_stopped'),
+    ('side_track_trains', 'side_track'),
+    ('completed_trains', 'completed')
+)
+
+class MetricsServer:
+    """Prometheus text endpoint on localhost for a running scheduler
+
+    The simulation thread renders the page in publish() and swaps it in by reference, so a
+    scrape only ever copies out bytes that are already built and never waits on the simulation.
+    """
+
+    def __init__(self, port=9100, host='127.0.0.1', interval_seconds=1.0):
+        if host not in LOOPBACK_HOSTS:
+            raise ValueError(f"Metrics are only served on localhost, not {host}")
+        self.host = host
+        self.port = port  # 0 picks a free port - read it back after start()
+        self.interval_seconds = interval_seconds  # publish() renders at most this often
+        self.step_stats = StageStats()  # Latency of each step call
+        self.steps = 0  # Fixed steps covered, more than the calls when event-driven
+        self.page = b""
+        self.published_at = None
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """Bind the port and serve scrapes from a background thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                page = metrics.page
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes off the console
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
+
+    def observe_step(self, elapsed_ns, steps=1):
+        """Count one simulate_step (or simulate_event_step covering steps) call"""
+        self.step_stats.add(elapsed_ns, 0)
+        self.steps += steps
+
+    def publish(self, scheduler, force=False):
+        """Render the current metrics if the interval has passed, returns whether it did"""
+        now = time.monotonic()
+        if not force and self.published_at is not None and now - self.published_at < self.interval_seconds:
+            return False
+        self.published_at = now
+        self.page = render_metrics(scheduler, self.step_stats, self.steps).encode('utf-8')
+        return True
+
+def render_metrics(scheduler, step_stats=None, steps=0):
+    """Scheduler state in the Prometheus text exposition format"""
+    scheduler.sync_trains()
+    status = scheduler.get_system_status()
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    metric('railnet_simulation_minutes', 'gauge', "Simulated minutes since the start of the run",
+           [({}, status['simulation_minutes'])])
+    metric('railnet_trains', 'gauge', "Trains by state",
+           [({'state': state}, status[key]) for key, state in TRAIN_STATES] +
+           [({'state': 'total'}, status['total_trains'])])
+    metric('railnet_trains_in_phase', 'gauge', "Active trains by 4-phase delay phase",
+           [({'phase': phase}, count) for phase, count in status['phase_counts'].items()])
+    side_tracks = [loc for loc in scheduler.track.locations if loc.side_tracks > 0]
+    metric('railnet_side_tracks_occupied', 'gauge', "Occupied side tracks per location",
+           [({'location': loc.name}, loc.occupied_side_tracks) for loc in side_tracks])
+    metric('railnet_side_tracks', 'gauge', "Side tracks per location",
+           [({'location': loc.name}, loc.side_tracks) for loc in side_tracks])
+    metric('railnet_overtaking_events_total', 'counter', "Completed overtakes",
+           [({}, status['overtaking_events'])])
+    delay_types = {}
+    for event in scheduler.delay_events:
+        delay_types[event['type']] = delay_types.get(event['type'], 0) + 1
+    metric('railnet_delay_events_total', 'counter', "Delay events by type",
+           [({'type': kind}, count) for kind, count in delay_types.items()])
+
+    if step_stats is not None:
+        _histogram(lines, 'railnet_step_latency_seconds', "Wall time per simulation step call", [({}, step_stats)])
+        metric('railnet_steps_total', 'counter', "Fixed steps simulated", [({}, steps)])
+    if scheduler.profiler is not None:
+        _histogram(lines, 'railnet_stage_latency_seconds', "Wall time per simulate_step stage",
+                   [({'stage': name}, stats) for name, stats in scheduler.profiler.stages.items() if stats.calls])
+    return "\n".join(lines) + "\n"
+
+def _histogram(lines, name, help_text, series):
+    """Cumulative le buckets, sum and count for each (labels, StageStats) pair"""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, stats in series:
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS_US + (None,), stats.buckets):
+            seen += count
+            le = '+Inf' if bound is None else _number(bound / 1e6)
+            lines.append(f"{name}_bucket{_labels(dict(labels, le=le))} {seen}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(stats.total_ns / 1e9)}")
+        lines.append(f"{name}_count{_labels(labels)} {stats.calls}")
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import random
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.config import Config
+from src.batch_runner import BatchRunner, load_json
+
+# Scheduling policies compared by the sweep, as BatchRunner options
+POLICIES = {
+    "dynamic": {"shuffle": True},       # Shuffled start order from create_dynamic_schedule
+    "fixed_order": {"shuffle": False},  # Traditional timetable: trains start in config order
+}
+BASELINE_POLICY = "fixed_order"
+
+def run_scenario(task):
+    """Run one seeded scenario under one policy (module level so worker processes can pickle it)"""
+    policy, seed, train_configs, delays_per_run, until_minutes = task
+
+    # The whole disruption comes from the scenario seed, so the policies are compared on paired scenarios:
+    # same times, same amounts, and the same train preference - the first of them running gets the delay
+    schedule_rng = random.Random(seed)
+    ids = [config['id'] for config in train_configs]
+    delay_schedule = [{'minute': round(schedule_rng.uniform(0, until_minutes), 2),
+                       'candidates': schedule_rng.sample(ids, len(ids)),
+                       'delay': schedule_rng.randint(15, 45)} for _ in range(delays_per_run)]
+
+    runner = BatchRunner(train_configs, delay_schedule, seed=seed, event_driven=True, **POLICIES[policy])
+    summary = runner.run(until_minutes)
+    return {
+        'policy': policy,
+        'seed': seed,
+        'total_delay_minutes': summary['total_delay_minutes'],
+        'primary_delays': summary['primary_delay_count'],
+        'secondary_delays': summary['secondary_delay_count'],
+        'secondary_delay_minutes': summary['secondary_delay_minutes'],
+        'delays_skipped': len(summary['delays_skipped']),
+        'overtaking_events': summary['overtaking_events'],
+        'completed_trains': summary['status']['completed_trains']
+    }
+
+class MonteCarloSweep:
+    """Seeded scenario sweep over scheduling policies, spread across worker processes"""
+
+    def __init__(self, train_configs, scenarios=100, delays_per_run=4, until_minutes=Config.SIMULATION_TIME,
+                 base_seed=0, policies=None, workers=None):
+        self.train_configs = train_configs
+        self.scenarios = scenarios
+        self.delays_per_run = delays_per_run
+        self.until_minutes = until_minutes
+        self.base_seed = base_seed
+        self.policies = policies or list(POLICIES)
+        self.workers = workers or os.cpu_count() or 1
+
+        for policy in self.policies:
+            if policy not in POLICIES:
+                raise ValueError(f"Unknown policy: {policy}")
+
+    def run(self):
+        """Run every scenario under every policy and return aggregated results"""
+        tasks = [(policy, self.base_seed + i, self.train_configs, self.delays_per_run, self.until_minutes)
+                 for i in range(self.scenarios) for policy in self.policies]
+
+        # Scenarios are independent - a few chunks per worker keeps every core busy
+        chunksize = max(1, len(tasks) // (self.workers * 4))
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            runs = list(executor.map(run_scenario, tasks, chunksize=chunksize))
+        wall_seconds = time.perf_counter() - started
+
+        results = {
+            'scenarios': self.scenarios,
+            'delays_per_run': self.delays_per_run,
+            'until_minutes': self.until_minutes,
+            'base_seed': self.base_seed,
+            'trains': len(self.train_configs),
+            'workers': self.workers,
+            'wall_seconds': round(wall_seconds, 3),
+            'policies': {policy: self._aggregate([r for r in runs if r['policy'] == policy])
+                         for policy in self.policies}
+        }
+
+        # Cascade reduction relative to the fixed timetable, the figure quoted in the README
+        baseline = results['policies'].get(BASELINE_POLICY)
+        if baseline and baseline['total_delay_mean'] > 0:
+            for policy, stats in results['policies'].items():
+                if policy != BASELINE_POLICY:
+                    reduction = (baseline['total_delay_mean'] - stats['total_delay_mean']) / baseline['total_delay_mean']
+                    stats['delay_reduction_pct'] = round(100 * reduction, 2)
+        return results
+
+    def _aggregate(self, runs):
+        """Distribution of one policy's outcomes"""
+        totals = np.array([r['total_delay_minutes'] for r in runs], dtype=float)
+        primary = sum(r['primary_delays'] for r in runs)
+        secondary = sum(r['secondary_delays'] for r in runs)
+        return {
+            'runs': len(runs),
+            'total_delay_mean': round(float(totals.mean()), 3),
+            'total_delay_std': round(float(totals.std()), 3),
+            'total_delay_p50': round(float(np.percentile(totals, 50)), 3),
+            'total_delay_p90': round(float(np.percentile(totals, 90)), 3),
+            'total_delay_p99': round(float(np.percentile(totals, 99)), 3),
+            'primary_delays': primary,
+            'secondary_delays': secondary,
+            'secondary_per_primary': round(secondary / primary, 4) if primary else 0.0,
+            'secondary_delay_minutes_mean': round(float(np.mean([r['secondary_delay_minutes'] for r in runs])), 3),
+            'overtaking_events_mean': round(float(np.mean([r['overtaking_events'] for r in runs])), 3),
+            'delays_skipped': sum(r['delays_skipped'] for r in runs),
+            'total_delay_minutes': [round(float(x), 2) for x in totals]  # Per-seed values, in seed order
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo sweep of cascade delays per scheduling policy")
+    parser.add_argument('trains', help="JSON file with a list of train configs (id, name, priority, speed)")
+    parser.add_argument('--scenarios', type=int, default=100, help="Seeded scenarios per policy")
+    parser.add_argument('--delays-per-run', type=int, default=4, help="Random delays injected per scenario")
+    parser.add_argument('--until', type=float, default=Config.SIMULATION_TIME, help="Simulated minutes per scenario")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the first scenario")
+    parser.add_argument('--policies', nargs='+', choices=list(POLICIES), help="Policies to compare (default: all)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per core)")
+    parser.add_argument('--output', help="Write results to this JSON file instead of stdout")
+    args = parser.parse_args(argv)
+
+    sweep = MonteCarloSweep(
+        load_json(args.trains),
+        scenarios=args.scenarios,
+        delays_per_run=args.delays_per_run,
+        until_minutes=args.until,
+        base_seed=args.seed,
+        policies=args.policies,
+        workers=args.workers
+    )
+    results = sweep.run()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, separators=(',', ':'))
+        print(f"✅ {args.scenarios} scenarios x {len(sweep.policies)} policies in {results['wall_seconds']:.1f}s -> {args.output}")
+        for policy, stats in results['policies'].items():
+            print(f"  {policy}: mean total delay {stats['total_delay_mean']:.1f} min, "
+                  f"{stats['secondary_delays']} secondary / {stats['primary_delays']} primary delays")
+    else:
+        print(json.dumps(results, separators=(',', ':')))
+
+if __name__ == "__main__":
+    main()
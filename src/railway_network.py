@@ -0,0 +1,340 @@
+import os
+import json
+import time
+import argparse
+import multiprocessing
+from datetime import timedelta
+from src.config import Config
+from src.dynamic_scheduler import DynamicRailwayScheduler, RailwayTrack, Location
+from src.batch_runner import load_json
+
+# Status fields that add up across corridors
+SUMMED_STATUS = ['waiting_to_start', 'active_trains', 'primary_delays', 'secondary_delays', 'total_delayed_trains',
+                 'side_track_trains', 'emergency_stopped', 'completed_trains', 'overtaking_events']
+
+def build_corridor(config):
+    """RailwayTrack for a corridor config: {name, locations: [{name, type, km, side_tracks}]}"""
+    locations = [Location(loc['name'], loc['type'], loc['km'], loc.get('side_tracks', 0)) for loc in config['locations']]
+    if len(locations) < 2 or locations[0].position_km != 0:
+        raise ValueError(f"Corridor {config['name']} needs at least two locations, starting at km 0")
+    return RailwayTrack(config['name'], locations[-1].position_km, locations=locations)
+
+class RailwayNetwork:
+    """Corridors joined at junctions - a corridor's last location leads into every corridor starting there
+
+    Corridors are one-way (trains run from km 0 to the end), so a line used in both
+    directions is two corridors.
+    """
+
+    def __init__(self, corridor_configs):
+        self.corridor_configs = {}
+        self.corridors = {}
+        self.junctions = {}  # Location name -> corridors starting there
+        for config in corridor_configs:
+            if config['name'] in self.corridors:
+                raise ValueError(f"Duplicate corridor: {config['name']}")
+            track = build_corridor(config)
+            self.corridor_configs[config['name']] = config
+            self.corridors[config['name']] = track
+            self.junctions.setdefault(track.locations[0].name, []).append(config['name'])
+
+    def next_corridors(self, corridor_name):
+        """Corridors a train can continue on at the end of corridor_name"""
+        return self.junctions.get(self.corridors[corridor_name].locations[-1].name, [])
+
+    def shortest_junction_minutes(self):
+        """Least time any train takes to cross a junction onto its next corridor"""
+        return min((config.get('junction_minutes', 0) for name, config in self.corridor_configs.items()
+                    if self.next_corridors(name)), default=0)
+
+    def validate_route(self, route):
+        """Check that a route is a chain of corridors joined at junctions"""
+        if not route:
+            raise ValueError("Route needs at least one corridor")
+        for name in route:
+            if name not in self.corridors:
+                raise ValueError(f"Unknown corridor: {name}")
+        for current, following in zip(route, route[1:]):
+            if following not in self.next_corridors(current):
+                raise ValueError(f"Corridors {current} and {following} do not meet at a junction")
+
+class CorridorGroup:
+    """The corridors one worker owns, each with its own scheduler"""
+
+    def __init__(self, corridor_configs, engine="object", seed=None):
+        # Seeded per corridor, so results do not depend on how corridors are spread over workers
+        self.schedulers = {config['name']: DynamicRailwayScheduler(engine=engine, track=build_corridor(config),
+                                                                   seed=f"{seed}:{config['name']}" if seed is not None else None)
+                           for config in corridor_configs}
+        self.routes = {}  # Train -> corridors still to run after its current one
+        self.completed_seen = {name: 0 for name in self.schedulers}
+        self.junction_minutes = {config['name']: config.get('junction_minutes', 0) for config in corridor_configs}
+
+    def schedule(self, trains_by_corridor, shuffle=True):
+        """Dynamic schedule for the trains whose route starts on each corridor"""
+        for name, configs in trains_by_corridor.items():
+            routes = {config['id']: config['route'][1:] for config in configs}
+            for train in self.schedulers[name].create_dynamic_schedule(configs, shuffle=shuffle):
+                if routes[train.id]:
+                    self.routes[train] = routes[train.id]
+
+    def step(self, time_delta_minutes, arrivals, steps=1):
+        """Admit trains handed over at junctions, advance every corridor steps times, return the trains leaving them"""
+        for corridor, record in arrivals:
+            train = self.schedulers[corridor].admit_train(record, record['total_delay'], record['times_rerouted'],
+                                                          record['start'])
+            if record['route']:
+                self.routes[train] = record['route']
+
+        departures = []
+        for name, scheduler in self.schedulers.items():
+            for _ in range(steps):
+                scheduler.simulate_step(time_delta_minutes)
+                # Only look for arrivals when the completed count moved
+                completed = scheduler.get_system_status()['completed_trains']
+                if completed > self.completed_seen[name]:
+                    self.completed_seen[name] = completed
+                    departures.extend(self._departures(name, scheduler))
+        return departures
+
+    def _departures(self, name, scheduler):
+        """Trains that reached the end of this corridor with more of their route to run
+
+        Finished trains are retired from the corridor, so it only keeps the trains still on it.
+        """
+        scheduler.sync_trains()
+        # Starts on the next corridor once the junction is crossed, or on the next step
+        start = scheduler.current_time + timedelta(minutes=self.junction_minutes[name])
+        departures = []
+        for train in scheduler.retire_finished_trains():
+            if train in self.routes:
+                route = self.routes.pop(train)
+                departures.append((route[0], {
+                    'id': train.id,
+                    'name': train.name,
+                    'priority': train.priority,
+                    'speed': train.original_speed,
+                    'route': route[1:],
+                    'start': start,
+                    'total_delay': train.total_delay_accumulated,
+                    'times_rerouted': train.times_rerouted
+                }))
+        return departures
+
+    def trigger_user_delay(self, corridor, train_name=None, delay_amount=None):
+        """Delay a named (or random) running train on one corridor, returns its name or None"""
+        scheduler = self.schedulers[corridor]
+        train = next((t for t in scheduler.trains if t.name == train_name), None) if train_name else None
+        delayed_train = scheduler.trigger_user_delay(train, delay_amount)
+        return delayed_train.name if delayed_train else None
+
+    def status(self):
+        return {name: scheduler.get_system_status() for name, scheduler in self.schedulers.items()}
+
+def _worker_loop(connection, corridor_configs, engine, seed):
+    """Worker process: own a CorridorGroup and run the commands sent to it"""
+    group = CorridorGroup(corridor_configs, engine, seed)
+    while True:
+        command, args = connection.recv()
+        if command == "stop":
+            break
+        connection.send(getattr(group, command)(*args))
+    connection.close()
+
+class _WorkerProcess:
+    """CorridorGroup in a worker process, driven over a pipe"""
+
+    def __init__(self, corridor_configs, engine, seed):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_worker_loop, args=(child, corridor_configs, engine, seed), daemon=True)
+        self.process.start()
+        child.close()
+
+    def send(self, command, *args):
+        self.connection.send((command, args))
+
+    def recv(self):
+        return self.connection.recv()
+
+    def close(self):
+        self.connection.send(("stop", ()))
+        self.process.join()
+
+class _LocalWorker:
+    """CorridorGroup in this process, with the same send/recv interface"""
+
+    def __init__(self, corridor_configs, engine, seed):
+        self.group = CorridorGroup(corridor_configs, engine, seed)
+        self.result = None
+
+    def send(self, command, *args):
+        self.result = getattr(self.group, command)(*args)
+
+    def recv(self):
+        return self.result
+
+    def close(self):
+        pass
+
+class NetworkScheduler:
+    """Steps a RailwayNetwork with its corridors spread over worker processes
+
+    Corridors only interact through trains crossing junctions, so each worker steps its
+    corridors independently and only the trains that reached a junction are exchanged.
+    A train joins its next corridor junction_minutes (from the corridor it leaves) after
+    reaching the junction, or on the following step. Workers run up to the shortest junction
+    time between exchanges, so every handed-over train is admitted before it is due and
+    results do not depend on the number of workers or steps per exchange.
+    """
+
+    def __init__(self, network, train_configs, workers=None, engine="object", shuffle=True, seed=None):
+        self.network = network
+        self.train_configs = train_configs
+        self.engine = engine
+        self.shuffle = shuffle
+        self.seed = seed
+        self.simulation_minutes = 0
+        self.handovers = 0
+
+        ids = [config['id'] for config in train_configs]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Train ids must be unique across the network")
+        for config in train_configs:
+            self.network.validate_route(config['route'])
+
+        # workers=0 steps every corridor in this process
+        corridor_names = list(network.corridors)
+        if workers is None:
+            workers = min(os.cpu_count() or 1, len(corridor_names))
+        self.workers = workers
+        self.worker_corridors = self._partition(corridor_names, max(1, workers))
+        self.owner = {name: w for w, names in enumerate(self.worker_corridors) for name in names}
+        self.pending_arrivals = [[] for _ in self.worker_corridors]
+        self.worker_handles = []
+
+    def _partition(self, corridor_names, workers):
+        """Spread corridors over workers, busiest first onto the least loaded worker"""
+        load = {name: len(self.network.corridors[name].locations) for name in corridor_names}
+        for config in self.train_configs:
+            for name in config['route']:
+                load[name] += 100  # Trains dominate the cost of a step
+        groups = [[] for _ in range(min(workers, len(corridor_names)))]
+        totals = [0] * len(groups)
+        for name in sorted(corridor_names, key=lambda n: load[n], reverse=True):
+            w = totals.index(min(totals))
+            groups[w].append(name)
+            totals[w] += load[name]
+        return groups
+
+    def start(self):
+        """Start the workers and hand each corridor its initial trains"""
+        worker_class = _WorkerProcess if self.workers > 0 else _LocalWorker
+        for names in self.worker_corridors:
+            configs = [self.network.corridor_configs[name] for name in names]
+            self.worker_handles.append(worker_class(configs, self.engine, self.seed))
+
+        for w, names in enumerate(self.worker_corridors):
+            trains_by_corridor = {name: [c for c in self.train_configs if c['route'][0] == name] for name in names}
+            self.worker_handles[w].send("schedule", trains_by_corridor, self.shuffle)
+        for handle in self.worker_handles:
+            handle.recv()
+        return self
+
+    def exchange_steps(self, time_delta_minutes):
+        """Most steps workers can run between exchanges without admitting a train late"""
+        return max(1, int(self.network.shortest_junction_minutes() / time_delta_minutes + 1e-9))
+
+    def simulate_step(self, time_delta_minutes=0.05, steps=1):
+        """Step every corridor in parallel steps times, then route the trains that crossed a junction"""
+        if steps > self.exchange_steps(time_delta_minutes):
+            raise ValueError(f"At most {self.exchange_steps(time_delta_minutes)} steps fit between exchanges, not {steps}")
+        for handle, arrivals in zip(self.worker_handles, self.pending_arrivals):
+            handle.send("step", time_delta_minutes, arrivals, steps)
+        self.pending_arrivals = [[] for _ in self.worker_handles]
+        for handle in self.worker_handles:
+            for corridor, record in handle.recv():
+                self.pending_arrivals[self.owner[corridor]].append((corridor, record))
+                self.handovers += 1
+        # Admission order decides ties, so keep it independent of which worker sent a train
+        for arrivals in self.pending_arrivals:
+            arrivals.sort(key=lambda arrival: (arrival[1]['start'], arrival[1]['id']))
+        for _ in range(steps):
+            self.simulation_minutes += time_delta_minutes
+
+    def trigger_user_delay(self, corridor, train_name=None, delay_amount=None):
+        """Delay a named (or random) running train on a corridor, returns its name or None"""
+        handle = self.worker_handles[self.owner[corridor]]
+        handle.send("trigger_user_delay", corridor, train_name, delay_amount)
+        return handle.recv()
+
+    def get_system_status(self):
+        """Network totals plus each corridor's own status"""
+        corridors = {}
+        for handle in self.worker_handles:
+            handle.send("status")
+        for handle in self.worker_handles:
+            corridors.update(handle.recv())
+
+        status = {'simulation_minutes': self.simulation_minutes, 'total_trains': len(self.train_configs)}
+        for key in SUMMED_STATUS:
+            status[key] = sum(corridor[key] for corridor in corridors.values())
+        # A train handed over at a junction finished its run on the corridor it left
+        status['completed_trains'] -= self.handovers
+        status['waiting_to_start'] += sum(len(arrivals) for arrivals in self.pending_arrivals)
+        status['handovers'] = self.handovers
+        phase_counts = {}
+        for corridor in corridors.values():
+            for phase, count in corridor['phase_counts'].items():
+                phase_counts[phase] = phase_counts.get(phase, 0) + count
+        status['phase_counts'] = phase_counts
+        status['corridors'] = corridors
+        return status
+
+    def close(self):
+        for handle in self.worker_handles:
+            handle.close()
+        self.worker_handles = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a multi-corridor railway network headless")
+    parser.add_argument('network', help="JSON file with {corridors: [{name, junction_minutes?, locations: [{name, type, km, side_tracks}]}]}")
+    parser.add_argument('trains', help="JSON file with train configs, each with a route: [corridor names]")
+    parser.add_argument('--until', type=float, default=Config.SIMULATION_TIME, help="Simulated minutes to run")
+    parser.add_argument('--step', type=float, default=0.05, help="Simulated minutes per step")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per core, at most one per corridor; 0 runs in-process)")
+    parser.add_argument('--engine', choices=["object", "vectorized", "auto"], default="object")
+    parser.add_argument('--seed', type=int, help="Seed for each corridor's start order shuffle")
+    parser.add_argument('--fixed-order', action='store_true', help="Start trains in config order instead of shuffling")
+    parser.add_argument('--output', help="Write the final status to this JSON file instead of stdout")
+    args = parser.parse_args(argv)
+
+    network = RailwayNetwork(load_json(args.network)['corridors'])
+    scheduler = NetworkScheduler(network, load_json(args.trains), workers=args.workers, engine=args.engine,
+                                 shuffle=not args.fixed_order, seed=args.seed)
+    steps = int(round(args.until / args.step))
+    exchange_steps = scheduler.exchange_steps(args.step)
+    with scheduler:
+        started = time.perf_counter()
+        for done in range(0, steps, exchange_steps):
+            scheduler.simulate_step(args.step, min(exchange_steps, steps - done))
+        wall_seconds = time.perf_counter() - started
+        status = scheduler.get_system_status()
+
+    summary = {'workers': scheduler.workers, 'steps': steps, 'exchange_steps': exchange_steps, 'wall_seconds': wall_seconds,
+               'steps_per_second': steps / wall_seconds if wall_seconds > 0 else None, 'status': status}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"✅ {len(network.corridors)} corridors, {steps} steps on {scheduler.workers} workers in "
+              f"{wall_seconds:.2f}s -> {args.output}")
+    else:
+        print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,18 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import random
+from src.event_log import EventLog
+from src.status_counters import StatusCounters
 
 class Train:
-    def __init__(self, id, name, priority, current_station, speed=80, track='main_line', start_delay=0):
+    __slots__ = ('id', 'name', 'priority', 'base_speed', 'speed', 'current_station', 'track', 'original_track', 'delay',
+                 'position', 'color', 'route_progress', 'is_stopped', 'stop_reason', 'is_rerouting', 'reroute_message',
+                 'reroute_timer', 'destination_reached', 'last_movement_time', 'start_delay', 'has_started',
+                 'notification_sent', 'delay_notification_received', 'ahead_train_delay_info', 'user_delayed',
+                 'manual_stop', 'event_log', 'status_counters', 'status_labels')
+    
+    def __init__(self, id, name, priority, current_station, speed=80, track='main_line', start_delay=0, event_log=None,
+                 status_counters=None):
         self.id = id
         self.name = name
         self.priority = priority
@@ -38,6 +47,12 @@ class Train:
         # User-controlled conflict flags
         self.user_delayed = False  # Only true when user manually adds delay
         self.manual_stop = False   # Only true when user manually stops train
+        self.event_log = event_log
+        
+        # Status labels this train is counted under (see SlowRailwaySimulator.get_system_status)
+        self.status_counters = status_counters
+        self.status_labels = ()
+        self.update_status_counters()
         
     def _get_train_color(self, priority):
         colors = {
@@ -48,6 +63,29 @@ class Train:
         }
         return colors.get(priority, (0, 0, 0))
     
+    def _status_labels(self):
+        """Status labels for the current state - one count each in the simulator status"""
+        if self.destination_reached:
+            return ('completed_journeys',)
+        if not self.has_started:
+            return ('active_trains', 'waiting_to_start')
+        labels = ['active_trains', 'started_trains']
+        if self.delay > 0:
+            labels.append('delayed_trains')
+        if self.is_stopped:
+            labels.append('stopped_trains')
+        if self.is_rerouting:
+            labels.append('rerouting_trains')
+        return tuple(labels)
+    
+    def update_status_counters(self):
+        """Move this train between status counters after a state change"""
+        if self.status_counters is not None:
+            labels = self._status_labels()
+            if labels != self.status_labels:
+                self.status_counters.move(self.status_labels, labels)
+                self.status_labels = labels
+    
     def should_start_moving(self, current_simulation_time):
         """Check if train should start moving based on start delay"""
         if not self.has_started and current_simulation_time >= self.start_delay:
@@ -57,6 +95,11 @@ class Train:
     
     def update_position(self, time_delta_minutes, visual_railway=None, current_simulation_time=0):
         """Clean position update - only stops for user-initiated problems"""
+        self._move(time_delta_minutes, current_simulation_time)
+        self.update_status_counters()
+    
+    def _move(self, time_delta_minutes, current_simulation_time):
+        """Advance start, delay and position state by one time step"""
         
         # Check if train should start moving
         if not self.should_start_moving(current_simulation_time):
@@ -107,7 +150,8 @@ class Train:
         """Receive notification about delayed train ahead"""
         self.delay_notification_received = True
         self.ahead_train_delay_info = ahead_train_info
-        print(f"Train {self.name} received delay notification about {ahead_train_info['name']}")
+        if self.event_log is not None:
+            self.event_log.info("DELAY_NOTIFICATION", "Train {} received delay notification about {}", self.name, ahead_train_info['name'])
     
     def introduce_delay(self, delay_minutes, reason="Operational delay"):
         """Add delay with notification system - LEGACY METHOD"""
@@ -115,6 +159,7 @@ class Train:
         self.is_stopped = True
         self.stop_reason = f"{reason}: {self.delay:.1f}min"
         self.notification_sent = []
+        self.update_status_counters()
     
     def introduce_user_delay(self, delay_minutes, reason="User-initiated delay"):
         """Add delay only when triggered by user"""
@@ -123,6 +168,7 @@ class Train:
         self.is_stopped = True
         self.stop_reason = f"{reason}: {self.delay:.1f}min"
         self.notification_sent = []  # Reset notifications
+        self.update_status_counters()
     
     def reroute_to_track(self, new_track, reason="Avoiding conflict"):
         """Reroute train with visual feedback"""
@@ -133,12 +179,14 @@ class Train:
             self.reroute_timer = 15
             self.reroute_message = f"Rerouted from {old_track} to {new_track}: {reason}"
             self.position = max(0, self.position - 0.02)
-            print(f"REROUTING: {self.name} moved from {old_track} to {new_track} - {reason}")
+            self.update_status_counters()
+            if self.event_log is not None:
+                self.event_log.info("REROUTE", "REROUTING: {} moved from {} to {} - {}", self.name, old_track, new_track, reason)
 
 class SlowRailwaySimulator:
     """User-controlled railway simulator - clean version"""
     
-    def __init__(self):
+    def __init__(self, event_log=None):
         self.trains = []
         self.stations = ['Delhi', 'Ghaziabad', 'Mathura', 'Agra', 'Mumbai']
         self.current_time = datetime.now()
@@ -153,10 +201,15 @@ class SlowRailwaySimulator:
         }
         self.delay_events = []
         self.notification_log = []
+        self.status_counters = StatusCounters()
         
         # User control flags
         self.auto_conflicts_disabled = True  # Key feature: no auto conflicts
         
+        # Diagnostics go to the event log instead of stdout
+        self.event_log = event_log if event_log is not None else EventLog()
+        self.event_log.time_source = lambda: self.simulation_minutes
+        
     def add_train_with_schedule(self, train_config):
         """Add train with scheduled start time"""
         train = Train(
@@ -166,10 +219,12 @@ class SlowRailwaySimulator:
             train_config["station"], 
             train_config["speed"], 
             train_config["track"],
-            train_config.get("start_delay", 0)
+            train_config.get("start_delay", 0),
+            event_log=self.event_log,
+            status_counters=self.status_counters
         )
         self.trains.append(train)
-        print(f"Scheduled: {train.name} will start in {train.start_delay} minutes on {train.track}")
+        self.event_log.info("SCHEDULE", "Scheduled: {} will start in {} minutes on {}", train.name, train.start_delay, train.track)
     
     def add_train(self, train):
         """Maintain compatibility"""
@@ -178,6 +233,9 @@ class SlowRailwaySimulator:
         else:
             train.start_delay = 0
         train.has_started = True
+        train.event_log = self.event_log
+        train.status_counters = self.status_counters
+        train.update_status_counters()
         self.trains.append(train)
     
     def notify_trains_behind_delayed_train(self, delayed_train):
@@ -247,7 +305,7 @@ class SlowRailwaySimulator:
                 
                 # Notify trains behind this delayed train
                 self.notify_trains_behind_delayed_train(train)
-                print(f"USER DELAY: {train.name} delayed by {delay_minutes} minutes")
+                self.event_log.info("USER_DELAY", "USER DELAY: {} delayed by {} minutes", train.name, delay_minutes)
                 return True
         return False
     
@@ -321,10 +379,12 @@ class SlowRailwaySimulator:
                             train2.manual_stop = True
                             train2.is_stopped = True
                             train2.stop_reason = f"Yielding to {train1.name} (user delay conflict)"
+                            train2.update_status_counters()
                         else:
                             train1.manual_stop = True
                             train1.is_stopped = True
                             train1.stop_reason = f"Yielding to {train2.name} (user delay conflict)"
+                            train1.update_status_counters()
                 
                 elif distance >= 0.08:
                     # Resume movement when safe
@@ -334,6 +394,7 @@ class SlowRailwaySimulator:
                             train.manual_stop = False
                             train.is_stopped = False
                             train.stop_reason = ""
+                            train.update_status_counters()
         
         return conflicts
     
@@ -347,7 +408,7 @@ class SlowRailwaySimulator:
     
     def introduce_random_problem(self):
         """DISABLED - No random problems in user-controlled mode"""
-        print("Random problems disabled - user-controlled mode only")
+        self.event_log.info("NO_AUTO_PROBLEMS", "Random problems disabled - user-controlled mode only")
         return "NO_AUTO_PROBLEMS"
     
     def _add_weather_delay(self):
@@ -373,7 +434,7 @@ class SlowRailwaySimulator:
             'affected_trains': [t.name for t in affected_trains],
             'user_initiated': True
         })
-        print(f"USER WEATHER EVENT: Affected {len(affected_trains)} trains")
+        self.event_log.info("WEATHER_DELAY", "USER WEATHER EVENT: Affected {} trains", len(affected_trains))
     
     def _add_signal_failure(self):
         """User-triggered signal failure"""
@@ -397,7 +458,7 @@ class SlowRailwaySimulator:
             'duration': 40,
             'user_initiated': True
         })
-        print("USER SIGNAL FAILURE: Primary train delayed")
+        self.event_log.info("SIGNAL_FAILURE", "USER SIGNAL FAILURE: Primary train delayed")
     
     def _add_track_maintenance(self):
         """User-triggered track maintenance"""
@@ -421,41 +482,38 @@ class SlowRailwaySimulator:
             'affected_trains': [t.name for t in maintenance_trains],
             'user_initiated': True
         })
-        print(f"USER MAINTENANCE: {affected_track} affected, {len(maintenance_trains)} trains delayed")
+        self.event_log.info("TRACK_MAINTENANCE", "USER MAINTENANCE: {} affected, {} trains delayed", affected_track, len(maintenance_trains))
     
     def record_simulation_state(self, conflicts):
         """Record simulation state"""
-        active_trains = [t for t in self.trains if not t.destination_reached]
-        started_trains = [t for t in active_trains if t.has_started]
-        
+        counts = self.status_counters
         state = {
             'timestamp': self.current_time,
             'simulation_minutes': self.simulation_minutes,
             'total_trains': len(self.trains),
-            'active_trains': len(active_trains),
-            'started_trains': len(started_trains),
-            'delayed_trains': len([t for t in started_trains if t.delay > 0]),
-            'stopped_trains': len([t for t in started_trains if t.is_stopped]),
-            'completed_journeys': len([t for t in self.trains if t.destination_reached]),
+            'active_trains': counts['active_trains'],
+            'started_trains': counts['started_trains'],
+            'delayed_trains': counts['delayed_trains'],
+            'stopped_trains': counts['stopped_trains'],
+            'completed_journeys': counts['completed_journeys'],
             'notifications_sent': len(self.notification_log)
         }
         self.simulation_data.append(state)
     
     def get_system_status(self):
         """Enhanced system status for user-controlled mode"""
-        active_trains = [t for t in self.trains if not t.destination_reached]
-        started_trains = [t for t in active_trains if t.has_started]
-        
+        # Counters are kept up to date by the trains themselves, so this is O(1)
+        counts = self.status_counters
         return {
             'simulation_time_minutes': self.simulation_minutes,
             'total_trains': len(self.trains),
-            'active_trains': len(active_trains),
-            'started_trains': len(started_trains),
-            'waiting_to_start': len([t for t in active_trains if not t.has_started]),
-            'delayed_trains': len([t for t in started_trains if t.delay > 0]),
-            'stopped_trains': len([t for t in started_trains if t.is_stopped]),
-            'rerouting_trains': len([t for t in started_trains if getattr(t, 'is_rerouting', False)]),
-            'completed_journeys': len([t for t in self.trains if t.destination_reached]),
+            'active_trains': counts['active_trains'],
+            'started_trains': counts['started_trains'],
+            'waiting_to_start': counts['waiting_to_start'],
+            'delayed_trains': counts['delayed_trains'],
+            'stopped_trains': counts['stopped_trains'],
+            'rerouting_trains': counts['rerouting_trains'],
+            'completed_journeys': counts['completed_journeys'],
             'active_problems': len(self.problems),
             'user_control_mode': True,
             'recent_notifications': self.notification_log[-5:] if self.notification_log else []
@@ -0,0 +1,141 @@
+import time
+import queue
+import threading
+from types import MappingProxyType
+from collections import namedtuple
+
+# Read-only records the renderer draws - the fields RailwayVisualizer reads from the live objects
+TrainView = namedtuple('TrainView', ['id', 'name', 'priority', 'color', 'position_km', 'current_speed', 'original_speed',
+                                     'delay_minutes', 'current_phase', 'has_started', 'destination_reached',
+                                     'is_on_side_track'])
+LocationView = namedtuple('LocationView', ['name', 'type', 'position_km', 'side_tracks', 'occupied_side_tracks'])
+SegmentView = namedtuple('SegmentView', ['start_km', 'end_km', 'has_double_track'])
+TrackView = namedtuple('TrackView', ['name', 'total_length_km', 'locations', 'segments'])
+
+COMMANDS = ('delay', 'pause', 'reset', 'speed')
+MAX_BACKLOG_SECONDS = 0.25  # Wall time of simulation the worker may fall behind before it drops the backlog
+
+class SimulationSnapshot:
+    """Immutable scheduler state at one instant - drawn by RailwayVisualizer like a live scheduler"""
+    __slots__ = ('track', 'trains', 'status', 'paused', 'speed')
+
+    def __init__(self, track, trains, status, paused, speed):
+        self.track = track
+        self.trains = trains
+        self.status = status
+        self.paused = paused
+        self.speed = speed
+
+    def get_system_status(self):
+        return self.status
+
+class SimulationWorker:
+    """Runs a scheduler on its own thread at a fixed multiple of real time, decoupled from rendering
+
+    The worker publishes a fresh SimulationSnapshot after every batch of steps by swapping one
+    reference, so readers always see a complete state and never one that is still being written.
+    Controls reach the scheduler through a command queue and are applied between steps.
+    """
+
+    def __init__(self, scheduler_factory, speed=180, step_minutes=0.05, publish_hz=60):
+        self.scheduler_factory = scheduler_factory  # Builds a fresh scheduler - at start and on reset
+        self.speed = speed  # Simulated seconds per wall-clock second (180 = 3 simulated minutes a second)
+        self.step_minutes = step_minutes
+        self.publish_interval = 1 / publish_hz
+        self.paused = False
+        self.commands = queue.Queue()
+        self.snapshot = None  # Latest published state - replaced, never modified
+        self.scheduler = None
+        self._track_view = None
+        self._stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Build the scheduler, publish its first snapshot and start stepping"""
+        self._reset()
+        self.thread.start()
+        return self
+
+    def send(self, command, value=None):
+        """Queue a command for the simulation thread: delay, pause (toggle), reset or speed (value)"""
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown simulation command: {command}")
+        if command == 'speed' and not (value and value > 0):
+            raise ValueError(f"Simulation speed must be positive: {value}")
+        self.commands.put((command, value))
+
+    def stop(self):
+        """Stop the simulation thread and wait for it to finish its current step"""
+        self._stopping.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def _run(self):
+        owed = 0.0  # Simulated minutes due but not yet stepped
+        last = time.perf_counter()
+        while not self._stopping.is_set():
+            changed = self._apply_commands()
+            now = time.perf_counter()
+            if not self.paused:
+                owed += (now - last) * self.speed / 60
+            last = now
+
+            # Step what real time calls for, publishing at least every publish interval
+            steps = int(owed / self.step_minutes)
+            owed -= steps * self.step_minutes
+            publish_at = now + self.publish_interval
+            for _ in range(steps):
+                self.scheduler.simulate_step(self.step_minutes)
+                if time.perf_counter() >= publish_at:
+                    self._publish()
+                    publish_at = time.perf_counter() + self.publish_interval
+            if steps or changed:
+                self._publish()
+
+            # Too slow to keep up - run as fast as possible instead of building an ever longer backlog
+            owed = min(owed, self.speed / 60 * MAX_BACKLOG_SECONDS)
+            wait = (self.step_minutes - owed) * 60 / self.speed if not self.paused else self.publish_interval
+            self._stopping.wait(min(max(wait, 0), self.publish_interval))
+
+    def _apply_commands(self):
+        """Run queued commands between steps, returns whether any ran"""
+        applied = False
+        while True:
+            try:
+                command, value = self.commands.get_nowait()
+            except queue.Empty:
+                return applied
+            applied = True
+            if command == 'delay':
+                delayed_train = self.scheduler.trigger_user_delay()
+                if delayed_train:
+                    print(f"User triggered delay on {delayed_train.name}")
+            elif command == 'pause':
+                self.paused = not self.paused
+                print("Simulation paused" if self.paused else "Simulation resumed")
+            elif command == 'reset':
+                self._reset()
+                print("Simulation reset")
+            elif command == 'speed':
+                self.speed = value
+                print(f"Simulation speed: {value:g}x real time")
+
+    def _reset(self):
+        self.scheduler = self.scheduler_factory()
+        track = self.scheduler.track
+        self._track_view = TrackView(track.name, track.total_length_km, None,
+                                     tuple(SegmentView(s.start_km, s.end_km, s.has_double_track) for s in track.segments))
+        self._publish()
+
+    def _publish(self):
+        """Copy the scheduler into a new snapshot and make it the one readers get"""
+        scheduler = self.scheduler
+        scheduler.sync_trains()
+        trains = tuple(TrainView(t.id, t.name, t.priority, t.color, t.position_km, t.current_speed, t.original_speed,
+                                 t.delay_minutes, t.current_phase, t.has_started, t.destination_reached,
+                                 t.is_on_side_track) for t in scheduler.trains)
+        locations = tuple(LocationView(loc.name, loc.type, loc.position_km, loc.side_tracks, loc.occupied_side_tracks)
+                          for loc in scheduler.track.locations)
+        status = MappingProxyType(scheduler.get_system_status())
+        self.snapshot = SimulationSnapshot(self._track_view._replace(locations=locations), trains, status,
+                                           self.paused, self.speed)
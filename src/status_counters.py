@@ -0,0 +1,25 @@
+from collections import Counter
+
+class StatusCounters:
+    """Running train counts per status label, updated as trains change state"""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def move(self, old_labels, new_labels):
+        """Move one train from its old status labels to its new ones"""
+        for label in old_labels:
+            self.counts[label] -= 1
+        for label in new_labels:
+            self.counts[label] += 1
+
+    def clear(self):
+        self.counts.clear()
+
+    def __getitem__(self, label):
+        return self.counts[label]
+
+    def grouped(self, group):
+        """Non-zero counts of (group, value) labels, keyed by value"""
+        return {label[1]: count for label, count in self.counts.items()
+                if count > 0 and isinstance(label, tuple) and label[0] == group}
@@ -0,0 +1,134 @@
+import sys
+import json
+import atexit
+from bisect import bisect_left
+from time import perf_counter_ns
+
+# simulate_step's stages in the order they run, as (stage name, method on the scheduler or engine)
+STAGES = (
+    ('start', '_start_ready_trains'),
+    ('four_phase', '_handle_four_phase_delay_logic'),
+    ('recovery', '_handle_delay_recovery'),
+    ('overtaking', '_handle_overtaking_logic'),
+    ('positions', '_update_positions'),
+    ('side_track_returns', '_process_side_track_returns'),
+    ('occupancy', '_update_track_occupancy')
+)
+QUIET_STAGE = 'quiet_steps'  # Merged steps of simulate_event_step, timed as one stage
+
+# Histogram bucket upper bounds in microseconds - the last bucket takes everything slower
+BUCKET_BOUNDS_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+class StageStats:
+    """Latency histogram, call count and trains visited for one stage"""
+    __slots__ = ('calls', 'trains', 'total_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.trains = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_US) + 1)
+
+    def add(self, elapsed_ns, trains):
+        self.calls += 1
+        self.trains += trains
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.buckets[bisect_left(BUCKET_BOUNDS_US, elapsed_ns / 1000)] += 1
+
+    def percentile_us(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls, capped at the slowest call"""
+        wanted = fraction * self.calls
+        seen = 0
+        slowest = round(self.max_ns / 1000, 3)
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return min(BUCKET_BOUNDS_US[i], slowest) if i < len(BUCKET_BOUNDS_US) else slowest
+        return 0.0
+
+class StepProfiler:
+    """Per-stage timing for DynamicRailwayScheduler.simulate_step
+
+    Attach one with DynamicRailwayScheduler(profiler=...). Without one, simulate_step runs its
+    stages directly and pays a single None check per step.
+    """
+
+    def __init__(self):
+        self.steps = 0
+        self.stages = {name: StageStats() for name, _ in STAGES}
+        self.stages[QUIET_STAGE] = StageStats()
+
+    def run_step(self, target, time_delta_minutes, visits):
+        """Run the stages on target (a scheduler or its engine), timing each one
+
+        visits holds the number of trains each stage works on, in STAGES order.
+        """
+        self.steps += 1
+        for (name, method), trains in zip(STAGES, visits):
+            stage = getattr(target, method)
+            started = perf_counter_ns()
+            if name == 'positions':
+                stage(time_delta_minutes)
+            else:
+                stage()
+            self.stages[name].add(perf_counter_ns() - started, trains)
+
+    def record(self, name, elapsed_ns, trains):
+        """Add one timed call of a stage"""
+        if name not in self.stages:
+            raise ValueError(f"Unknown stage: {name}")
+        self.stages[name].add(elapsed_ns, trains)
+
+    def reset(self):
+        self.__init__()
+
+    def report(self):
+        """Per-stage statistics, in stage order, as a JSON-ready dict"""
+        total_ns = sum(stats.total_ns for stats in self.stages.values())
+        stages = {}
+        for name, stats in self.stages.items():
+            if not stats.calls:
+                continue
+            stages[name] = {
+                'calls': stats.calls,
+                'trains_visited': stats.trains,
+                'mean_trains': round(stats.trains / stats.calls, 2),
+                'total_ms': round(stats.total_ns / 1e6, 3),
+                'share': round(stats.total_ns / total_ns, 4) if total_ns else 0.0,
+                'mean_us': round(stats.total_ns / stats.calls / 1000, 3),
+                'p50_us': stats.percentile_us(0.5),
+                'p99_us': stats.percentile_us(0.99),
+                'max_us': round(stats.max_ns / 1000, 3),
+                'histogram_us': {str(bound): count for bound, count in
+                                 zip(BUCKET_BOUNDS_US + ('inf',), stats.buckets) if count}
+            }
+        return {'steps': self.steps, 'total_ms': round(total_ns / 1e6, 3), 'stages': stages}
+
+    def format(self):
+        """Report as a text table"""
+        return format_report(self.report())
+
+    def dump_at_exit(self, path=None):
+        """Write the report when the process exits - JSON to path, or a table on stderr"""
+        atexit.register(self._dump, path)
+
+    def _dump(self, path):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(self.report(), f, indent=2)
+        else:
+            print(self.format(), file=sys.stderr)
+
+def format_report(report):
+    """Text table of a StepProfiler report"""
+    lines = [f"Step profile: {report['steps']} steps, {report['total_ms']:.1f} ms in stages",
+             f"  {'stage':<20}{'calls':>9}{'trains':>9}{'total ms':>11}{'share':>8}{'mean us':>10}"
+             f"{'p50 us':>9}{'p99 us':>9}{'max us':>10}"]
+    for name, stats in report['stages'].items():
+        lines.append(f"  {name:<20}{stats['calls']:>9}{stats['mean_trains']:>9.1f}{stats['total_ms']:>11.1f}"
+                     f"{stats['share']:>8.1%}{stats['mean_us']:>10.1f}{stats['p50_us']:>9g}"
+                     f"{stats['p99_us']:>9g}{stats['max_us']:>10.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,157 @@
+import csv
+import math
+import numpy as np
+from collections import namedtuple
+from datetime import timedelta
+
+COLUMNS = ('id', 'name', 'priority', 'speed', 'departure')
+MAX_SPEED = 300  # km/h - anything faster is a data error
+MAX_REPORTED_ROWS = 5  # Bad rows listed per validation error
+
+# One validated block of timetable rows as columns - departures in seconds after the day start
+TimetableChunk = namedtuple('TimetableChunk', ['ids', 'names', 'priorities', 'speeds', 'departures', 'first_row'])
+
+class TimetableLoader:
+    """Streams a timetable CSV (id, name, priority, speed, departure HH:MM[:SS]) in validated chunks
+
+    Rows must be in departure order over the service day, which starts at day_start and wraps past
+    midnight. Only one chunk is held at a time, so the file can be far larger than memory needs to be.
+    """
+
+    def __init__(self, path, day_start, chunk_rows=5000):
+        if chunk_rows < 1:
+            raise ValueError(f"chunk_rows must be at least 1: {chunk_rows}")
+        self.path = path
+        self.day_start = day_start  # Datetime the service day begins, e.g. the scheduler's start time
+        self.chunk_rows = chunk_rows
+        self.rows_read = 0
+
+    def chunks(self):
+        """Validated TimetableChunks in file order"""
+        start_seconds = self.day_start.hour * 3600 + self.day_start.minute * 60 + self.day_start.second
+        seen_ids = set()
+        last_departure = 0
+        with open(self.path, newline='') as f:
+            reader = csv.reader(f)
+            header = [name.strip() for name in next(reader, [])]
+            missing = [name for name in COLUMNS if name not in header]
+            if missing:
+                raise ValueError(f"Timetable {self.path} is missing columns: {', '.join(missing)}")
+            indexes = [header.index(name) for name in COLUMNS]
+            width = max(indexes) + 1
+
+            rows = []
+            first_row = 2  # File line of the first data row
+            for row in reader:
+                if not row:
+                    continue
+                rows.append(row if len(row) >= width else row + [''] * (width - len(row)))
+                if len(rows) == self.chunk_rows:
+                    chunk = self._validate(rows, indexes, first_row, start_seconds, seen_ids, last_departure)
+                    last_departure = int(chunk.departures[-1])
+                    first_row += len(rows)
+                    rows = []
+                    yield chunk
+            if rows:
+                yield self._validate(rows, indexes, first_row, start_seconds, seen_ids, last_departure)
+
+    def _validate(self, rows, indexes, first_row, start_seconds, seen_ids, last_departure):
+        """Parse and check a block of rows with array operations, raising ValueError on bad rows"""
+        columns = [np.char.strip(np.array([row[i] for row in rows], dtype=str)) for i in indexes]
+        ids, names, priorities, speeds, departures = columns
+        line = np.arange(first_row, first_row + len(rows))
+
+        def check(ok, problem):
+            if not ok.all():
+                bad = line[~ok][:MAX_REPORTED_ROWS].tolist()
+                raise ValueError(f"Timetable {self.path} line(s) {', '.join(map(str, bad))}: {problem}")
+
+        check(np.char.isdigit(ids), "id must be a whole number")
+        check(np.char.str_len(names) > 0, "name is empty")
+        check(np.char.isdigit(priorities), "priority must be a whole number")
+        priority_values = priorities.astype(np.int64)
+        check((priority_values >= 1) & (priority_values <= 4), "priority must be 1-4")
+        check(np.char.isdigit(np.char.replace(speeds, '.', '', count=1)), "speed must be a number")
+        speed_values = speeds.astype(np.float64)
+        check((speed_values > 0) & (speed_values <= MAX_SPEED), f"speed must be above 0 and at most {MAX_SPEED} km/h")
+
+        hours, _, rest = np.char.partition(departures, ':').T
+        minutes, _, seconds = np.char.partition(rest, ':').T
+        seconds = np.where(np.char.str_len(seconds) == 0, '0', seconds)
+        check(np.char.isdigit(hours) & np.char.isdigit(minutes) & np.char.isdigit(seconds) &
+              (np.char.str_len(minutes) == 2), "departure must be HH:MM or HH:MM:SS")
+        hours, minutes, seconds = hours.astype(np.int64), minutes.astype(np.int64), seconds.astype(np.int64)
+        check((hours < 24) & (minutes < 60) & (seconds < 60), "departure is not a time of day")
+        offsets = (hours * 3600 + minutes * 60 + seconds - start_seconds) % 86400
+
+        check(np.diff(offsets, prepend=last_departure) >= 0, "rows must be in departure order")
+        id_values = ids.astype(np.int64)
+        first_seen = np.zeros(len(rows), dtype=bool)
+        first_seen[np.unique(id_values, return_index=True)[1]] = True
+        id_list = id_values.tolist()
+        seen_before = np.fromiter((i in seen_ids for i in id_list), bool, len(id_list))  # Set lookups, O(chunk)
+        check(first_seen & ~seen_before, "duplicate id")
+        seen_ids.update(id_list)
+        self.rows_read += len(rows)
+        return TimetableChunk(id_values, names, priority_values, speed_values, offsets, first_row)
+
+class TimetableFeeder:
+    """Admits timetable trains shortly before departure and retires them after arrival
+
+    Call update() between steps. The scheduler only ever holds the trains about to depart, running
+    or still referred to, instead of the whole day.
+    """
+
+    def __init__(self, scheduler, loader, lead_minutes=15, retire_every_minutes=15):
+        self.scheduler = scheduler
+        self.chunks = loader.chunks()
+        self.day_start = loader.day_start
+        self.lead_minutes = lead_minutes  # Materialize a train this long before its departure
+        self.retire_every_minutes = retire_every_minutes
+        self.chunk = None
+        self.row = 0
+        self.admitted = 0
+        self.retired = 0
+        self.peak_trains = len(scheduler.trains)
+        self.next_retire = scheduler.simulation_minutes + retire_every_minutes
+        self._next_chunk()
+
+    def update(self):
+        """Admit trains departing within the lead time and retire finished ones when due"""
+        scheduler = self.scheduler
+        horizon = self._minutes_since_day_start(scheduler.current_time) + self.lead_minutes
+        configs, starts = [], []
+        while self.chunk is not None and self.chunk.departures[self.row] / 60 <= horizon:
+            chunk, i = self.chunk, self.row
+            configs.append({'id': int(chunk.ids[i]), 'name': str(chunk.names[i]),
+                            'priority': int(chunk.priorities[i]), 'speed': float(chunk.speeds[i])})
+            starts.append(self.day_start + timedelta(seconds=int(chunk.departures[i])))
+            self.row += 1
+            if self.row == len(chunk.ids):
+                self._next_chunk()
+        if configs:
+            # One batch per update - the vectorized engine reloads its arrays once, not once per train
+            scheduler.admit_trains(configs, starts)
+            self.admitted += len(configs)
+        self.peak_trains = max(self.peak_trains, len(scheduler.trains))
+        if scheduler.simulation_minutes >= self.next_retire:
+            self.retired += len(scheduler.retire_finished_trains())
+            self.next_retire = scheduler.simulation_minutes + self.retire_every_minutes
+
+    def next_update_minute(self):
+        """Simulation minute by which update() has to run again (inf once the timetable is exhausted)"""
+        scheduler = self.scheduler
+        offset = scheduler.simulation_minutes - self._minutes_since_day_start(scheduler.current_time)
+        admit = math.inf if self.chunk is None else self.chunk.departures[self.row] / 60 - self.lead_minutes + offset
+        return min(admit, self.next_retire)
+
+    def report(self):
+        return {'admitted': self.admitted, 'retired': self.retired, 'peak_trains': self.peak_trains,
+                'exhausted': self.chunk is None}
+
+    def _minutes_since_day_start(self, time):
+        return (time - self.day_start).total_seconds() / 60
+
+    def _next_chunk(self):
+        self.chunk = next(self.chunks, None)
+        self.row = 0
@@ -0,0 +1,226 @@
+import os
+import json
+import numpy as np
+from datetime import datetime, timedelta
+from src.dynamic_scheduler import Location, RailwayTrack, Train
+from src.train_codes import PHASES
+
+TRACE_VERSION = 1
+
+# Bits of the per-train flags column
+STARTED = 1
+ARRIVED = 2
+ON_SIDE_TRACK = 4
+EMERGENCY_STOPPED = 8
+INHERITED_DELAY = 16  # Delay came from another train (secondary)
+EVER_DELAYED = 32     # total_delay_accumulated > 0
+
+# Column -> dtype; train columns are (rows, trains), location columns (rows, locations), index columns (rows,)
+TRAIN_COLUMNS = {'position': np.float32, 'speed': np.float32, 'delay': np.float32, 'phase': np.int8, 'flags': np.uint8}
+LOCATION_COLUMNS = {'occupied_side_tracks': np.int16}
+INDEX_COLUMNS = {'step': np.int64, 'minute': np.float64, 'overtaking_events': np.int32}
+
+class TraceRecorder:
+    """Per-step train state written straight into preallocated memory-mapped .npy columns"""
+
+    def __init__(self, directory, scheduler, capacity):
+        self.directory = directory
+        self.scheduler = scheduler
+        self.capacity = capacity  # Rows preallocated on disk - one per recorded step
+        self.rows = 0
+        os.makedirs(directory, exist_ok=True)
+
+        scheduler.sync_trains()
+        self.train_count = len(scheduler.trains)
+        self.location_count = len(scheduler.track.locations)
+        self.memmaps = {}
+        for name, dtype in TRAIN_COLUMNS.items():
+            self.memmaps[name] = self._open(name, dtype, (capacity, self.train_count))
+        for name, dtype in LOCATION_COLUMNS.items():
+            self.memmaps[name] = self._open(name, dtype, (capacity, self.location_count))
+        for name, dtype in INDEX_COLUMNS.items():
+            self.memmaps[name] = self._open(name, dtype, (capacity,))
+        # Plain ndarray views of the same mapped memory - np.memmap indexing is several times slower
+        self.columns = {name: memmap.view(np.ndarray) for name, memmap in self.memmaps.items()}
+        self._write_header()
+
+    def _open(self, name, dtype, shape):
+        return np.lib.format.open_memmap(os.path.join(self.directory, f"{name}.npy"), mode='w+', dtype=dtype, shape=shape)
+
+    def record(self, step):
+        """Append the scheduler's current state as the row for this step"""
+        if self.rows >= self.capacity:
+            raise ValueError(f"Trace is full ({self.capacity} rows)")
+        scheduler = self.scheduler
+        if len(scheduler.trains) != self.train_count:
+            raise ValueError("Trains were added after the trace started")
+
+        row = self.rows
+        engine = scheduler.engine
+        if engine is not None and engine.loaded:
+            self._record_arrays(row, engine)
+        else:
+            self._record_trains(row, scheduler)
+        columns = self.columns
+        columns['step'][row] = step
+        columns['minute'][row] = scheduler.simulation_minutes
+        columns['overtaking_events'][row] = len(scheduler.overtaking_events)
+        self.rows += 1
+
+    def _record_arrays(self, row, engine):
+        """Row from the vectorized engine's arrays - no Train objects touched"""
+        columns = self.columns
+        columns['position'][row] = engine.position
+        columns['speed'][row] = engine.speed
+        columns['delay'][row] = engine.delay
+        columns['phase'][row] = engine.phase
+        columns['flags'][row] = (engine.has_started * STARTED | engine.destination_reached * ARRIVED |
+                                 engine.is_on_side_track * ON_SIDE_TRACK | engine.emergency_stopped * EMERGENCY_STOPPED |
+                                 (engine.phase_target >= 0) * INHERITED_DELAY | (engine.total_delay > 0) * EVER_DELAYED)
+        columns['occupied_side_tracks'][row] = engine.location_occupied
+
+    def _record_trains(self, row, scheduler):
+        columns = self.columns
+        trains = scheduler.trains
+        columns['position'][row] = [t.position_km for t in trains]
+        columns['speed'][row] = [t.current_speed for t in trains]
+        columns['delay'][row] = [t.delay_minutes for t in trains]
+        columns['phase'][row] = [t.phase for t in trains]
+        columns['flags'][row] = [t.has_started * STARTED | t.destination_reached * ARRIVED |
+                                 t.is_on_side_track * ON_SIDE_TRACK | t.emergency_stopped * EMERGENCY_STOPPED |
+                                 (t.phase_target_train is not None) * INHERITED_DELAY |
+                                 (t.total_delay_accumulated > 0) * EVER_DELAYED for t in trains]
+        columns['occupied_side_tracks'][row] = [loc.occupied_side_tracks for loc in scheduler.track.locations]
+
+    def _write_header(self):
+        """trace.json: row count plus everything that stays fixed for the run"""
+        scheduler = self.scheduler
+        track = scheduler.track
+        header = {
+            'version': TRACE_VERSION,
+            'rows': self.rows,
+            'start_time': (scheduler.current_time - timedelta(minutes=scheduler.simulation_minutes)).isoformat(),
+            'track': {
+                'name': track.name,
+                'total_length_km': track.total_length_km,
+                'locations': [[loc.name, loc.type, loc.position_km, loc.side_tracks] for loc in track.locations]
+            },
+            'trains': [{'id': t.id, 'name': t.name, 'priority': t.priority, 'speed': t.original_speed}
+                       for t in scheduler.trains]
+        }
+        with open(os.path.join(self.directory, "trace.json"), 'w') as f:
+            json.dump(header, f)
+
+    def close(self):
+        """Flush the columns and record how many rows are valid"""
+        for memmap in self.memmaps.values():
+            memmap.flush()
+        self._write_header()
+        self.memmaps = {}
+        self.columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TraceReplay:
+    """Recorded run that RailwayVisualizer can draw instead of a live scheduler - seeking is free"""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "trace.json")) as f:
+            header = json.load(f)
+        if header.get('version') != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version: {header.get('version')}")
+        self.rows = header['rows']
+        if self.rows == 0:
+            raise ValueError(f"Empty trace: {directory}")
+
+        self.columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')[:self.rows]
+                        for name in list(TRAIN_COLUMNS) + list(LOCATION_COLUMNS) + list(INDEX_COLUMNS)}
+        self.minutes = self.columns['minute']
+        self.start_time = datetime.fromisoformat(header['start_time'])
+
+        track_state = header['track']
+        self.track = RailwayTrack(track_state['name'], track_state['total_length_km'],
+                                  locations=[Location(*loc) for loc in track_state['locations']])
+        self.trains = [Train(t['id'], t['name'], t['priority'], t['speed'], self.start_time) for t in header['trains']]
+
+        self.row = None
+        self.current_time = self.start_time
+        self.simulation_minutes = 0
+        self.seek(float(self.minutes[0]))
+
+    @property
+    def duration_minutes(self):
+        return float(self.minutes[-1])
+
+    def simulate_step(self, time_delta_minutes):
+        """Play forward by time_delta_minutes (same call as the live scheduler)"""
+        self.seek(self.simulation_minutes + time_delta_minutes)
+
+    def seek(self, minute):
+        """Show the recorded state at minute - positions are interpolated between recorded rows"""
+        minute = min(max(minute, float(self.minutes[0])), self.duration_minutes)
+        row = int(np.searchsorted(self.minutes, minute, side='right')) - 1
+        columns = self.columns
+        position = columns['position'][row].astype(np.float64)
+        if row + 1 < self.rows:
+            # Trains move at a constant speed between rows (event-driven runs record only at events)
+            span = self.minutes[row + 1] - self.minutes[row]
+            fraction = (minute - self.minutes[row]) / span if span > 0 else 0.0
+            moving = columns['flags'][row] == columns['flags'][row + 1]
+            position += np.where(moving, (columns['position'][row + 1] - position) * fraction, 0.0)
+
+        self.simulation_minutes = minute
+        self.current_time = self.start_time + timedelta(minutes=minute)
+        if row != self.row:
+            self._load_row(row)
+        for train, km in zip(self.trains, position.tolist()):
+            train.position_km = km
+
+    def _load_row(self, row):
+        """Copy a recorded row into the Train and Location objects the visualizer draws"""
+        self.row = row
+        columns = self.columns
+        flags = columns['flags'][row]
+        rows = zip(self.trains, columns['speed'][row].tolist(), columns['delay'][row].tolist(),
+                   columns['phase'][row].tolist(), flags.tolist())
+        for train, speed, delay, phase, bits in rows:
+            train.current_speed = int(speed) if speed.is_integer() else round(speed, 3)
+            train.delay_minutes = int(delay) if delay.is_integer() else round(delay, 3)
+            train.phase = phase
+            train.has_started = bool(bits & STARTED)
+            train.destination_reached = bool(bits & ARRIVED)
+            train.is_on_side_track = bool(bits & ON_SIDE_TRACK)
+            train.emergency_stopped = bool(bits & EMERGENCY_STOPPED)
+        for location, occupied in zip(self.track.locations, columns['occupied_side_tracks'][row].tolist()):
+            location.occupied_side_tracks = occupied
+
+    def get_system_status(self):
+        """Same fields as DynamicRailwayScheduler.get_system_status, counted from the current row"""
+        columns = self.columns
+        flags = columns['flags'][self.row]
+        delay = columns['delay'][self.row]
+        started = (flags & STARTED) > 0
+        active = started & ((flags & ARRIVED) == 0)
+        delayed = active & (delay > 0)
+        inherited = (flags & INHERITED_DELAY) > 0
+
+        phases, first_seen, counts = np.unique(columns['phase'][self.row][active], return_index=True, return_counts=True)
+        return {
+            'current_time': self.current_time.strftime('%H:%M:%S'),
+            'simulation_minutes': self.simulation_minutes,
+            'total_trains': len(self.trains),
+            'waiting_to_start': int((~started).sum()),
+            'active_trains': int(active.sum()),
+            'primary_delays': int((delayed & ~inherited).sum()),
+            'secondary_delays': int((delayed & inherited).sum()),
+            'total_delayed_trains': int((active & ((delay > 0) | ((flags & EVER_DELAYED) > 0))).sum()),
+            'side_track_trains': int((active & ((flags & ON_SIDE_TRACK) > 0)).sum()),
+            'emergency_stopped': int((active & ((flags & EMERGENCY_STOPPED) > 0)).sum()),
+            'completed_trains': int(((flags & ARRIVED) > 0).sum()),
+            'overtaking_events': int(columns['overtaking_events'][self.row]),
+            'phase_counts': {PHASES[phases[k]]: int(counts[k]) for k in np.argsort(first_seen)}
+        }
@@ -0,0 +1,44 @@
+# Phase codes (Train.phase) - index into PHASES gives the string used by Train.current_phase
+PHASES = ["NORMAL", "MONITOR", "PROGRESSIVE", "SPEED_MATCH", "EMERGENCY"]
+NORMAL, MONITOR, PROGRESSIVE, SPEED_MATCH, EMERGENCY = range(len(PHASES))
+PHASE_CODES = {phase: code for code, phase in enumerate(PHASES)}
+
+# Stop reason codes (Train.reason) - the text is only built when something reads Train.stop_reason
+(REASON_NONE, REASON_CUSTOM, REASON_SIDE_TRACK, REASON_DELAY_REMAINING,
+ REASON_JOURNEY_COMPLETED, REASON_INHERITED, REASON_MONITOR, REASON_PROGRESSIVE,
+ REASON_SPEED_MATCH, REASON_PHASE_EMERGENCY, REASON_EMERGENCY_HOLD,
+ REASON_YELLOW_TRACK, REASON_DELAYED) = range(13)
+TRAIN_REASONS = (REASON_INHERITED, REASON_MONITOR, REASON_SPEED_MATCH, REASON_EMERGENCY_HOLD)  # ref is a train
+VALUE_REASONS = (REASON_DELAY_REMAINING, REASON_JOURNEY_COMPLETED, REASON_PROGRESSIVE, REASON_PHASE_EMERGENCY)
+
+
+def reason_text(code, value, ref):
+    """Stop reason text - ref is a Train, a Location, text, or (Location, text) for a yellow track move"""
+    if code == REASON_NONE:
+        return ""
+    if code == REASON_CUSTOM:
+        return ref
+    if code == REASON_SIDE_TRACK:
+        return f"Stationary on yellow track at {ref.name}"
+    if code == REASON_DELAY_REMAINING:
+        return f"Delayed: {value:.1f}min remaining"
+    if code == REASON_JOURNEY_COMPLETED:
+        return "Journey completed"
+    if code == REASON_INHERITED:
+        return f"Delayed: Inherited from {ref.name} ({value:.1f}min)"
+    if code == REASON_DELAYED:
+        return f"Delayed: {ref} ({value:.1f}min)"
+    if code == REASON_MONITOR:
+        return f"Phase 1: Monitoring {ref.name}"
+    if code == REASON_PROGRESSIVE:
+        return f"Phase 2: Progressive slowdown ({value:.0f}km/h)"
+    if code == REASON_SPEED_MATCH:
+        return f"Phase 3: Speed matching {ref.name}"
+    if code == REASON_PHASE_EMERGENCY:
+        return "Phase 4: Emergency stop - collision imminent"
+    if code == REASON_EMERGENCY_HOLD:
+        return f"Emergency hold - {ref.name} delayed"
+    if code == REASON_YELLOW_TRACK:
+        location, reason = ref
+        return f"Yellow track at {location.name}: {reason}"
+    return ""
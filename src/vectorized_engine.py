@@ -0,0 +1,789 @@
+import numpy as np
+from datetime import timedelta
+from src.event_log import WARNING
+from src.train_codes import (PHASES, NORMAL, MONITOR, PROGRESSIVE, SPEED_MATCH, EMERGENCY, REASON_NONE,
+                             REASON_CUSTOM, REASON_SIDE_TRACK, REASON_DELAY_REMAINING, REASON_JOURNEY_COMPLETED,
+                             REASON_INHERITED, REASON_MONITOR, REASON_PROGRESSIVE, REASON_SPEED_MATCH,
+                             REASON_PHASE_EMERGENCY, REASON_EMERGENCY_HOLD, REASON_YELLOW_TRACK,
+                             REASON_DELAYED, TRAIN_REASONS, VALUE_REASONS, reason_text)
+
+# Extra operation kinds used when resolving a batch of phase updates
+EMERGENCY_CHECK, RESUME = len(PHASES), len(PHASES) + 1
+
+MONITOR_RANGE_KM = 50
+OVERTAKING_RANGE_KM = 25
+WINDOW_EPSILON_KM = 1e-6  # Widen bisect windows, exact distance check follows
+MICROSECOND = timedelta(microseconds=1)
+
+
+def plain_number(value):
+    """Float from an array as the object path holds it - whole numbers become int"""
+    return int(value) if value.is_integer() else value
+
+
+class VectorizedRailwayEngine:
+    """Struct-of-arrays backend for DynamicRailwayScheduler.
+
+    Train state lives in NumPy arrays and the fleet advances with array
+    operations. Interacting pairs (four-phase followers, overtaking leaders)
+    are found on the position-sorted fleet and resolved as batches that
+    reproduce the object path's scan order, so both engines produce identical
+    state. The INFO and WARNING events (starts, phase changes, emergency stops,
+    recoveries, overtaking steps) are logged in the same order as well; the
+    DEBUG analysis of the object path is not.
+
+    Each step has a fixed NumPy overhead of about 0.15 ms, so the object path is faster
+    below about 120 running trains; at 5000 the engine is about 10x faster.
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.size = 0
+        self.loaded = False
+        self.status_counts = None  # Cached train counts for get_system_status, dropped on every change
+
+    def load(self):
+        """Copy train and location state from the scheduler into arrays"""
+        scheduler = self.scheduler
+        self.trains = list(scheduler.trains)
+        self.locations = scheduler.track.locations
+        self.segments = scheduler.track.segments
+        self.epoch = scheduler.current_time
+        self.size = len(self.trains)
+
+        train_index = {id(t): i for i, t in enumerate(self.trains)}
+        self.train_index = train_index
+        location_index = {id(loc): i for i, loc in enumerate(self.locations)}
+        self.custom_reasons = {}
+        for name, values in self._train_columns(self.trains, 0, train_index, location_index).items():
+            setattr(self, name, values)
+
+        self.location_position = np.array([loc.position_km for loc in self.locations], dtype=np.float64)
+        self.location_double = np.array([loc.has_double_track for loc in self.locations], dtype=bool)
+        self.location_side_tracks = np.array([loc.side_tracks for loc in self.locations], dtype=np.int64)
+        self.location_occupied = np.array([loc.occupied_side_tracks for loc in self.locations], dtype=np.int64)
+
+        # Double-track locations by (position, index), for the next free side track ahead
+        self.village_order = np.flatnonzero(self.location_double)[
+            np.argsort(self.location_position[self.location_double], kind='stable')]
+        self.village_position = self.location_position[self.village_order]
+
+        self.segment_start = np.array([seg.start_km for seg in self.segments], dtype=np.float64)
+        self.segment_end = np.array([seg.end_km for seg in self.segments], dtype=np.float64)
+        self.segment_after = np.concatenate(([-np.inf], self.segment_end[:-1]))  # Segment s holds (after[s], end[s]]
+        self.segment = np.full(self.size, -1, dtype=np.int64)
+        for s, seg in enumerate(self.segments):
+            for t in seg.trains:
+                self.segment[train_index[id(t)]] = s
+        self.position_order = np.argsort(self.position, kind='stable')
+
+        self.loaded = True
+        self.status_counts = None
+
+    def append_trains(self, trains):
+        """Add newly admitted trains to the end of the arrays without re-reading the rest of the fleet
+
+        The trains must be new - not started and not referring to other trains - as admit_trains creates them.
+        """
+        if not self.loaded or self.size + len(trains) != len(self.scheduler.trains):
+            self.load()  # Arrays out of step with scheduler.trains already - read everything
+            return
+        first = self.size
+        columns = self._train_columns(trains, first, {id(t): first + i for i, t in enumerate(trains)}, {})
+        for name, values in columns.items():
+            current = getattr(self, name)
+            if isinstance(current, list):
+                current.extend(values)
+            else:
+                setattr(self, name, np.concatenate((current, values)))
+        self.segment = np.concatenate((self.segment, np.full(len(trains), -1, dtype=np.int64)))
+        self.position_order = np.concatenate((self.position_order, np.arange(first, first + len(trains))))
+        self.train_index.update((id(t), first + i) for i, t in enumerate(trains))
+        self.trains.extend(trains)
+        self.size += len(trains)
+        self.status_counts = None
+
+    def _train_columns(self, trains, first, train_index, location_index):
+        """Per-train arrays for trains stored from index first on - custom stop reasons go into custom_reasons"""
+        def ref(obj, table):
+            return -1 if obj is None else table[id(obj)]
+
+        n = len(trains)
+        columns = {
+            'scheduled_us': np.array([(t.scheduled_start - self.epoch) // MICROSECOND for t in trains], dtype=np.int64),
+            'priority': np.array([t.priority for t in trains], dtype=np.int8),
+            'position': np.array([t.position_km for t in trains], dtype=np.float64),
+            'speed': np.array([t.current_speed for t in trains], dtype=np.float64),
+            'original_speed': np.array([t.original_speed for t in trains], dtype=np.float64),
+            'delay': np.array([t.delay_minutes for t in trains], dtype=np.float64),
+            'total_delay': np.array([t.total_delay_accumulated for t in trains], dtype=np.float64),
+            'phase': np.array([t.phase for t in trains], dtype=np.int8),
+            'has_started': np.array([t.has_started for t in trains], dtype=bool),
+            'destination_reached': np.array([t.destination_reached for t in trains], dtype=bool),
+            'is_stopped': np.array([t.is_stopped for t in trains], dtype=bool),
+            'emergency_stopped': np.array([t.emergency_stopped for t in trains], dtype=bool),
+            'is_on_side_track': np.array([t.is_on_side_track for t in trains], dtype=bool),
+            'is_speed_matched': np.array([t.is_speed_matched for t in trains], dtype=bool),
+            'phase_target': np.array([ref(t.phase_target_train, train_index) for t in trains], dtype=np.int64),
+            'speed_matched_to': np.array([ref(t.speed_matched_to_train, train_index) for t in trains], dtype=np.int64),
+            'waiting_for': np.array([ref(t.waiting_for_train, train_index) for t in trains], dtype=np.int64),
+            'side_track': np.array([ref(t.side_track_location, location_index) for t in trains], dtype=np.int64),
+            'times_rerouted': np.array([t.times_rerouted for t in trains], dtype=np.int64),
+            'last_update_times': [t.last_update_time for t in trains],
+            'reason': np.full(n, REASON_NONE, dtype=np.int8),
+            'reason_value': np.zeros(n, dtype=np.float64),
+            'reason_ref': np.full(n, -1, dtype=np.int64)
+        }
+        for i, t in enumerate(trains):
+            code = t.reason
+            if code in TRAIN_REASONS or code == REASON_SIDE_TRACK:
+                columns['reason_ref'][i] = (train_index if code != REASON_SIDE_TRACK else location_index)[id(t.reason_ref)]
+            elif code not in VALUE_REASONS and code != REASON_NONE:
+                code = REASON_CUSTOM  # Free text, or a yellow track move the arrays cannot describe
+                self.custom_reasons[first + i] = t.stop_reason
+            columns['reason'][i] = code
+            columns['reason_value'][i] = t.reason_value
+        return columns
+
+    def reload_train(self, train):
+        """Re-read the delay fields of a train changed outside the engine"""
+        if not self.loaded:
+            return
+        i = self.trains.index(train)
+        self.delay[i] = train.delay_minutes
+        self.total_delay[i] = train.total_delay_accumulated
+        self.is_stopped[i] = train.is_stopped
+        self._set_reason(i, REASON_CUSTOM)
+        self.custom_reasons[i] = train.stop_reason
+        self.status_counts = None
+
+    def apply_position_reports(self, reports):
+        """Array version of DynamicRailwayScheduler.apply_position_reports - writes only the reported rows"""
+        if not self.loaded or self.size != len(self.scheduler.trains):
+            self.load()
+        scheduler = self.scheduler
+        track_length = scheduler.track.total_length_km
+        applied = 0
+        for train, position_km in reports:
+            i = self.train_index[id(train)]
+            if self.destination_reached[i] or self.is_on_side_track[i]:
+                continue
+            if not self.has_started[i]:
+                now_us = (scheduler.current_time - self.epoch) // MICROSECOND
+                self.scheduled_us[i] = min(self.scheduled_us[i], now_us)
+                train.scheduled_start = min(train.scheduled_start, scheduler.current_time)
+                self.has_started[i] = True
+                self.is_stopped[i] = False
+                self.last_update_times[i] = scheduler.current_time
+                scheduler.event_log.info("TRAIN_STARTED", "🚀 TRAIN STARTED: {} (P{}, {}km/h) at {:%H:%M} - reported by feed",
+                                         train.name, train.priority, train.original_speed, scheduler.current_time)
+            self.position[i] = min(max(position_km, 0.0), track_length)
+            if self.position[i] >= track_length:
+                self.destination_reached[i] = True
+                self.is_stopped[i] = True
+                self._set_reason(i, REASON_JOURNEY_COMPLETED)
+                self.segment[i] = -1
+            else:
+                segment = int(np.searchsorted(self.segment_end, self.position[i], side='left'))
+                self.segment[i] = segment if segment < len(self.segment_end) else -1
+            applied += 1
+        if applied:
+            self.status_counts = None
+        return applied
+
+    def step(self, time_delta_minutes):
+        """Advance the whole fleet by one time step"""
+        if not self.loaded or self.size != len(self.scheduler.trains):
+            self.load()
+
+        profiler = self.scheduler.profiler
+        if profiler is not None:
+            profiler.run_step(self, time_delta_minutes, self._stage_visits())
+        else:
+            self._start_ready_trains()
+            self._handle_four_phase_delay_logic()
+            self._handle_delay_recovery()
+            self._handle_overtaking_logic()
+            self._update_positions(time_delta_minutes)
+            self._process_side_track_returns()
+            self._update_track_occupancy()
+        self.status_counts = None
+
+    def _stage_visits(self):
+        """Array version of DynamicRailwayScheduler._stage_visits"""
+        active = self.has_started & ~self.destination_reached
+        running = int(active.sum())
+        return (int((~self.has_started).sum()), int((self.has_started & (self.delay > 0)).sum()),
+                int(((self.phase != NORMAL) | self.emergency_stopped).sum()), running, running,
+                int((active & self.is_on_side_track).sum()), self.size)
+
+    def advance_quiet(self, steps, time_delta_minutes):
+        """Advance positions and delay countdowns through steps in which no logic fires"""
+        if not self.loaded or self.size != len(self.scheduler.trains):
+            self.load()
+
+        moving = self.has_started & ~self.destination_reached & ~self.is_on_side_track
+        delayed = moving & (self.delay > 0)
+        running = moving & ~delayed & ~self.is_stopped & ~self.emergency_stopped
+        track_length = self.scheduler.track.total_length_km
+
+        # Same per-step arithmetic as _update_positions, so positions match fixed stepping exactly
+        increment = (self.speed[running] / 60) * time_delta_minutes
+        position = self.position[running]
+        delay = self.delay[delayed]
+        for _ in range(steps):
+            position = np.minimum(track_length, position + increment)
+            delay -= time_delta_minutes
+        self.position[running] = position
+        self.delay[delayed] = delay
+        self.status_counts = None
+
+    def _set_reason(self, i, code, value=0.0, ref=-1):
+        self.reason[i] = code
+        self.reason_value[i] = value
+        self.reason_ref[i] = ref
+
+    def _sorted_by_position(self, mask):
+        """Trains in mask sorted by position, ties in train order
+
+        Re-sorts the previous order, which trains rarely leave between steps, so the
+        stable sort only has to merge a few runs instead of sorting the fleet.
+        """
+        order = self.position_order
+        order = order[np.argsort(self.position[order], kind='stable')]
+        self.position_order = order
+        order = order[mask[order]]
+        position = self.position[order]
+        if ((position[1:] == position[:-1]) & (order[1:] < order[:-1])).any():
+            order = order[np.lexsort((order, position))]
+        return order
+
+    def _start_ready_trains(self):
+        now_us = (self.scheduler.current_time - self.epoch) // MICROSECOND
+        ready = ~self.has_started & (self.scheduled_us <= now_us)
+        if ready.any():
+            self.has_started |= ready
+            self.is_stopped[ready] = False
+            event_log = self.scheduler.event_log
+            for i in np.flatnonzero(ready).tolist():
+                self.last_update_times[i] = self.scheduler.current_time
+                train = self.trains[i]
+                event_log.info("TRAIN_STARTED", "🚀 TRAIN STARTED: {} (P{}, {}km/h) at {:%H:%M}",
+                               train.name, train.priority, train.original_speed, self.scheduler.current_time)
+
+    def _expand_windows(self, by_position, lo, hi):
+        """Expand per-row [lo, hi) windows over by_position into (row, member) arrays"""
+        counts = hi - lo
+        rows = np.repeat(np.arange(len(lo)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return rows, by_position[np.repeat(lo, counts) + offsets]
+
+    def _neighbour_pairs(self, sources, eligible):
+        """Return (source, follower, distance) for every train within 50km of a source"""
+        by_position = self._sorted_by_position(eligible) if len(sources) else sources
+        if not len(by_position):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float64)
+
+        sorted_position = self.position[by_position]
+        source_position = self.position[sources]
+        lo = np.searchsorted(sorted_position, source_position - MONITOR_RANGE_KM - WINDOW_EPSILON_KM, side='left')
+        hi = np.searchsorted(sorted_position, source_position + MONITOR_RANGE_KM + WINDOW_EPSILON_KM, side='right')
+
+        group, followers = self._expand_windows(by_position, lo, hi)
+        source = sources[group]
+        distance = np.abs(self.position[source] - self.position[followers])
+
+        keep = (distance <= MONITOR_RANGE_KM) & (distance > 0) & (followers != source)
+        return source[keep], followers[keep], distance[keep]
+
+    def _handle_four_phase_delay_logic(self):
+        delayed = np.flatnonzero((self.delay > 0) & self.has_started)
+        if not len(delayed):
+            return
+        eligible = self.has_started & ~self.destination_reached & ~self.is_on_side_track
+        source, follower, distance = self._neighbour_pairs(delayed, eligible)
+
+        # A secondary delayed train never constrains the train it is reacting to
+        keep = self.phase_target[source] != follower
+        source, follower, distance = source[keep], follower[keep], distance[keep]
+        if not len(source):
+            return
+
+        # One pair per follower: most restrictive phase, then slowest delayed train, then nearest
+        new_phase = np.select([distance > 35, distance > 20, distance > 10],
+                              [MONITOR, PROGRESSIVE, SPEED_MATCH], EMERGENCY)
+        order = np.lexsort((source, distance, self.speed[source], -new_phase, follower))
+        sorted_follower = follower[order]
+        chosen = order[np.r_[True, sorted_follower[1:] != sorted_follower[:-1]]]
+        self._apply_four_phase_pairs(source[chosen], follower[chosen], distance[chosen], new_phase[chosen])
+
+    def _apply_four_phase_pairs(self, source, follower, distance, new_phase):
+        """Four-phase logic for one (delayed train, follower) pair per follower, in train list order"""
+        # set_phase is skipped when the follower already has this phase and target, which
+        # leaves only the collision check for an emergency follower whose stop was cleared
+        skip = (self.phase[follower] == new_phase) & (self.phase_target[follower] == source)
+        emergency_check = skip & (new_phase == EMERGENCY) & ~self.emergency_stopped[follower]
+        kind = np.where(emergency_check, EMERGENCY_CHECK, new_phase)
+        writes = ~skip | emergency_check
+        self._apply_phase_operations(follower[writes], source[writes], distance[writes], kind[writes])
+
+    def _apply_phase_operations(self, train, source, distance, kind):
+        """Apply an ordered batch of phase operations with array operations.
+
+        Each operation may read the speed and delay its source train had at that
+        point of the batch. Reads resolve to the source's last earlier write and
+        are iterated to a fixed point, which matches applying them one by one.
+        """
+        count = len(train)
+        if not count:
+            return
+        order = np.arange(count)
+        start_speed = self.speed.copy()
+        start_delay = self.delay.copy()
+        original_speed = self.original_speed[train]
+        read_source = np.maximum(source, 0)
+
+        # Last earlier operation on each source train
+        by_train = np.lexsort((order, train))
+        write_key = train[by_train] * count + order[by_train]
+        prior = np.searchsorted(write_key, source * count + order, side='left') - 1
+        prior_op = by_train[np.maximum(prior, 0)]
+        prior_op[(prior < 0) | (train[prior_op] != source)] = -1
+
+        # Emergency checks that run before an operation reading their train's delay
+        check_op = np.full(self.size, -1, dtype=np.int64)
+        checks = np.flatnonzero(kind == EMERGENCY_CHECK)
+        check_op[train[checks]] = checks
+        source_check = check_op[read_source]
+        inherited_before = (source >= 0) & (source_check >= 0) & (source_check < order)
+
+        distance_factor = np.clip((distance - 20) / (35 - 20), 0, 1)
+        speed = np.zeros(count)
+        inherited = np.zeros(count)
+        for _ in range(count + 1):
+            source_speed = np.where(prior_op >= 0, speed[prior_op], start_speed[read_source])
+            source_delay = start_delay[read_source] + np.where(inherited_before, inherited[source_check], 0)
+
+            target_speed = source_speed + (original_speed - source_speed) * distance_factor
+            new_speed = np.select(
+                [kind == MONITOR, kind == PROGRESSIVE, kind == SPEED_MATCH, kind == RESUME],
+                [original_speed, np.maximum(source_speed, target_speed), source_speed, original_speed], 0.0)
+
+            speed_diff = start_speed[train] - source_speed
+            with np.errstate(divide='ignore'):
+                time_to_collision = np.where(speed_diff > 0, distance / (speed_diff / 60), np.inf)
+            new_inherited = np.where((kind == EMERGENCY_CHECK) & (time_to_collision <= source_delay),
+                                     source_delay, 0.0)
+
+            if np.array_equal(new_speed, speed) and np.array_equal(new_inherited, inherited):
+                break
+            speed, inherited = new_speed, new_inherited
+
+        if self.scheduler.event_log.enabled(WARNING):
+            self._log_phase_operations(train, source, distance, kind, speed, inherited)
+
+        # Delay inheritance adds the source's remaining delay
+        inherits = np.flatnonzero(inherited > 0)
+        self.delay[train[inherits]] += inherited[inherits]
+        self.total_delay[train[inherits]] += inherited[inherits]
+        for op in inherits.tolist():
+            self.scheduler.delay_events.append({
+                'type': 'secondary',
+                'train': self.trains[train[op]].name,
+                'source': self.trains[source[op]].name,
+                'minutes': float(inherited[op]),
+                'time': self.scheduler.simulation_minutes
+            })
+
+        # Flags set by any operation on a train
+        matched = kind == SPEED_MATCH
+        self.is_speed_matched[train[matched]] = True
+        self.speed_matched_to[train[matched]] = source[matched]
+        stopping = (kind == EMERGENCY) | (kind == EMERGENCY_CHECK)
+        self.emergency_stopped[train[stopping]] = True
+        self.is_stopped[train[stopping]] = True
+
+        # Everything else comes from the last operation on each train
+        sorted_train = train[by_train]
+        last = by_train[np.r_[sorted_train[1:] != sorted_train[:-1], True]]
+        trains, last_kind, last_source = train[last], kind[last], source[last]
+        self.speed[trains] = speed[last]
+        self.phase[trains] = np.select([last_kind == EMERGENCY_CHECK, last_kind == RESUME],
+                                       [EMERGENCY, NORMAL], last_kind)
+        self.phase_target[trains] = np.where(last_kind == RESUME, -1, last_source)
+
+        self.reason_value[trains] = 0.0
+        self.reason_ref[trains] = -1
+        for code, reason, with_ref in ((MONITOR, REASON_MONITOR, True),
+                                       (SPEED_MATCH, REASON_SPEED_MATCH, True),
+                                       (EMERGENCY, REASON_PHASE_EMERGENCY, False),
+                                       (RESUME, REASON_NONE, False)):
+            mask = last_kind == code
+            self.reason[trains[mask]] = reason
+            if with_ref:
+                self.reason_ref[trains[mask]] = last_source[mask]
+        mask = last_kind == PROGRESSIVE
+        self.reason[trains[mask]] = REASON_PROGRESSIVE
+        self.reason_value[trains[mask]] = speed[last][mask]
+        mask = last_kind == EMERGENCY_CHECK
+        held = mask & (inherited[last] == 0)
+        self.reason[trains[held]] = REASON_EMERGENCY_HOLD
+        self.reason_ref[trains[mask]] = last_source[mask]
+        inherit = mask & ~held
+        self.reason[trains[inherit]] = REASON_INHERITED
+        self.reason_value[trains[inherit]] = self.delay[trains[inherit]]
+
+        # Resumed trains drop every delay-handling flag
+        resumed = trains[last_kind == RESUME]
+        self.is_speed_matched[resumed] = False
+        self.speed_matched_to[resumed] = -1
+        self.emergency_stopped[resumed] = False
+        self.is_stopped[resumed] = False
+
+    def _log_phase_operations(self, train, source, distance, kind, speed, inherited):
+        """Log what Train.set_phase, emergency_stop and resume_normal_speed log, one operation at a time"""
+        event_log = self.scheduler.event_log
+        phase, speed_now, stopped, matched = {}, {}, {}, {}
+        for op, (i, j, k) in enumerate(zip(train.tolist(), source.tolist(), kind.tolist())):
+            name = self.trains[i].name
+            old_phase = phase.get(i, int(self.phase[i]))
+            if k == RESUME:
+                if j < 0:
+                    event_log.info("RECOVERY", "DIRECT DELAY RECOVERY: {} own delay ended - resuming normal speed", name)
+                if (old_phase != NORMAL or stopped.get(i, self.emergency_stopped[i]) or
+                        matched.get(i, self.is_speed_matched[i])):
+                    event_log.info("RECOVERY", "FULL RECOVERY: {} → {}km/h (was {}km/h)", name,
+                                   self.trains[i].original_speed, plain_number(speed_now.get(i, self.speed[i])))
+                phase[i], stopped[i], matched[i] = NORMAL, False, False
+            elif k == EMERGENCY_CHECK:
+                if inherited[op] > 0:
+                    event_log.warning("EMERGENCY_STOP", "EMERGENCY STOP: {} - {}", name,
+                                      f"Collision inevitable with {self.trains[j].name}")
+                else:
+                    event_log.warning("EMERGENCY_HOLD", "EMERGENCY HOLD: {} - delay on {} will end in time, "
+                                      "maintaining emergency protocols", name, self.trains[j].name)
+                phase[i], stopped[i] = EMERGENCY, True
+            else:
+                if k != old_phase:
+                    event_log.info("PHASE_CHANGE", "PHASE CHANGE: {} {} → {} (Distance: {:.1f}km)",
+                                   name, PHASES[old_phase], PHASES[k], distance[op])
+                phase[i] = k
+                matched[i] = matched.get(i, self.is_speed_matched[i]) or k == SPEED_MATCH
+                stopped[i] = stopped.get(i, self.emergency_stopped[i]) or k == EMERGENCY
+            speed_now[i] = speed[op]
+
+    def _resume_normal_speed(self, train):
+        if self.phase[train] != NORMAL or self.emergency_stopped[train] or self.is_speed_matched[train]:
+            self.scheduler.event_log.info("RECOVERY", "FULL RECOVERY: {} → {}km/h (was {}km/h)", self.trains[train].name,
+                                          self.trains[train].original_speed, plain_number(self.speed[train]))
+            self.speed[train] = self.original_speed[train]
+            self.phase[train] = NORMAL
+            self.phase_target[train] = -1
+            self.is_speed_matched[train] = False
+            self.speed_matched_to[train] = -1
+            self.emergency_stopped[train] = False
+            self.is_stopped[train] = False
+            self._set_reason(train, REASON_NONE)
+
+    def _handle_delay_recovery(self):
+        # Only trains following a delayed train or stopped for their own delay can recover
+        trains = np.flatnonzero((self.phase_target >= 0) | self.emergency_stopped)
+        if not len(trains):
+            return
+        target = self.phase_target[trains]
+        has_target = target >= 0
+        target_delay = np.where(has_target, self.delay[np.maximum(target, 0)], 0)
+        target_recovered = (self.phase[trains] != NORMAL) & has_target & (target_delay <= 0)
+        own_recovered = ~target_recovered & (self.delay[trains] <= 0) & self.emergency_stopped[trains] & ~has_target
+
+        distance = np.abs(self.position[np.maximum(target, 0)] - self.position[trains])
+        kind = np.select([own_recovered, distance > 35, distance > 20, distance > 10],
+                         [RESUME, RESUME, PROGRESSIVE, SPEED_MATCH], -1)
+
+        # Too close (<=10km) keeps emergency protocols; the rest resolve in list order
+        recover = (target_recovered | own_recovered) & (kind >= 0)
+        self._apply_phase_operations(trains[recover], target[recover], distance[recover], kind[recover])
+
+    def _find_next_village_ahead(self, position_km):
+        ahead = self.village_order[np.searchsorted(self.village_position, position_km, side='right'):]
+        free = np.flatnonzero(self.location_side_tracks[ahead] > self.location_occupied[ahead])
+        return ahead[free[0]] if len(free) else -1
+
+    def _handle_overtaking_logic(self):
+        active = (self.has_started & ~self.destination_reached & ~self.is_stopped &
+                  (self.delay <= 0) & (self.phase == NORMAL))
+        if active.sum() < 2:
+            return
+
+        # Sweep from the front: each train only looks at its immediate leader
+        by_position = self._sorted_by_position(active)
+        behind, ahead = by_position[-2::-1], by_position[:0:-1]
+        gap = self.position[ahead] - self.position[behind]
+        keep = ((gap <= OVERTAKING_RANGE_KM) & (gap > 0) &
+                (self.original_speed[behind] > self.original_speed[ahead]))
+        behind, ahead = behind[keep], ahead[keep]
+        order = np.arange(len(behind))
+        done = -1
+
+        # A pair only moves a train when a side track is free ahead of the slower train.
+        # Every move fills a side track, so runs of pairs between moves just match speeds.
+        while True:
+            free = self.location_double & (self.location_side_tracks > self.location_occupied)
+            furthest_free = self.location_position[free].max() if free.any() else -np.inf
+            pending = order > done
+            movable = pending & (self.position[ahead] < furthest_free)
+            stop = order[movable][0] if movable.any() else len(order)
+
+            run = pending & (order < stop)
+            self._match_speeds(behind[run], ahead[run])
+            if not movable.any():
+                break
+            self._overtake(int(behind[stop]), int(ahead[stop]))
+            done = stop
+
+    def _match_speeds(self, behind, ahead):
+        """Overtaking step 1 for a run of pairs in which no train moves to a side track"""
+        unmatched = ~self.is_speed_matched[behind]
+        behind, ahead = behind[unmatched], ahead[unmatched]
+        if not len(behind):
+            return
+        for i, j in zip(behind.tolist(), ahead.tolist()):
+            self.scheduler.event_log.info("OVERTAKE", "🚂 OVERTAKING STEP 1: {} slowing to match {}",
+                                          self.trains[i].name, self.trains[j].name)
+
+        # Leaders are swept first, so a leader matched in this run passes its new
+        # speed back: follow those links to a train whose speed is not rewritten
+        ahead_of = np.full(self.size, -1, dtype=np.int64)
+        ahead_of[behind] = ahead
+        follow = ahead_of[ahead] >= 0
+        link = np.arange(self.size)
+        link[behind[follow]] = ahead[follow]
+        while True:
+            next_link = link[link]
+            if np.array_equal(next_link, link):
+                break
+            link = next_link
+
+        self.speed[behind] = self.speed[ahead_of[link[behind]]]
+        self.is_speed_matched[behind] = True
+        self.speed_matched_to[behind] = ahead
+
+    def _overtake(self, train_behind, train_ahead):
+        """Overtaking steps 1-3 for a pair whose slower train gets a side track"""
+        event_log = self.scheduler.event_log
+        behind_name, ahead_name = self.trains[train_behind].name, self.trains[train_ahead].name
+
+        # Step 1: Slow down faster train
+        if not self.is_speed_matched[train_behind]:
+            event_log.info("OVERTAKE", "🚂 OVERTAKING STEP 1: {} slowing to match {}", behind_name, ahead_name)
+            self.speed[train_behind] = self.speed[train_ahead]
+            self.is_speed_matched[train_behind] = True
+            self.speed_matched_to[train_behind] = train_ahead
+
+        # Step 2: Move slower train to side track
+        side_track = self._find_next_village_ahead(self.position[train_ahead])
+        if side_track < 0:
+            return
+        location_name = self.locations[side_track].name
+        event_log.info("OVERTAKE", "🛤  OVERTAKING STEP 2: Moving {} to yellow track at {}", ahead_name, location_name)
+        self.is_on_side_track[train_ahead] = True
+        self.side_track[train_ahead] = side_track
+        self.position[train_ahead] = self.location_position[side_track]
+        self.is_stopped[train_ahead] = True
+        self._set_reason(train_ahead, REASON_YELLOW_TRACK, ref=train_behind)
+        self.times_rerouted[train_ahead] += 1
+        self.location_occupied[side_track] += 1
+        self.waiting_for[train_ahead] = train_behind
+        event_log.info("SIDE_TRACK", "YELLOW TRACK: {} moved to {} - {}", ahead_name, location_name,
+                       f"Allowing {behind_name} to overtake")
+
+        # Step 3: Restore faster train's speed
+        event_log.info("OVERTAKE", "⚡ OVERTAKING STEP 3: {} resuming full speed", behind_name)
+        self._resume_normal_speed(train_behind)
+
+        self.scheduler.overtaking_events.append({
+            'slower_train': ahead_name,
+            'faster_train': behind_name,
+            'location': location_name,
+            'time': self.scheduler.simulation_minutes
+        })
+
+    def _update_positions(self, time_delta_minutes):
+        moving = self.has_started & ~self.destination_reached
+
+        # Trains on yellow tracks cannot move at all
+        on_side = moving & self.is_on_side_track
+        self.is_stopped[on_side] = True
+        parked = on_side & (self.side_track >= 0)
+        self.reason[parked] = REASON_SIDE_TRACK
+        self.reason_ref[parked] = self.side_track[parked]
+
+        # Delayed trains count down instead of moving
+        delayed = moving & ~self.is_on_side_track & (self.delay > 0)
+        self.delay[delayed] -= time_delta_minutes
+        self.is_stopped[delayed] = True
+        self.reason[delayed] = REASON_DELAY_REMAINING
+        self.reason_value[delayed] = self.delay[delayed]
+        expired = delayed & (self.delay <= 0)
+        self.delay[expired] = 0
+        self.is_stopped[expired] = False
+        self.reason[expired] = REASON_NONE
+        self.emergency_stopped[expired] = False
+
+        running = moving & ~self.is_on_side_track & ~delayed & ~self.is_stopped & ~self.emergency_stopped
+        track_length = self.scheduler.track.total_length_km
+        self.position[running] = np.minimum(
+            track_length, self.position[running] + (self.speed[running] / 60) * time_delta_minutes)
+
+        arrived = running & (self.position >= track_length)
+        self.destination_reached[arrived] = True
+        self.is_stopped[arrived] = True
+        self.reason[arrived] = REASON_JOURNEY_COMPLETED
+
+    def _process_side_track_returns(self):
+        waiting = np.flatnonzero(self.is_on_side_track & (self.waiting_for >= 0) & (self.side_track >= 0))
+        main_line = None  # Sorted main line positions, built on the first check
+        for train in waiting.tolist():
+            faster_train = self.waiting_for[train]
+            side_track_position = self.location_position[self.side_track[train]]
+            has_passed = (self.position[faster_train] > side_track_position + 30 or
+                          self.destination_reached[faster_train])
+            if not has_passed:
+                continue
+            if main_line is None:
+                main_line = self.position[self._sorted_by_position(
+                    self.has_started & ~self.destination_reached & ~self.is_on_side_track)]
+            if self._is_main_track_clear_at_position(main_line, side_track_position, 15):
+                name, location_name = self.trains[train].name, self.locations[self.side_track[train]].name
+                self.scheduler.event_log.info("OVERTAKE", "🔄 STEP 4: {} returning from {}", name, location_name)
+                self.location_occupied[self.side_track[train]] -= 1
+                self.is_on_side_track[train] = False
+                self.side_track[train] = -1
+                self.waiting_for[train] = -1
+                self.is_stopped[train] = False
+                self._set_reason(train, REASON_NONE)
+                self.scheduler.event_log.info("MAIN_TRACK", "MAIN TRACK: {} returned from {}", name, location_name)
+                main_line = np.insert(main_line, np.searchsorted(main_line, side_track_position), side_track_position)
+
+    def _is_main_track_clear_at_position(self, main_line, position_km, buffer_km=20):
+        """Whether no position in sorted main_line is within buffer_km of position_km"""
+        lo = np.searchsorted(main_line, position_km - buffer_km - WINDOW_EPSILON_KM, side='left')
+        hi = np.searchsorted(main_line, position_km + buffer_km + WINDOW_EPSILON_KM, side='right')
+        return not (np.abs(main_line[lo:hi] - position_km) < buffer_km).any()
+
+    def _update_track_occupancy(self):
+        """Re-look up the segment only for trains that joined the main line or crossed a boundary"""
+        on_main = self.has_started & ~self.destination_reached & ~self.is_on_side_track
+        self.segment[~on_main] = -1
+        segment = self.segment
+        moved = np.flatnonzero(on_main & ((segment < 0) | (self.position > self.segment_end[segment]) |
+                                          (self.position <= self.segment_after[segment])))
+        if len(moved):
+            found = np.searchsorted(self.segment_end, self.position[moved], side='left')
+            found[found >= len(self.segment_end)] = -1
+            entered = moved[found != segment[moved]] if self.scheduler.crossings is not None else moved[:0]
+            segment[moved] = found
+            if len(entered):
+                self._enter_blocks(entered)
+
+    def _enter_blocks(self, entered):
+        """Hold the trains the crossing planner stops on entering a block, as Train.add_delay would"""
+        entries = [(self.trains[i], s if s >= 0 else None, plain_number(v))
+                   for i, s, v in zip(entered.tolist(), self.segment[entered].tolist(), self.speed[entered].tolist())]
+        for train, minutes, reason in self.scheduler._enter_blocks(entries):
+            i = self.train_index[id(train)]
+            self.delay[i] += minutes
+            self.total_delay[i] += minutes
+            self.is_stopped[i] = True
+            self._set_reason(i, REASON_CUSTOM)
+            self.custom_reasons[i] = reason_text(REASON_DELAYED, float(self.delay[i]), reason)
+
+    def get_system_status(self):
+        """Array version of DynamicRailwayScheduler.get_system_status"""
+        scheduler = self.scheduler
+        if self.status_counts is None:
+            self.status_counts = self._count_status()
+        counts, phase_counts = self.status_counts
+
+        return {
+            'current_time': scheduler.current_time.strftime('%H:%M:%S'),
+            'simulation_minutes': scheduler.simulation_minutes,
+            'total_trains': self.size + scheduler.retired_trains,
+            **counts,
+            'completed_trains': counts['completed_trains'] + scheduler.retired_trains,
+            'overtaking_events': len(scheduler.overtaking_events),
+            'phase_counts': dict(phase_counts)
+        }
+
+    def _count_status(self):
+        """Train counts for get_system_status - only recounted after the arrays change"""
+        active = self.has_started & ~self.destination_reached
+        delayed = active & (self.delay > 0)
+
+        phases, first_seen, counts = np.unique(self.phase[active], return_index=True, return_counts=True)
+        phase_counts = {PHASES[phases[k]]: int(counts[k]) for k in np.argsort(first_seen)}
+
+        counts = {
+            'waiting_to_start': int((~self.has_started).sum()),
+            'active_trains': int(active.sum()),
+            'primary_delays': int((delayed & (self.phase_target < 0)).sum()),
+            'secondary_delays': int((delayed & (self.phase_target >= 0)).sum()),
+            'total_delayed_trains': int((active & ((self.delay > 0) | (self.total_delay > 0))).sum()),
+            'side_track_trains': int((active & self.is_on_side_track).sum()),
+            'emergency_stopped': int((active & self.emergency_stopped).sum()),
+            'completed_trains': int(self.destination_reached.sum())
+        }
+        return counts, phase_counts
+
+    def _reason_record(self, i):
+        """Train.reason, reason_value and reason_ref for train i - references become objects again"""
+        code = int(self.reason[i])
+        ref = int(self.reason_ref[i])
+        if code == REASON_CUSTOM:
+            return code, 0, self.custom_reasons.get(i, "")
+        if code == REASON_SIDE_TRACK:
+            return code, 0, self.locations[ref]
+        if code == REASON_YELLOW_TRACK:
+            return code, 0, (self.locations[self.side_track[i]], f"Allowing {self.trains[ref].name} to overtake")
+        if code in TRAIN_REASONS:
+            return code, float(self.reason_value[i]), self.trains[ref]
+        return code, float(self.reason_value[i]), None
+
+    def sync_to_trains(self):
+        """Write array state back into the Train, Location and segment objects"""
+        if not self.loaded:
+            return
+
+        def train_or_none(i):
+            return self.trains[i] if i >= 0 else None
+
+        columns = zip(self.position.tolist(), self.speed.tolist(), self.delay.tolist(),
+                      self.total_delay.tolist(), self.phase.tolist(), self.has_started.tolist(),
+                      self.destination_reached.tolist(), self.is_stopped.tolist(),
+                      self.emergency_stopped.tolist(), self.is_on_side_track.tolist(),
+                      self.is_speed_matched.tolist(), self.phase_target.tolist(),
+                      self.speed_matched_to.tolist(), self.waiting_for.tolist(),
+                      self.side_track.tolist(), self.times_rerouted.tolist())
+        for i, (train, row) in enumerate(zip(self.trains, columns)):
+            (train.position_km, speed, delay, total_delay, phase, train.has_started,
+             train.destination_reached, train.is_stopped, train.emergency_stopped,
+             train.is_on_side_track, train.is_speed_matched, target, matched_to,
+             waiting_for, side_track, train.times_rerouted) = row
+            train.current_speed = plain_number(speed)
+            train.delay_minutes = plain_number(delay)
+            train.total_delay_accumulated = plain_number(total_delay)
+            train.phase = phase
+            train.phase_target_train = train_or_none(target)
+            train.speed_matched_to_train = train_or_none(matched_to)
+            train.waiting_for_train = train_or_none(waiting_for)
+            train.side_track_location = self.locations[side_track] if side_track >= 0 else None
+            train.last_update_time = self.last_update_times[i]
+            train.reason, train.reason_value, train.reason_ref = self._reason_record(i)
+
+        for location, occupied in zip(self.locations, self.location_occupied.tolist()):
+            location.occupied_side_tracks = occupied
+
+        track = self.scheduler.track
+        for train, s in zip(self.trains, self.segment.tolist()):
+            track.set_train_segment(train, s if s >= 0 else None)
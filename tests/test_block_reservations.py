@@ -0,0 +1,95 @@
+import os
+import random
+import pytest
+from datetime import timedelta
+from src.block_reservations import CrossingPlanner, IntervalSet, DIRECTIONS, UP
+from src.batch_runner import load_json
+from src.railway_network import build_corridor
+from src.dynamic_scheduler import DynamicRailwayScheduler, RailwayTrack
+from src.event_log import EventLog, INFO
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "data")
+
+def corridor():
+    return build_corridor(load_json(os.path.join(DATA, "single_track.json"))['corridors'][0])
+
+def trains(extra):
+    configs = load_json(os.path.join(DATA, "single_track_trains.json"))
+    configs += [{'name': f"Extra {k}", 'speed': 40 + 7 * k % 70, 'direction': 'up' if k % 3 else 'down',
+                 'departure': 5 + 11 * k} for k in range(extra)]
+    return sorted(configs, key=lambda t: t['departure'])
+
+def build(engine, extra):
+    track = corridor()
+    planner = CrossingPlanner(track)
+    scheduler = DynamicRailwayScheduler(engine=engine, track=track, crossings=planner,
+                                        event_log=EventLog(capacity=10**6, level=INFO), seed=1)
+    for order, config in enumerate(trains(extra)):
+        if config['direction'] == 'up':
+            scheduler.admit_train({'id': order + 1, 'name': config['name'], 'priority': 1 + order % 3, 'speed': config['speed']},
+                                  scheduled_start=scheduler.current_time + timedelta(minutes=config['departure']))
+        else:
+            planner.plan(config['name'], DIRECTIONS['down'], config['departure'], config['speed'])
+    return scheduler
+
+def run(engine, event_driven, extra=30, minutes=900):
+    scheduler = build(engine, extra)
+    steps = int(round(minutes / 0.05))
+    while steps > 0:
+        if event_driven:
+            steps -= scheduler.simulate_event_step(0.05, max_steps=steps)
+        else:
+            scheduler.simulate_step(0.05)
+            steps -= 1
+    scheduler.sync_trains()
+    return ([t.record() for t in scheduler.trains], scheduler.delay_events,
+            [str(e) for e in scheduler.event_log.events])
+
+def test_interval_set_matches_brute_force():
+    rng = random.Random(1)
+    for _ in range(200):
+        intervals, raw = IntervalSet(), []
+        for _ in range(rng.randint(0, 30)):
+            start = rng.uniform(0, 100)
+            end = start + rng.uniform(0.1, 10)
+            intervals.add(start, end)
+            raw.append((start, end))
+        for _ in range(20):
+            start = rng.uniform(-5, 110)
+            end = start + rng.uniform(0.01, 10)
+            assert (intervals.overlapping(start, end) is not None) == any(a < end and b > start for a, b in raw)
+
+def test_opposing_trains_never_share_a_single_track_section():
+    planner = CrossingPlanner(corridor())
+    for config in trains(30):
+        planner.plan(config['name'], DIRECTIONS[config['direction']], config['departure'], config['speed'])
+    for section, reservations in zip(planner.index.sections, planner.index.reservations):
+        if section.capacity == 1:
+            for a in reservations:
+                for b in reservations:
+                    if a.direction != b.direction:
+                        assert a.end <= b.start + 1e-9 or b.end <= a.start + 1e-9
+
+def test_crossing_holds_delay_the_held_train():
+    records, delay_events, events = run('object', False)
+    holds = [e for e in delay_events if e['type'] == 'crossing']
+    assert holds
+    assert sum(1 for line in events if "CROSSING HOLD" in line) == len(holds)
+    held = {e['train'] for e in holds}
+    assert all(r['total_delay_minutes'] > 0 for r in records if r['name'] in held)
+
+@pytest.mark.parametrize("engine,event_driven", [("vectorized", False), ("object", True), ("vectorized", True)])
+def test_crossings_match_the_object_engine(engine, event_driven):
+    assert run(engine, event_driven) == run('object', False)
+
+def test_planner_must_plan_the_scheduler_track():
+    with pytest.raises(ValueError):
+        DynamicRailwayScheduler(track=RailwayTrack(), crossings=CrossingPlanner(corridor()))
+
+def test_on_time_train_keeps_its_slot():
+    planner = CrossingPlanner(corridor())
+    planner.plan('up', UP, 0, 60)
+    section = next(s for s in range(1, len(planner.index.sections)) if planner.is_block_start(s))
+    slot = planner.index.reservation('up', section).start
+    assert planner.enter('up', section, slot - 0.5, 60) == 0.0
+    assert planner.enter('up', section, slot - 5, 60) == pytest.approx(5)
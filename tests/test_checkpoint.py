@@ -0,0 +1,105 @@
+import io
+import json
+import random
+import pytest
+import numpy as np
+from datetime import timedelta
+from src.dynamic_scheduler import DynamicRailwayScheduler
+from src.checkpoint import save_checkpoint, load_checkpoint
+from src.event_log import EventLog, INFO
+
+SPEEDS = [50, 65, 70, 80, 100, 110, 125, 130]
+
+def build(engine, trains, seed, spacing_minutes):
+    rng = random.Random(seed)
+    configs = [{'id': i, 'name': f"T{i}", 'priority': 1 + i % 4, 'speed': rng.choice(SPEEDS)} for i in range(trains)]
+    scheduler = DynamicRailwayScheduler(engine=engine, event_log=EventLog(capacity=10**6, level=INFO), seed=seed)
+    scheduler.create_dynamic_schedule(configs)
+    for i, train in enumerate(scheduler.trains):
+        train.scheduled_start = scheduler.current_time + timedelta(minutes=i * spacing_minutes)
+    scheduler.rebuild_indexes()
+    return scheduler
+
+def ref(obj):
+    return None if obj is None else obj.name
+
+def snapshot(scheduler):
+    scheduler.sync_trains()
+    trains = [(t.name, t.position_km, t.current_speed, t.delay_minutes, t.total_delay_accumulated, t.current_phase,
+               t.stop_reason, t.is_stopped, t.has_started, t.destination_reached, t.emergency_stopped,
+               t.is_on_side_track, t.is_speed_matched, t.times_rerouted, t.scheduled_start, t.last_update_time,
+               ref(t.phase_target_train), ref(t.speed_matched_to_train), ref(t.waiting_for_train),
+               ref(t.side_track_location))
+              for t in scheduler.trains]
+    return (trains, [loc.occupied_side_tracks for loc in scheduler.track.locations],
+            [sorted(t.name for t in segment['trains']) for segment in scheduler.track.segments],
+            scheduler.get_system_status(), [dict(e) for e in scheduler.delay_events],
+            [dict(e) for e in scheduler.overtaking_events])
+
+def advance(scheduler, first, last, delay_every):
+    for step in range(first, last):
+        if step % delay_every == delay_every - 1:
+            scheduler.trigger_user_delay()
+        scheduler.simulate_step(0.05)
+
+def first_cascade_step(engine, trains, seed, spacing_minutes, delay_every, steps):
+    """First step after which followers are held back by a delayed train"""
+    scheduler = build(engine, trains, seed, spacing_minutes)
+    for step in range(steps):
+        advance(scheduler, step, step + 1, delay_every)
+        if scheduler.get_system_status()['secondary_delays'] > 0:
+            return step + 1
+    pytest.fail("No delay cascade to checkpoint")
+
+@pytest.mark.parametrize("engine", ["object", "vectorized"])
+@pytest.mark.parametrize("trains, seed, steps, delay_every, spacing_minutes", [
+    (30, 3, 3000, 400, 6.0),
+    (60, 4, 2500, 200, 3.0)
+])
+def test_resume_mid_cascade_matches_uninterrupted_run(engine, trains, seed, steps, delay_every, spacing_minutes):
+    cut = first_cascade_step(engine, trains, seed, spacing_minutes, delay_every, steps)
+
+    uninterrupted = build(engine, trains, seed, spacing_minutes)
+    advance(uninterrupted, 0, cut, delay_every)
+    at_cut = snapshot(uninterrupted)
+    advance(uninterrupted, cut, steps, delay_every)
+
+    interrupted = build(engine, trains, seed, spacing_minutes)
+    advance(interrupted, 0, cut, delay_every)
+    buffer = io.BytesIO()
+    save_checkpoint(interrupted, buffer)
+    buffer.seek(0)
+    resumed = load_checkpoint(buffer, event_log=EventLog(level=INFO))
+    assert (resumed.engine is None) == (engine == "object")
+    assert resumed.get_system_status()['secondary_delays'] > 0
+    assert snapshot(resumed) == at_cut
+
+    # Same random user delays from here on: the scheduler's RNG state travels with the checkpoint
+    advance(resumed, cut, steps, delay_every)
+    assert snapshot(resumed) == snapshot(uninterrupted)
+
+def test_checkpoint_restores_into_the_other_engine():
+    scheduler = build("object", 60, 4, 3.0)
+    cut = first_cascade_step("object", 60, 4, 3.0, 200, 2500)
+    advance(scheduler, 0, cut, 200)
+    buffer = io.BytesIO()
+    save_checkpoint(scheduler, buffer)
+    buffer.seek(0)
+    resumed = load_checkpoint(buffer, engine="vectorized")
+    assert resumed.engine is not None
+    advance(scheduler, cut, 2500, 200)
+    advance(resumed, cut, 2500, 200)
+    assert snapshot(resumed) == snapshot(scheduler)
+
+def test_unsupported_version_is_rejected(tmp_path):
+    path = tmp_path / "future.npz"
+    save_checkpoint(build("object", 4, 0, 60.0), str(path))
+    with np.load(path) as data:
+        arrays = dict(data)
+    header = json.loads(arrays['header'].tobytes())
+    header['version'] += 1
+    arrays['header'] = np.frombuffer(json.dumps(header).encode(), dtype=np.uint8)
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+    with pytest.raises(ValueError):
+        load_checkpoint(str(path))
@@ -0,0 +1,88 @@
+import random
+import pytest
+from datetime import timedelta
+from src.dynamic_scheduler import DynamicRailwayScheduler
+from src.event_log import EventLog, INFO
+
+SPEEDS = [50, 65, 70, 80, 100, 110, 125, 130]
+
+def build(engine, trains, seed, spacing_minutes):
+    rng = random.Random(seed)
+    configs = [{'id': i, 'name': f"T{i}", 'priority': 1 + i % 4, 'speed': rng.choice(SPEEDS)} for i in range(trains)]
+    scheduler = DynamicRailwayScheduler(engine=engine, event_log=EventLog(capacity=10**6, level=INFO), seed=seed)
+    scheduler.create_dynamic_schedule(configs)
+    for i, train in enumerate(scheduler.trains):
+        train.scheduled_start = scheduler.current_time + timedelta(minutes=i * spacing_minutes)
+    scheduler.rebuild_indexes()
+    return scheduler
+
+def ref(obj):
+    return None if obj is None else obj.name
+
+def snapshot(scheduler):
+    scheduler.sync_trains()
+    trains = [(t.name, t.position_km, t.current_speed, t.delay_minutes, t.total_delay_accumulated, t.current_phase,
+               t.stop_reason, t.is_stopped, t.has_started, t.destination_reached, t.emergency_stopped,
+               t.is_on_side_track, t.is_speed_matched, t.times_rerouted, ref(t.phase_target_train),
+               ref(t.speed_matched_to_train), ref(t.waiting_for_train), ref(t.side_track_location))
+              for t in scheduler.trains]
+    side_tracks = [loc.occupied_side_tracks for loc in scheduler.track.locations]
+    segments = [sorted(t.name for t in segment['trains']) for segment in scheduler.track.segments]
+    return trains, side_tracks, segments, scheduler.get_system_status()
+
+def run(engine, trains, seed, steps, delay_every, spacing_minutes, event_driven=False):
+    """Seeded run with a user delay every delay_every steps, snapshots every 50 steps"""
+    scheduler = build(engine, trains, seed, spacing_minutes)
+    snapshots = []
+    step = 0
+    while step < steps:
+        if step and step % delay_every == 0:
+            scheduler.trigger_user_delay()
+        limit = min(steps - step, delay_every - step % delay_every, 50 - step % 50)
+        if event_driven:
+            step += scheduler.simulate_event_step(0.05, limit)
+        else:
+            scheduler.simulate_step(0.05)
+            step += 1
+        if step % 50 == 0:
+            snapshots.append(snapshot(scheduler))
+    events = [(round(e.time, 6), e.level, e.kind, e.message) for e in scheduler.event_log.events]
+    return snapshots, events, scheduler.overtaking_events
+
+CASES = [
+    (8, 1, 3000, 600, 60.0),
+    (30, 3, 3000, 400, 6.0),
+    (60, 4, 2500, 200, 3.0),
+    (120, 6, 1500, 25, 1.5)
+]
+
+@pytest.mark.parametrize("trains, seed, steps, delay_every, spacing_minutes", CASES)
+def test_vectorized_matches_object_path(trains, seed, steps, delay_every, spacing_minutes):
+    expected = run("object", trains, seed, steps, delay_every, spacing_minutes)
+    actual = run("vectorized", trains, seed, steps, delay_every, spacing_minutes)
+    assert actual[0] == expected[0]
+    assert actual[1] == expected[1]
+    assert actual[2] == expected[2]
+
+@pytest.mark.parametrize("trains, seed, steps, delay_every, spacing_minutes", CASES[1:3])
+def test_vectorized_matches_object_path_event_driven(trains, seed, steps, delay_every, spacing_minutes):
+    expected = run("object", trains, seed, steps, delay_every, spacing_minutes, event_driven=True)
+    actual = run("vectorized", trains, seed, steps, delay_every, spacing_minutes, event_driven=True)
+    assert actual == expected
+
+def test_auto_engine_switches_mid_run_without_changing_results():
+    results = {}
+    for engine in ("object", "auto"):
+        scheduler = build(engine, 150, 2, 4.0)
+        rng = random.Random(5)
+        extra = [{'id': 1000 + i, 'name': f"X{i}", 'priority': 1 + i % 4, 'speed': rng.choice(SPEEDS)} for i in range(60)]
+        for step in range(3000):
+            if step == 1500:
+                scheduler.admit_trains(extra, [scheduler.current_time + timedelta(minutes=3 * i) for i in range(60)])
+            if step % 200 == 100:
+                scheduler.trigger_user_delay()
+            scheduler.simulate_step(0.05)
+        results[engine] = (snapshot(scheduler), [(e.time, e.kind, e.message) for e in scheduler.event_log.events])
+        if engine == "auto":
+            assert scheduler.engine is not None
+    assert results["auto"] == results["object"]
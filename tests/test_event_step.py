@@ -0,0 +1,60 @@
+import random
+import pytest
+from datetime import timedelta
+from src.dynamic_scheduler import DynamicRailwayScheduler
+from src.event_log import EventLog, INFO
+
+SPEEDS = [50, 65, 70, 80, 100, 110, 125, 130]
+
+def build(engine, trains, seed, spacing_minutes):
+    rng = random.Random(seed)
+    configs = [{'id': i, 'name': f"T{i}", 'priority': 1 + i % 4, 'speed': rng.choice(SPEEDS)} for i in range(trains)]
+    scheduler = DynamicRailwayScheduler(engine=engine, event_log=EventLog(capacity=10**6, level=INFO), seed=seed)
+    scheduler.create_dynamic_schedule(configs)
+    for i, train in enumerate(scheduler.trains):
+        train.scheduled_start = scheduler.current_time + timedelta(minutes=i * spacing_minutes)
+    scheduler.rebuild_indexes()
+    return scheduler
+
+def snapshot(scheduler):
+    scheduler.sync_trains()
+    return ([(t.name, t.position_km, t.current_speed, t.delay_minutes, t.current_phase, t.stop_reason,
+              t.destination_reached, t.emergency_stopped, t.is_on_side_track, t.total_delay_accumulated)
+             for t in scheduler.trains], scheduler.get_system_status())
+
+def run(engine, trains, seed, steps, delay_every, spacing_minutes, event_driven):
+    """Delays land on the same fixed steps either way - event steps never cross a delay or a snapshot"""
+    scheduler = build(engine, trains, seed, spacing_minutes)
+    snapshots, calls, step = [], 0, 0
+    while step < steps:
+        if step and step % delay_every == 0:
+            scheduler.trigger_user_delay()
+        limit = min(steps - step, delay_every - step % delay_every, 500 - step % 500)
+        step += scheduler.simulate_event_step(0.05, limit) if event_driven else (scheduler.simulate_step(0.05) or 1)
+        calls += 1
+        if step % 500 == 0:
+            snapshots.append(snapshot(scheduler))
+    events = [(round(e.time, 6), e.kind, e.message) for e in scheduler.event_log.events]
+    return snapshots, events, calls
+
+@pytest.mark.parametrize("engine", ["object", "vectorized"])
+@pytest.mark.parametrize("trains, seed, steps, delay_every, spacing_minutes", [
+    (8, 1, 9000, 1500, 60.0),
+    (30, 2, 4000, 400, 6.0),
+    (60, 3, 3000, 250, 3.0)
+])
+def test_event_steps_match_fixed_steps(engine, trains, seed, steps, delay_every, spacing_minutes):
+    fixed = run(engine, trains, seed, steps, delay_every, spacing_minutes, event_driven=False)
+    merged = run(engine, trains, seed, steps, delay_every, spacing_minutes, event_driven=True)
+    assert merged[0] == fixed[0]
+    assert merged[1] == fixed[1]
+    assert merged[2] <= fixed[2]
+
+def test_quiet_timetable_needs_far_fewer_steps():
+    _, _, fixed_calls = run("object", 8, 1, 28800, 28800, 60.0, event_driven=False)
+    _, _, event_calls = run("object", 8, 1, 28800, 28800, 60.0, event_driven=True)
+    assert event_calls * 10 < fixed_calls
+
+def test_max_steps_caps_the_merge():
+    scheduler = build("object", 4, 0, 120.0)
+    assert scheduler.simulate_event_step(0.05, max_steps=3) <= 3
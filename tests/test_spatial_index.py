@@ -0,0 +1,96 @@
+import random
+import pytest
+from src.dynamic_scheduler import RailwayTrack, Train, TrainPositionIndex
+
+def on_main_line(train):
+    return train.has_started and not train.destination_reached and not train.is_on_side_track
+
+def make_trains(rng, count, track):
+    trains = []
+    for i in range(count):
+        train = Train(i, f"T{i}", 1 + i % 4, 100, None)
+        train.has_started = rng.random() < 0.9
+        train.destination_reached = rng.random() < 0.05
+        train.is_on_side_track = rng.random() < 0.05
+        # Whole kilometres give ties and positions exactly on the query window edges
+        train.position_km = float(rng.randint(0, track.total_length_km)) if rng.random() < 0.3 else \
+            rng.uniform(0, track.total_length_km)
+        trains.append(train)
+    return trains
+
+def brute_within(trains, position_km, distance_km):
+    nearby = sorted((abs(position_km - t.position_km), order, t) for order, t in enumerate(trains)
+                    if on_main_line(t) and abs(position_km - t.position_km) <= distance_km)
+    return [(distance, train) for distance, _, train in nearby]
+
+def brute_segment(track, position_km):
+    return next((i for i, segment in enumerate(track.segments) if segment.start_km <= position_km <= segment.end_km), None)
+
+def queries(rng, track):
+    points = [float(loc.position_km) for loc in track.locations] + [-1.0, track.total_length_km + 1.0]
+    return points + [rng.uniform(-10, track.total_length_km + 10) for _ in range(200)]
+
+@pytest.mark.parametrize("seed", range(5))
+def test_within_matches_brute_force(seed):
+    rng = random.Random(seed)
+    track = RailwayTrack()
+    trains = make_trains(rng, 300, track)
+    index = TrainPositionIndex()
+    index.rebuild(trains)
+    for position_km in queries(rng, track):
+        for distance_km in (0, 10, 15, 25, 50):
+            assert index.within(position_km, distance_km) == brute_within(trains, position_km, distance_km)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_within_after_moves_refresh_and_add(seed):
+    rng = random.Random(seed)
+    track = RailwayTrack()
+    trains = make_trains(rng, 200, track)
+    index = TrainPositionIndex()
+    index.rebuild(trains)
+    for _ in range(20):
+        for order, train in enumerate(trains):
+            if on_main_line(train):
+                train.position_km = min(track.total_length_km, train.position_km + rng.uniform(0, 3))
+                train.destination_reached = train.position_km >= track.total_length_km
+            elif not train.has_started and rng.random() < 0.2:
+                train.has_started = True
+                index.add(train, order)
+        index.refresh()
+        for position_km in queries(rng, track)[:50]:
+            assert index.within(position_km, 25) == brute_within(trains, position_km, 25)
+
+def test_segment_lookup_matches_brute_force():
+    rng = random.Random(0)
+    track = RailwayTrack()
+    for position_km in queries(rng, track):
+        assert track.segment_index_at_position(position_km) == brute_segment(track, position_km)
+
+def test_segment_occupancy_follows_moves():
+    rng = random.Random(1)
+    track = RailwayTrack()
+    trains = make_trains(rng, 100, track)
+    for _ in range(50):
+        for train in trains:
+            # Mostly forward with the odd jump back or off the line, as position reports can do
+            if rng.random() < 0.1:
+                train.position_km = rng.uniform(-5, track.total_length_km + 5)
+            else:
+                train.position_km += rng.uniform(0, 20)
+            reported = train.position_km if rng.random() > 0.05 else None
+            track.update_train_segment(train, reported)
+            expected = None if reported is None else brute_segment(track, reported)
+            assert track.train_segments.get(train) == expected
+        for i, segment in enumerate(track.segments):
+            assert set(segment.trains) == {t for t in trains if track.train_segments.get(t) == i}
+
+def test_next_village_ahead_matches_brute_force():
+    rng = random.Random(2)
+    track = RailwayTrack()
+    for _ in range(100):
+        location = rng.choice(track.locations)
+        location.occupied_side_tracks = rng.randint(0, location.side_tracks)
+        position_km = rng.choice([float(location.position_km), rng.uniform(0, track.total_length_km)])
+        ahead = [loc for loc in track.locations if loc.position_km > position_km and loc.has_double_track and
+                 loc.has_free_side_track()]
+        assert track.find_next_village_ahead(position_km) == (ahead[0] if ahead else None)
@@ -0,0 +1,94 @@
+import pytest
+import numpy as np
+from datetime import datetime
+from src.dynamic_scheduler import DynamicRailwayScheduler
+from src.timetable_loader import TimetableLoader, TimetableFeeder
+
+DAY_START = datetime(2024, 1, 1, 6, 0)
+HEADER = "id,name,priority,speed,departure\n"
+
+def write(tmp_path, rows, header=HEADER):
+    path = tmp_path / "timetable.csv"
+    path.write_text(header + "".join(row + "\n" for row in rows))
+    return str(path)
+
+def load(path, chunk_rows=5000):
+    chunks = list(TimetableLoader(path, DAY_START, chunk_rows).chunks())
+    return (np.concatenate([c.ids for c in chunks]).tolist(), np.concatenate([c.departures for c in chunks]).tolist())
+
+def service(i, departure):
+    return f"{i},Train {i},{1 + i % 4},{60 + i % 5 * 10},{departure}"
+
+def valid_rows(count):
+    return [service(i, f"{6 + i // 60 % 18:02d}:{i % 60:02d}") for i in range(1, count + 1)]
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 7, 5000])
+def test_chunking_does_not_change_the_timetable(tmp_path, chunk_rows):
+    path = write(tmp_path, valid_rows(50))
+    ids, departures = load(path, chunk_rows)
+    assert ids == list(range(1, 51))
+    assert departures == [i // 60 * 3600 + i % 60 * 60 for i in range(1, 51)]
+
+def test_service_day_wraps_past_midnight(tmp_path):
+    path = write(tmp_path, [service(1, "23:50"), service(2, "00:10:30"), service(3, "05:59")])
+    assert load(path)[1] == [17 * 3600 + 50 * 60, 18 * 3600 + 10 * 60 + 30, 24 * 3600 - 60]
+
+@pytest.mark.parametrize("chunk_rows", [2, 5000])
+def test_duplicate_id_is_rejected_within_and_across_chunks(tmp_path, chunk_rows):
+    path = write(tmp_path, [service(1, "06:00"), service(2, "06:05"), service(1, "06:10")])
+    with pytest.raises(ValueError, match=r"line\(s\) 4: duplicate id"):
+        load(path, chunk_rows)
+
+def test_repeated_id_in_one_chunk_reports_only_the_repeat(tmp_path):
+    path = write(tmp_path, [service(5, "06:00"), service(5, "06:05")])
+    with pytest.raises(ValueError, match=r"line\(s\) 3: duplicate id"):
+        load(path)
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 5000])
+def test_unsorted_rows_are_rejected_within_and_across_chunks(tmp_path, chunk_rows):
+    path = write(tmp_path, [service(1, "06:00"), service(2, "07:00"), service(3, "06:30")])
+    with pytest.raises(ValueError, match=r"line\(s\) 4: rows must be in departure order"):
+        load(path, chunk_rows)
+
+@pytest.mark.parametrize("row, problem", [
+    ("1x,Train,1,80,06:00", "id must be a whole number"),
+    ("1,,1,80,06:00", "name is empty"),
+    ("1,Train,one,80,06:00", "priority must be a whole number"),
+    ("1,Train,5,80,06:00", "priority must be 1-4"),
+    ("1,Train,1,fast,06:00", "speed must be a number"),
+    ("1,Train,1,1.2.3,06:00", "speed must be a number"),
+    ("1,Train,1,0,06:00", "speed must be above 0"),
+    ("1,Train,1,400,06:00", "speed must be above 0"),
+    ("1,Train,1,80,6", "departure must be HH:MM or HH:MM:SS"),
+    ("1,Train,1,80,06:5", "departure must be HH:MM or HH:MM:SS"),
+    ("1,Train,1,80,25:00", "departure is not a time of day"),
+    ("1,Train,1,80,06:61", "departure is not a time of day"),
+    ("1,Train", "name is empty|priority must be a whole number")
+])
+def test_malformed_row_is_rejected_with_its_line(tmp_path, row, problem):
+    path = write(tmp_path, [service(10, "06:00"), row.replace("06:", "07:")])
+    with pytest.raises(ValueError, match=rf"line\(s\) 3: ({problem})"):
+        load(path)
+
+def test_missing_column_is_rejected(tmp_path):
+    path = write(tmp_path, ["1,Train,1,80"], header="id,name,priority,speed\n")
+    with pytest.raises(ValueError, match="missing columns: departure"):
+        load(path)
+
+def test_blank_lines_and_column_order_are_accepted(tmp_path):
+    path = write(tmp_path, ["06:00,80,1,Train A,1", "", "06:05,90,2,Train B,2"],
+                 header="departure,speed,priority,name,id\n")
+    assert load(path) == ([1, 2], [0, 300])
+
+def test_feeder_only_holds_trains_near_departure(tmp_path):
+    # A departure every 15 minutes, each train about 4-7 hours on the line
+    path = write(tmp_path, [service(i, f"{6 + i // 4:02d}:{i % 4 * 15:02d}") for i in range(60)])
+    scheduler = DynamicRailwayScheduler(seed=0)
+    scheduler.current_time = DAY_START
+    feeder = TimetableFeeder(scheduler, TimetableLoader(path, DAY_START, chunk_rows=16))
+    for _ in range(int(24 * 60 / 0.5)):
+        feeder.update()
+        scheduler.simulate_step(0.5)
+    report = feeder.report()
+    assert report['exhausted'] and report['admitted'] == 60
+    assert report['peak_trains'] <= 40